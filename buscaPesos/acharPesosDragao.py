@@ -1,28 +1,26 @@
+import os
 import random
+import sys
 import numpy as np
 from collections import defaultdict
+from multiprocessing import cpu_count
 
-# Configuração inicial dos símbolos (pesos serão calculados)
-symbols = {
-    "🐉": {"multiplier": 100},
-    "🏆": {"multiplier": 50},
-    "🍊": {"multiplier": 25},
-    "🔑": {"multiplier": 10},
-    "💰": {"multiplier": 5},
-    "🧧": {"multiplier": 3},
-    "🔭": {"multiplier": 2}
-}
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.jogos import DEFINICOES, LINHAS, compilar
+from motor.metricas import formatar_metricas, metricas_dragao
+from motor.paralelo import buscar_em_paralelo
+from motor.sequencial import testar_sequencial
+from motor.otimizacao import escalar_para_pool, explorar_fronteira, otimizar_inteiros, pesos_validos
+from motor.rtp_exato import media_cilindro, rtp_dragao
+from motor.variancia import RandomAntitetico
+
+# Configuração inicial dos símbolos (pesos serão calculados): multiplicadores de motor.jogos
+symbols = {simbolo: {"multiplier": dados["multiplier"]}
+           for simbolo, dados in DEFINICOES["dragao"]["symbols"].items()}
 
 # Parâmetros fixos conforme o jogo original
 aposta_total = 12.00
-paylines = [
-    [(0,0), (0,1), (0,2)],
-    [(1,0), (1,1), (1,2)],
-    [(2,0), (2,1), (2,2)],
-    [(0,0), (1,1), (2,2)],
-    [(2,0), (1,1), (0,2)]
-]
-linhas_ativas = len(paylines)
+linhas_ativas = LINHAS
 aposta_por_linha = aposta_total / linhas_ativas
 
 # Parâmetros de simulação
@@ -30,166 +28,301 @@ rtp_alvo = 96.8
 margem_erro = 0.5
 rodadas_por_teste = 100000
 tentativas_maximas = 1000
+processos = cpu_count()  # Candidatos simulados em paralelo na busca aleatória
+semente_busca = 2024  # Mesma semente, mesmo resultado com qualquer número de processos
+teste_sequencial = True  # Na simulação, descarta o candidato assim que o intervalo de confiança sai da margem
+tamanho_bloco = 1000
+precisao_sequencial = margem_erro / 2  # Meia largura do intervalo que encerra um candidato promissor
+rodadas_maximas_sequencial = 4 * rodadas_por_teste
+variaveis_controle = True  # Desconta da simulação os desvios da linha e do cilindro em relação às médias exatas
+variaveis_antiteticas = False  # Blocos em pares, o segundo com 1 - u dos sorteios do primeiro
+sementes_comuns = False  # Todos os candidatos com a mesma semente (números aleatórios comuns)
+usar_rtp_exato = True  # False volta para a estimativa por Monte Carlo
+modo_busca = "otimizador"  # "pareto" também olha acerto e volatilidade; "aleatoria" volta para o sorteio de ±30%
+limite_pool = 200  # Soma máxima dos pesos (tamanho do symbol_pool)
+tolerancia_otimizador = 0.01
+objetivos_pareto = {"frequencia_acerto": "max", "desvio_padrao": "min", "prob_ganho_alto": "min"}
+max_avaliacoes_pareto = 5000
+
+# Valores referenciais: centro do sorteio e ponto de partida do otimizador
+pesos_base = {
+    "🐉": 2,   
+    "🏆": 3,   
+    "🍊": 6,   
+    "🔑": 10,  
+    "💰": 15,  
+    "🧧": 30,  
+    "🔭": 50   
+}
+base_normal = {"1": 8, "2": 22, "5": 12, "10": 4}
+base_fortuna = {"1": 0, "2": 14, "5": 5, "10": 2}
+chance_terceiro_base = 0.2
+prob_fortuna_base = 0.02
 
-def gerar_pesos_balanceados():
+def gerar_pesos_balanceados(rng=random):
     """Gera pesos com base em valores referenciais + variação controlada"""
-    pesos_base = {
-        "🐉": 2,   
-        "🏆": 3,   
-        "🍊": 6,   
-        "🔑": 10,  
-        "💰": 15,  
-        "🧧": 30,  
-        "🔭": 50   
-    }
-    
     pesos = {}
     for simbolo, base in pesos_base.items():
-        variacao = random.uniform(0.7, 1.3)  # Variação de ±30%
+        variacao = rng.uniform(0.7, 1.3)  # Variação de ±30%
         pesos[simbolo] = max(1, int(base * variacao))
     
     return pesos
 
-def gerar_config_cilindro():
+def gerar_config_cilindro(rng=random):
     """Gera configurações balanceadas para os cilindros"""
     # Cilindro normal (base + variação)
-    base_normal = {"1": 8, "2": 22, "5": 12, "10": 4}
     cilindro_normal = {}
     for k, v in base_normal.items():
-        cilindro_normal[k] = max(1, int(v * random.uniform(0.8, 1.2)))
+        cilindro_normal[k] = max(1, int(v * rng.uniform(0.8, 1.2)))
     
     # Cilindro fortuna (mais generoso)
-    base_fortuna = {"1": 0, "2": 14, "5": 5, "10": 2}
     cilindro_fortuna = {}
     for k, v in base_fortuna.items():
-        cilindro_fortuna[k] = max(0, int(v * random.uniform(0.8, 1.2)))  # 1x nunca aparece
+        cilindro_fortuna[k] = max(0, int(v * rng.uniform(0.8, 1.2)))  # 1x nunca aparece
     
     return cilindro_normal, cilindro_fortuna
 
-def gerar_parametros_aleatorios():
+def gerar_parametros_aleatorios(rng=random):
     """Gera todos os parâmetros com abordagem balanceada"""
-    pesos = gerar_pesos_balanceados()
-    cilindro_normal, cilindro_fortuna = gerar_config_cilindro()
+    pesos = gerar_pesos_balanceados(rng)
+    cilindro_normal, cilindro_fortuna = gerar_config_cilindro(rng)
     
     # Probabilidades especiais com variação controlada
-    chance_terceiro = round(0.2 * random.uniform(0.8, 1.2), 2)  # Base 20% ±20%
-    prob_fortuna = round(0.02 * random.uniform(0.8, 1.2), 3)    # Base 2% ±20%
+    chance_terceiro = round(chance_terceiro_base * rng.uniform(0.8, 1.2), 2)  # Base 20% ±20%
+    prob_fortuna = round(prob_fortuna_base * rng.uniform(0.8, 1.2), 3)    # Base 2% ±20%
     
     return pesos, chance_terceiro, prob_fortuna, cilindro_normal, cilindro_fortuna
 
-def simular_rodadas(params):
-    """Simula o jogo completo com todos os parâmetros"""
+def simular_blocos_com_controle(params, tamanho_bloco, rng=random):
+    """Pares (RTP simples, RTP com variáveis de controle) de blocos seguidos de
+    `tamanho_bloco` giros, sem fim; a rodada da fortuna continua de um bloco
+    para o outro.
+
+    Grade e cilindro são independentes, com médias exatas E[L] e E[M | estado].
+    O giro ajustado L*M - E[M]*(L - E[L]) - E[L]*(M - E[M]) tem a mesma média e
+    só guarda o termo (L - E[L])*(M - E[M]) do ruído."""
     pesos, chance_terceiro, prob_fortuna, cilindro_normal, cilindro_fortuna = params
     
-    # Configura o pool de símbolos
-    symbol_pool = []
-    for simbolo in symbols.keys():
-        symbol_pool.extend([simbolo] * pesos[simbolo])
+    # O jogo com os parâmetros do candidato; cada linha da grade é um código base 7 (ver motor.tabelas)
+    jogo = compilar("dragao", pesos=pesos, cilindro_normal=cilindro_normal, cilindro_fortuna=cilindro_fortuna,
+                    chance_terceiro_giro=chance_terceiro, prob_fortuna=prob_fortuna)
+    media_linhas = jogo.media_linhas
+    media_normal = media_cilindro(cilindro_normal)
+    media_fortuna = (2 + chance_terceiro) * media_cilindro(cilindro_fortuna)
+    proximo_bloco = getattr(rng, "proximo_bloco", None)  # RandomAntitetico
     
-    total_ganho = 0
     rodadas_fortuna = 0
     rodada_da_fortuna = False
     
-    def girar_cilindro():
-        cilindro = cilindro_fortuna if rodada_da_fortuna else cilindro_normal
-        return int(random.choices(list(cilindro.keys()), weights=cilindro.values(), k=1)[0])
-    
-    for _ in range(rodadas_por_teste):
-        # Ativação da rodada da fortuna
-        if not rodada_da_fortuna and rodadas_fortuna == 0:
-            if random.random() < prob_fortuna:
-                rodadas_fortuna = 8
-                rodada_da_fortuna = True
-        
-        # Gera grade e calcula prêmio
-        grade = [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-        
-        # Calcula multiplicador do dragão
-        if rodada_da_fortuna:
-            mult = girar_cilindro() + girar_cilindro()
-            if random.random() < chance_terceiro:
-                mult += girar_cilindro()
-        else:
-            mult = girar_cilindro()
-        
-        # Verifica paylines
-        ganho_rodada = 0
-        for linha in paylines:
-            simbolos = [grade[x][y] for x, y in linha]
-            simbolos_reais = [s for s in simbolos if s != "🐉"]
+    while True:
+        total_ganho = 0
+        total_ajustado = 0
+        for _ in range(tamanho_bloco):
+            # Ativação da rodada da fortuna
+            if not rodada_da_fortuna and rodadas_fortuna == 0:
+                if rng.random() < prob_fortuna:
+                    rodadas_fortuna = 8
+                    rodada_da_fortuna = True
             
-            if not simbolos_reais or all(s == simbolos_reais[0] for s in simbolos_reais):
-                simbolo = simbolos_reais[0] if simbolos_reais else "🐉"
-                ganho_rodada += aposta_por_linha * symbols[simbolo]["multiplier"] * mult
-        
-        total_ganho += ganho_rodada
+            # Calcula multiplicador do dragão
+            mult = jogo.girar_cilindro(rodada_da_fortuna, rng)
+            media_mult = media_fortuna if rodada_da_fortuna else media_normal
+            
+            # Gera grade e calcula prêmio
+            ganho = jogo.premio_linhas(jogo.sortear_linhas(rng))
+            total_ganho += aposta_por_linha * ganho * mult
+            total_ajustado += aposta_por_linha * ((ganho - media_linhas) * (mult - media_mult)
+                                                  + media_linhas * media_mult)
+            
+            # Atualiza estado da rodada da fortuna
+            if rodada_da_fortuna:
+                rodadas_fortuna -= 1
+                if rodadas_fortuna <= 0:
+                    rodada_da_fortuna = False
         
-        # Atualiza estado da rodada da fortuna
-        if rodada_da_fortuna:
-            rodadas_fortuna -= 1
-            if rodadas_fortuna <= 0:
-                rodada_da_fortuna = False
-    
-    return (total_ganho / (rodadas_por_teste * aposta_total)) * 100
+        if proximo_bloco is not None:
+            proximo_bloco()
+        yield ((total_ganho / (tamanho_bloco * aposta_total)) * 100,
+               (total_ajustado / (tamanho_bloco * aposta_total)) * 100)
 
-# Busca automática pelos melhores parâmetros
-melhor_rtp = 0
-melhores_parametros = None
+def simular_blocos(params, tamanho_bloco, rng=random):
+    """RTP (%) de blocos seguidos de `tamanho_bloco` giros, com ou sem as
+    variáveis de controle"""
+    indice = 1 if variaveis_controle else 0
+    for par in simular_blocos_com_controle(params, tamanho_bloco, rng):
+        yield par[indice]
 
-for tentativa in range(tentativas_maximas):
-    params = gerar_parametros_aleatorios()
-    rtp = simular_rodadas(params)
-    
-    # Verifica se encontrou parâmetros ideais
-    if abs(rtp - rtp_alvo) < abs(melhor_rtp - rtp_alvo):
-        melhor_rtp = rtp
-        melhores_parametros = {
-            'pesos': params[0],
-            'chance_terceiro_giro': params[1],
-            'prob_rodada_fortuna': params[2],
-            'cilindro_normal': params[3],
-            'cilindro_fortuna': params[4]
-        }
-        
-        print(f"Tentativa {tentativa+1}: RTP {rtp:.2f}%")
-        
-        if abs(rtp - rtp_alvo) <= margem_erro:
-            break
-
-# Resultados finais
-print("\n⭐ Melhores parâmetros encontrados:")
-print(f"RTP Alcançado: {melhor_rtp:.2f}%")
-
-# Verificação final com 1 milhão de rodadas
-print("\n🔍 Verificação final com 1.000.000 rodadas:")
-params_verificacao = (
-    melhores_parametros['pesos'],
-    melhores_parametros['chance_terceiro_giro'],
-    melhores_parametros['prob_rodada_fortuna'],
-    melhores_parametros['cilindro_normal'],
-    melhores_parametros['cilindro_fortuna']
-)
-rodadas_por_teste = 1000000
-rtp_final = simular_rodadas(params_verificacao)
-print(f"RTP na verificação: {rtp_final:.2f}%")
-
-# Saída para implementação
-print("\n💻 Configuração final para implementação:")
-print("symbols = {")
-for simbolo, data in symbols.items():
-    print(f'    "{simbolo}": {{"multiplier": {data["multiplier"]}, "weight": {melhores_parametros["pesos"][simbolo]} }},')
-print("}")
-
-print("\n# Configurações do cilindro")
-print("cilindro_normal = {")
-for valor, peso in melhores_parametros['cilindro_normal'].items():
-    print(f'    "{valor}": {peso},')
-print("}")
-
-print("\ncilindro_fortuna = {")
-for valor, peso in melhores_parametros['cilindro_fortuna'].items():
-    print(f'    "{valor}": {peso},')
-print("}")
-
-print(f"\nchance_terceiro_giro = {melhores_parametros['chance_terceiro_giro']}")
-print(f"prob_rodada_da_fortuna = {melhores_parametros['prob_rodada_fortuna']}")
\ No newline at end of file
+def gerador_simulacao(semente):
+    if variaveis_antiteticas:
+        return RandomAntitetico(semente)
+    return random.Random(semente)
+
+def medir_reducao_variancia(params, blocos, tamanho_bloco, semente):
+    """Variância das médias dos blocos sem e com as variáveis de controle"""
+    pares = simular_blocos_com_controle(params, tamanho_bloco, gerador_simulacao(semente))
+    simples, ajustado = np.array([next(pares) for _ in range(blocos)]).T
+    return simples.mean(), ajustado.mean(), simples.var() / ajustado.var()
+
+def simular_rodadas(params, rng=random):
+    """Simula o jogo completo com todos os parâmetros"""
+    return next(simular_blocos(params, rodadas_por_teste, rng))
+
+def calcular_rtp(params, rng=random):
+    """RTP exato de longo prazo (cadeia de Markov da fortuna) ou simulado"""
+    if usar_rtp_exato:
+        pesos, chance_terceiro, prob_fortuna, cilindro_normal, cilindro_fortuna = params
+        return rtp_dragao(
+            [pesos[s] for s in symbols],
+            [dados["multiplier"] for dados in symbols.values()],
+            cilindro_normal, cilindro_fortuna, chance_terceiro, prob_fortuna,
+        )
+    return simular_rodadas(params, rng)
+
+def avaliar_candidato(args):
+    """Executado nos processos do pool: cada candidato tem a sua semente"""
+    params, semente = args
+    rng = gerador_simulacao(semente)
+    if teste_sequencial and not usar_rtp_exato:
+        return testar_sequencial(
+            simular_blocos(params, tamanho_bloco, rng), tamanho_bloco, rtp_alvo, margem_erro,
+            precisao_sequencial, rodadas_maximas_sequencial,
+        )["rtp"]
+    return calcular_rtp(params, rng)
+
+def parametros_do_vetor(v):
+    """Vetor do otimizador: pesos, cilindro normal, cilindro da fortuna (sem o 1x),
+    chance do terceiro giro em centésimos e prob. da fortuna em milésimos"""
+    n, c = len(symbols), len(base_normal)
+    pesos = dict(zip(symbols, v[:n]))
+    cilindro_normal = dict(zip(base_normal, v[n:n + c]))
+    cilindro_fortuna = {"1": 0, **dict(zip(list(base_fortuna)[1:], v[n + c:n + 2 * c - 1]))}
+    return pesos, v[-2] / 100, v[-1] / 1000, cilindro_normal, cilindro_fortuna
+
+def limites_do_vetor():
+    """Ponto de partida, faixas e restrições do vetor do otimizador"""
+    n, c = len(symbols), len(base_normal)
+    inicial = (escalar_para_pool([pesos_base[s] for s in symbols], limite_pool)
+               + list(base_normal.values()) + list(base_fortuna.values())[1:]
+               + [round(chance_terceiro_base * 100), round(prob_fortuna_base * 1000)])
+    # Mesmas faixas do sorteio: cilindros de 80% a 120% da base, chances ±20%
+    minimos = [1] * n + [max(1, int(b * 0.8)) for b in base_normal.values()] \
+        + [int(b * 0.8) for b in list(base_fortuna.values())[1:]] + [16, 16]
+    maximos = [limite_pool] * n + [int(b * 1.2) for b in base_normal.values()] \
+        + [int(b * 1.2) for b in list(base_fortuna.values())[1:]] + [24, 24]
+
+    def valido(v):
+        return pesos_validos(v[:n], limite_pool) and sum(v[n + c:n + 2 * c - 1]) > 0
+
+    return inicial, minimos, maximos, valido
+
+def otimizar_parametros():
+    """Busca determinística em todos os parâmetros inteiros contra o RTP exato"""
+    inicial, minimos, maximos, valido = limites_do_vetor()
+    vetor, rtp, avaliacoes = otimizar_inteiros(
+        lambda v: calcular_rtp(parametros_do_vetor(v)), inicial, rtp_alvo, minimos, maximos,
+        valido=valido, tolerancia=tolerancia_otimizador,
+    )
+    print(f"Otimizador: RTP {rtp:.4f}% após {avaliacoes} avaliações")
+    return rtp, vetor
+
+def metricas_do_vetor(v):
+    pesos, chance_terceiro, prob_fortuna, cilindro_normal, cilindro_fortuna = parametros_do_vetor(v)
+    return metricas_dragao(
+        [pesos[s] for s in symbols], [dados["multiplier"] for dados in symbols.values()],
+        cilindro_normal, cilindro_fortuna, chance_terceiro, prob_fortuna,
+    )
+
+def fronteira_parametros():
+    """Fronteira de Pareto, em volta do resultado do otimizador, das configurações
+    com RTP dentro da margem de erro"""
+    _, inicial = otimizar_parametros()
+    _, minimos, maximos, valido = limites_do_vetor()
+    fronteira = explorar_fronteira(
+        metricas_do_vetor, inicial, rtp_alvo, margem_erro, objetivos_pareto, minimos, maximos,
+        valido=valido, max_avaliacoes=max_avaliacoes_pareto,
+    )
+    print(f"\n📐 Fronteira de Pareto ({len(fronteira)} configurações com RTP a até {margem_erro} pp do alvo):")
+    for vetor, metricas in sorted(fronteira, key=lambda c: c[1]["desvio_padrao"]):
+        print(f"  {formatar_metricas(metricas)} | vetor {vetor}")
+    # Segue com a configuração da fronteira mais próxima do RTP alvo
+    vetor, metricas = min(fronteira, key=lambda c: abs(c[1]["rtp"] - rtp_alvo))
+    return metricas["rtp"], vetor
+
+def buscar_aleatorio():
+    """Sorteio dos parâmetros em volta da base, com os candidatos simulados em paralelo"""
+    # O RTP exato leva microssegundos: não compensa abrir processos
+    params, melhor_rtp, _ = buscar_em_paralelo(
+        gerar_parametros_aleatorios, avaliar_candidato, rtp_alvo, margem_erro, tentativas_maximas,
+        semente=semente_busca, processos=1 if usar_rtp_exato else processos, sementes_comuns=sementes_comuns,
+        ao_melhorar=lambda tentativa, rtp: print(f"Tentativa {tentativa}: RTP {rtp:.2f}%"),
+    )
+    return melhor_rtp, params
+
+def main():
+    global rodadas_por_teste
+
+    # Busca automática pelos melhores parâmetros
+    if modo_busca == "pareto":
+        melhor_rtp, vetor = fronteira_parametros()
+        params = parametros_do_vetor(vetor)
+    elif modo_busca == "otimizador":
+        melhor_rtp, vetor = otimizar_parametros()
+        params = parametros_do_vetor(vetor)
+    else:
+        melhor_rtp, params = buscar_aleatorio()
+    melhores_parametros = {
+        'pesos': params[0],
+        'chance_terceiro_giro': params[1],
+        'prob_rodada_fortuna': params[2],
+        'cilindro_normal': params[3],
+        'cilindro_fortuna': params[4]
+    }
+
+    # Resultados finais
+    print("\n⭐ Melhores parâmetros encontrados:")
+    print(f"RTP Alcançado: {melhor_rtp:.2f}%")
+
+    # Verificação final: valor exato ou 1 milhão de rodadas
+    if usar_rtp_exato:
+        print("\n🔍 Verificação final com o RTP exato:")
+    else:
+        print("\n🔍 Verificação final com 1.000.000 rodadas:")
+    params_verificacao = (
+        melhores_parametros['pesos'],
+        melhores_parametros['chance_terceiro_giro'],
+        melhores_parametros['prob_rodada_fortuna'],
+        melhores_parametros['cilindro_normal'],
+        melhores_parametros['cilindro_fortuna']
+    )
+    rodadas_por_teste = 1000000
+    rtp_final = calcular_rtp(params_verificacao, gerador_simulacao(semente_busca))
+    print(f"RTP na verificação: {rtp_final:.2f}%")
+    if not usar_rtp_exato:
+        simples, ajustado, fator = medir_reducao_variancia(
+            params_verificacao, rodadas_por_teste // tamanho_bloco, tamanho_bloco, semente_busca)
+        print(f"Por blocos de {tamanho_bloco} giros: simples {simples:.2f}%, com variáveis de controle "
+              f"{ajustado:.2f}% (variância {fator:.1f}x menor)")
+
+    # Saída para implementação
+    print("\n💻 Configuração final para implementação:")
+    print("symbols = {")
+    for simbolo, data in symbols.items():
+        print(f'    "{simbolo}": {{"multiplier": {data["multiplier"]}, "weight": {melhores_parametros["pesos"][simbolo]} }},')
+    print("}")
+
+    print("\n# Configurações do cilindro")
+    print("cilindro_normal = {")
+    for valor, peso in melhores_parametros['cilindro_normal'].items():
+        print(f'    "{valor}": {peso},')
+    print("}")
+
+    print("\ncilindro_fortuna = {")
+    for valor, peso in melhores_parametros['cilindro_fortuna'].items():
+        print(f'    "{valor}": {peso},')
+    print("}")
+
+    print(f"\nchance_terceiro_giro = {melhores_parametros['chance_terceiro_giro']}")
+    print(f"prob_rodada_da_fortuna = {melhores_parametros['prob_rodada_fortuna']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,138 +1,188 @@
+import os
 import random
+import sys
 import numpy as np
+from multiprocessing import cpu_count
 
-# Configuração dos símbolos
-symbols = {
-    "🐭": {"multiplier": 300},
-    "🏆": {"multiplier": 100},
-    "🍊": {"multiplier": 50},
-    "🔑": {"multiplier": 30},
-    "💰": {"multiplier": 15},
-    "🧧": {"multiplier": 5},
-    "🔭": {"multiplier": 3},
-}
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.rtp_exato import rtp_ratinho
+from motor.jogos import DEFINICOES, LINHAS, compilar
+from motor.metricas import formatar_metricas, metricas_ratinho
+from motor.paralelo import buscar_em_paralelo
+from motor.sequencial import testar_sequencial
+from motor.otimizacao import escalar_para_pool, explorar_fronteira, otimizar_inteiros, pesos_validos
 
-paylines = [
-    [(0,0), (0,1), (0,2)],
-    [(1,0), (1,1), (1,2)],
-    [(2,0), (2,1), (2,2)],
-    [(0,0), (1,1), (2,2)],
-    [(2,0), (1,1), (0,2)],
-]
+# Configuração dos símbolos: multiplicadores da definição do jogo (motor.jogos)
+symbols = {simbolo: {"multiplier": dados["multiplier"]}
+           for simbolo, dados in DEFINICOES["ratinho"]["symbols"].items()}
 
 # Parâmetros fixos
 aposta_total = 4.00
-linhas_ativas = len(paylines)
+linhas_ativas = LINHAS
 aposta_por_linha = aposta_total / linhas_ativas
+premio_jackpot = DEFINICOES["ratinho"]["premio_jackpot"]  # Grade toda de 🐭, em apostas por linha
 
 # Parâmetros de simulação
 rtp_alvo = 96.8
 margem_erro = 0.5
 rodadas_por_teste = 100000
 tentativas_maximas = 1000
+processos = cpu_count()  # Candidatos simulados em paralelo na busca aleatória
+semente_busca = 2024  # Mesma semente, mesmo resultado com qualquer número de processos
+teste_sequencial = True  # Na simulação, descarta o candidato assim que o intervalo de confiança sai da margem
+tamanho_bloco = 1000
+precisao_sequencial = margem_erro / 2  # Meia largura do intervalo que encerra um candidato promissor
+rodadas_maximas_sequencial = 4 * rodadas_por_teste
+usar_rtp_exato = True  # False volta para a estimativa por Monte Carlo
+modo_busca = "otimizador"  # "pareto" também olha acerto e volatilidade; "aleatoria" volta para o sorteio de ±30%
+limite_pool = 200  # Soma máxima dos pesos (tamanho do symbol_pool)
+tolerancia_otimizador = 0.01
+objetivos_pareto = {"frequencia_acerto": "max", "desvio_padrao": "min", "prob_ganho_alto": "min"}
+max_avaliacoes_pareto = 5000
+
+# Valores referenciais: centro do sorteio e ponto de partida do otimizador
+pesos_base = {
+    "🐭": 2,   
+    "🏆": 3,
+    "🍊": 5,
+    "🔑": 8,
+    "💰": 12,
+    "🧧": 30,
+    "🔭": 50
+}
+prob_fortuna_base = 0.15  # Meio da faixa sorteada (0.05 a 0.25)
 
-def gerar_pesos_balanceados():
+def gerar_pesos_balanceados(rng=random):
     """Gera pesos com base em valores referenciais + variação controlada"""
-    pesos_base = {
-        "🐭": 2,   
-        "🏆": 3,
-        "🍊": 5,
-        "🔑": 8,
-        "💰": 12,
-        "🧧": 30,
-        "🔭": 50
-    }
-    
     pesos = {}
     for simbolo, base in pesos_base.items():
-        variacao = random.uniform(0.7, 1.3)  # Variação de ±30%
+        variacao = rng.uniform(0.7, 1.3)  # Variação de ±30%
         pesos[simbolo] = max(1, int(base * variacao))
     
-    prob_fortuna = round(random.uniform(0.05, 0.25), 3)
+    prob_fortuna = round(rng.uniform(0.05, 0.25), 3)
     
     return pesos, prob_fortuna
 
-def gerar_grade_normal(symbol_pool):
-    return [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-
-def gerar_grade_rato_fortuna(symbol_pool):
-    grade = [[None for _ in range(3)] for _ in range(3)]
-    for i in range(3):
-        grade[i][1] = "🐭"  # Wild na coluna do meio
-        grade[i][0] = random.choice(symbol_pool)
-        grade[i][2] = random.choice(symbol_pool)
-    return grade
-
-def calcular_premio(grade):
-    # Jackpot especial (todos símbolos iguais)
-    todos = [s for linha in grade for s in linha]
-    if all(s == "🐭" for s in todos):
-        return aposta_por_linha * 1000
-    
-    ganho = 0
-    for linha in paylines:
-        simbolos = [grade[x][y] for x, y in linha]
-        sem_rato = [s for s in simbolos if s != "🐭"]
-        
-        if not sem_rato:
-            simbolo = "🐭"
-        elif all(s == sem_rato[0] for s in sem_rato):
-            simbolo = sem_rato[0]
-        else:
-            continue
-        
-        ganho += aposta_por_linha * symbols[simbolo]["multiplier"]
-    return ganho
-
-def simular_jogo(pesos, prob_fortuna):
-    symbol_pool = []
-    for emoji, p in pesos.items():
-        symbol_pool.extend([emoji] * p)
-
-    total_ganho = 0
+def simular_blocos(pesos, prob_fortuna, tamanho_bloco, rng=random):
+    """RTP (%) de blocos seguidos de `tamanho_bloco` giros, sem fim; o rato da
+    fortuna continua de um bloco para o outro"""
+    # O jogo com os pesos do candidato; no rato da fortuna a coluna do meio é sempre 🐭
+    jogo = compilar("ratinho", pesos=pesos, prob_fortuna=prob_fortuna)
+
     modo_fortuna = False
     rodadas_fortuna = 0
 
-    for _ in range(rodadas_por_teste):
-        if not modo_fortuna and random.random() < prob_fortuna:
-            modo_fortuna = True
-            rodadas_fortuna = 8
-
-        grade = gerar_grade_rato_fortuna(symbol_pool) if modo_fortuna else gerar_grade_normal(symbol_pool)
-        ganho = calcular_premio(grade)
-        total_ganho += ganho
-
-        if modo_fortuna:
-            rodadas_fortuna -= 1
-            if rodadas_fortuna <= 0 or ganho > 0:
-                modo_fortuna = False
-
-    return (total_ganho / (rodadas_por_teste * aposta_total)) * 100
-
-# Busca automática
-melhor_rtp = 0
-melhor_config = {}
-
-for tentativa in range(tentativas_maximas):
-    pesos, prob_fortuna = gerar_pesos_balanceados()
-    rtp = simular_jogo(pesos, prob_fortuna)
-
-    if abs(rtp - rtp_alvo) < abs(melhor_rtp - rtp_alvo):
-        melhor_rtp = rtp
-        melhor_config = {'pesos': pesos, 'prob_fortuna': prob_fortuna}
-        print(f"Tentativa {tentativa + 1}: RTP = {rtp:.2f}%")
-
-        if abs(rtp - rtp_alvo) <= margem_erro:
-            break
-
-# Validação final com 1 milhão de rodadas
-rodadas_por_teste = 1000000
-rtp_validacao = simular_jogo(melhor_config['pesos'], melhor_config['prob_fortuna'])
-
-# Saída
-print("\n✅ Configuração final encontrada:")
-print(f"RTP final: {rtp_validacao:.2f}%")
-print(f"Probabilidade da rodada do rato da fortuna: {melhor_config['prob_fortuna']}")
-print("Pesos finais dos símbolos:")
-for s, data in symbols.items():
-    print(f'    "{s}": {{"multiplier": {data["multiplier"]}, "weight": {melhor_config["pesos"][s]}}},')
\ No newline at end of file
+    while True:
+        total_ganho = 0
+        for _ in range(tamanho_bloco):
+            if not modo_fortuna and rng.random() < prob_fortuna:
+                modo_fortuna = True
+                rodadas_fortuna = 8
+
+            ganho = jogo.premio_linhas(jogo.sortear_linhas(rng, modo_fortuna)) * aposta_por_linha
+            total_ganho += ganho
+
+            if modo_fortuna:
+                rodadas_fortuna -= 1
+                if rodadas_fortuna <= 0 or ganho > 0:
+                    modo_fortuna = False
+
+        yield (total_ganho / (tamanho_bloco * aposta_total)) * 100
+
+def simular_jogo(pesos, prob_fortuna, rng=random):
+    return next(simular_blocos(pesos, prob_fortuna, rodadas_por_teste, rng))
+
+def calcular_rtp(pesos, prob_fortuna, rng=random):
+    if usar_rtp_exato:
+        multiplicadores = [dados["multiplier"] for dados in symbols.values()]
+        return rtp_ratinho([pesos[s] for s in symbols], multiplicadores, prob_fortuna, premio_jackpot,
+                           limite_rodadas=8)
+    return simular_jogo(pesos, prob_fortuna, rng)
+
+def avaliar_candidato(args):
+    """Executado nos processos do pool: cada candidato tem a sua semente"""
+    (pesos, prob_fortuna), semente = args
+    rng = random.Random(semente)
+    if teste_sequencial and not usar_rtp_exato:
+        return testar_sequencial(
+            simular_blocos(pesos, prob_fortuna, tamanho_bloco, rng), tamanho_bloco, rtp_alvo, margem_erro,
+            precisao_sequencial, rodadas_maximas_sequencial,
+        )["rtp"]
+    return calcular_rtp(pesos, prob_fortuna, rng)
+
+def otimizar_config():
+    """Busca determinística nos pesos e na prob_fortuna (em milésimos) contra o RTP exato"""
+    multiplicadores = [dados["multiplier"] for dados in symbols.values()]
+    n = len(symbols)
+
+    def rtp_do_vetor(v):
+        return rtp_ratinho(v[:n], multiplicadores, v[n] / 1000, premio_jackpot, limite_rodadas=8)
+
+    inicial = escalar_para_pool([pesos_base[s] for s in symbols], limite_pool) + [round(prob_fortuna_base * 1000)]
+    vetor, rtp, avaliacoes = otimizar_inteiros(
+        rtp_do_vetor, inicial, rtp_alvo,
+        minimos=[1] * n + [50], maximos=[limite_pool] * n + [250],
+        valido=lambda v: pesos_validos(v[:n], limite_pool),
+        tolerancia=tolerancia_otimizador,
+    )
+    print(f"Otimizador: RTP = {rtp:.4f}% após {avaliacoes} avaliações")
+    return {'pesos': dict(zip(symbols, vetor[:n])), 'prob_fortuna': vetor[n] / 1000}
+
+def fronteira_config():
+    """Fronteira de Pareto, em volta do resultado do otimizador, das configurações
+    com RTP dentro da margem de erro"""
+    multiplicadores = [dados["multiplier"] for dados in symbols.values()]
+    n = len(symbols)
+    config = otimizar_config()
+    inicial = [config['pesos'][s] for s in symbols] + [round(config['prob_fortuna'] * 1000)]
+    fronteira = explorar_fronteira(
+        lambda v: metricas_ratinho(v[:n], multiplicadores, v[n] / 1000, premio_jackpot,
+                                   limite_rodadas=8),
+        inicial, rtp_alvo, margem_erro, objetivos_pareto,
+        minimos=[1] * n + [50], maximos=[limite_pool] * n + [250],
+        valido=lambda v: pesos_validos(v[:n], limite_pool),
+        max_avaliacoes=max_avaliacoes_pareto,
+    )
+    print(f"\n📐 Fronteira de Pareto ({len(fronteira)} configurações com RTP a até {margem_erro} pp do alvo):")
+    for vetor, metricas in sorted(fronteira, key=lambda c: c[1]["desvio_padrao"]):
+        print(f"  {formatar_metricas(metricas)} | pesos {vetor[:n]}, prob_fortuna {vetor[n] / 1000}")
+    # Segue com a configuração da fronteira mais próxima do RTP alvo
+    vetor, metricas = min(fronteira, key=lambda c: abs(c[1]["rtp"] - rtp_alvo))
+    return {'pesos': dict(zip(symbols, vetor[:n])), 'prob_fortuna': vetor[n] / 1000}
+
+def buscar_aleatorio():
+    """Sorteio de variações de ±30%, com os candidatos simulados em paralelo"""
+    # O RTP exato leva cerca de 1 ms: não compensa abrir processos
+    (pesos, prob_fortuna), _, _ = buscar_em_paralelo(
+        gerar_pesos_balanceados, avaliar_candidato, rtp_alvo, margem_erro, tentativas_maximas,
+        semente=semente_busca, processos=1 if usar_rtp_exato else processos,
+        ao_melhorar=lambda tentativa, rtp: print(f"Tentativa {tentativa}: RTP = {rtp:.2f}%"),
+    )
+    return {'pesos': pesos, 'prob_fortuna': prob_fortuna}
+
+def main():
+    global rodadas_por_teste
+
+    # Busca automática
+    if modo_busca == "pareto":
+        melhor_config = fronteira_config()
+    elif modo_busca == "otimizador":
+        melhor_config = otimizar_config()
+    else:
+        melhor_config = buscar_aleatorio()
+
+    # Validação final com 1 milhão de rodadas (ou o valor exato)
+    rodadas_por_teste = 1000000
+    rtp_validacao = calcular_rtp(melhor_config['pesos'], melhor_config['prob_fortuna'],
+                                 random.Random(semente_busca))
+
+    # Saída
+    print("\n✅ Configuração final encontrada:")
+    print(f"RTP {'exato' if usar_rtp_exato else 'final'}: {rtp_validacao:.2f}%")
+    print(f"Probabilidade da rodada do rato da fortuna: {melhor_config['prob_fortuna']}")
+    print("Pesos finais dos símbolos:")
+    for s, data in symbols.items():
+        print(f'    "{s}": {{"multiplier": {data["multiplier"]}, "weight": {melhor_config["pesos"][s]}}},')
+
+if __name__ == "__main__":
+    main()
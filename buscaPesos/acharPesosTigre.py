@@ -1,28 +1,24 @@
+import os
 import random
+import sys
 import numpy as np
+from multiprocessing import cpu_count
 
-# Configuração dos símbolos
-symbols = {
-    "🐯": {"multiplier": 250},
-    "🏆": {"multiplier": 100},
-    "🍊": {"multiplier": 25},
-    "🔑": {"multiplier": 10},
-    "💰": {"multiplier": 8},
-    "🧧": {"multiplier": 5},
-    "🔭": {"multiplier": 3},
-}
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.rtp_exato import rtp_tigrinho
+from motor.jogos import DEFINICOES, LINHAS, compilar
+from motor.metricas import formatar_metricas, metricas_tigrinho
+from motor.paralelo import buscar_em_paralelo
+from motor.sequencial import testar_sequencial
+from motor.otimizacao import escalar_para_pool, explorar_fronteira, otimizar_inteiros, pesos_validos
 
-paylines = [
-    [(0,0), (0,1), (0,2)],
-    [(1,0), (1,1), (1,2)],
-    [(2,0), (2,1), (2,2)],
-    [(0,0), (1,1), (2,2)],
-    [(2,0), (1,1), (0,2)]
-]
+# Configuração dos símbolos: multiplicadores da definição do jogo (motor.jogos)
+symbols = {simbolo: {"multiplier": dados["multiplier"]}
+           for simbolo, dados in DEFINICOES["tigrinho"]["symbols"].items()}
 
 # Parâmetros fixos
 aposta_total = 4.00
-linhas_ativas = len(paylines)
+linhas_ativas = LINHAS
 aposta_por_linha = aposta_total / linhas_ativas
 
 # Parâmetros de simulação
@@ -30,87 +26,139 @@ rtp_alvo = 96.8
 margem_erro = 0.5
 rodadas_por_teste = 100000
 tentativas_maximas = 1000
+processos = cpu_count()  # Candidatos simulados em paralelo na busca aleatória
+semente_busca = 2024  # Mesma semente, mesmo resultado com qualquer número de processos
+teste_sequencial = True  # Na simulação, descarta o candidato assim que o intervalo de confiança sai da margem
+tamanho_bloco = 1000
+precisao_sequencial = margem_erro / 2  # Meia largura do intervalo que encerra um candidato promissor
+rodadas_maximas_sequencial = 4 * rodadas_por_teste
+usar_rtp_exato = True  # False volta para a estimativa por Monte Carlo
+modo_busca = "otimizador"  # "pareto" também olha acerto e volatilidade; "aleatoria" volta para o sorteio de ±30%
+limite_pool = 200  # Soma máxima dos pesos (tamanho do symbol_pool)
+tolerancia_otimizador = 0.01
+objetivos_pareto = {"frequencia_acerto": "max", "desvio_padrao": "min", "prob_ganho_alto": "min"}
+max_avaliacoes_pareto = 5000
+
+# Valores referenciais: centro do sorteio e ponto de partida do otimizador
+pesos_base = {
+    "🐯": 1,
+    "🏆": 2,
+    "🍊": 4,
+    "🔑": 8,
+    "💰": 10,
+    "🧧": 20,
+    "🔭": 30
+}
 
-def gerar_pesos_balanceados():
+def gerar_pesos_balanceados(rng=random):
     """Gera pesos com base em valores referenciais + variação controlada"""
-    pesos_base = {
-        "🐯": 1,
-        "🏆": 2,
-        "🍊": 4,
-        "🔑": 8,
-        "💰": 10,
-        "🧧": 20,
-        "🔭": 30
-    }
-    
     pesos = {}
     for simbolo, base in pesos_base.items():
-        variacao = random.uniform(0.7, 1.3)  # Variação de ±30%
+        variacao = rng.uniform(0.7, 1.3)  # Variação de ±30%
         pesos[simbolo] = max(1, int(base * variacao))
     
     return pesos
 
-def gerar_grade(symbol_pool):
-    return [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-
-def calcular_premio(grade):
-    ganho_total = 0
-    simbolos_na_grade = [s for linha in grade for s in linha if s != "🐯"]
-    simbolos_distintos = set(simbolos_na_grade)
-    multiplicador_bonus = 10 if len(simbolos_distintos) <= 1 else 1
-
-    for linha in paylines:
-        simbolos = [grade[x][y] for x, y in linha]
-        simbolos_reais = [s for s in simbolos if s != "🐯"]
-
-        if not simbolos_reais or all(s == simbolos_reais[0] for s in simbolos_reais):
-            simbolo_vencedor = simbolos_reais[0] if simbolos_reais else "💰"
-            multiplicador = symbols[simbolo_vencedor]["multiplier"]
-            ganho_total += aposta_por_linha * multiplicador * multiplicador_bonus
-
-    return ganho_total
-
-def simular_rtp(pesos):
-    symbol_pool = []
-    for emoji, peso in pesos.items():
-        symbol_pool.extend([emoji] * peso)
-    
-    total_ganho = 0
-    for _ in range(rodadas_por_teste):
-        grade = gerar_grade(symbol_pool)
-        total_ganho += calcular_premio(grade)
-    
-    return (total_ganho / (rodadas_por_teste * aposta_total)) * 100
-
-# Busca automática
-melhor_rtp = 0
-melhores_pesos = {}
-
-for tentativa in range(tentativas_maximas):
-    pesos = gerar_pesos_balanceados()
-    rtp = simular_rtp(pesos)
-
-    if abs(rtp - rtp_alvo) < abs(melhor_rtp - rtp_alvo):
-        melhor_rtp = rtp
-        melhores_pesos = pesos
-        print(f"Tentativa {tentativa+1}: RTP {rtp:.2f}%")
-
-        if abs(rtp - rtp_alvo) <= margem_erro:
-            break
-
-# Verificação final com 1 milhão de rodadas
-rodadas_por_teste = 1000000
-rtp_final = simular_rtp(melhores_pesos)
-
-# Resultados
-print("\n📊 Resultado Final:")
-print(f"RTP na verificação: {rtp_final:.2f}%")
-print("\n🔢 Pesos finais sugeridos:")
-for simbolo, peso in melhores_pesos.items():
-    print(f"{simbolo}: peso {peso}")
-
-print("\n💻 Configuração final:")
-print("symbols = {")
-for simbolo, dados in symbols.items():
-    print(f'    "{simbolo}": {{"multiplier": {dados["multiplier"]}, "weight": {melhores_pesos[simbolo]} }},')
-print("}")
\ No newline at end of file
+def simular_blocos(pesos, tamanho_bloco, rng=random):
+    """RTP (%) de blocos seguidos de `tamanho_bloco` giros, sem fim"""
+    # O jogo com os pesos do candidato; cada linha da grade é um código base 7 (ver motor.tabelas)
+    jogo = compilar("tigrinho", pesos=pesos)
+
+    while True:
+        total_ganho = 0
+        for _ in range(tamanho_bloco):
+            total_ganho += jogo.premio_linhas(jogo.sortear_linhas(rng))
+        yield (total_ganho * aposta_por_linha / (tamanho_bloco * aposta_total)) * 100
+
+def simular_rtp(pesos, rng=random):
+    return next(simular_blocos(pesos, rodadas_por_teste, rng))
+
+def calcular_rtp(pesos, rng=random):
+    if usar_rtp_exato:
+        multiplicadores = [dados["multiplier"] for dados in symbols.values()]
+        return rtp_tigrinho([pesos[s] for s in symbols], multiplicadores)
+    return simular_rtp(pesos, rng)
+
+def avaliar_candidato(args):
+    """Executado nos processos do pool: cada candidato tem a sua semente"""
+    pesos, semente = args
+    rng = random.Random(semente)
+    if teste_sequencial and not usar_rtp_exato:
+        return testar_sequencial(
+            simular_blocos(pesos, tamanho_bloco, rng), tamanho_bloco, rtp_alvo, margem_erro,
+            precisao_sequencial, rodadas_maximas_sequencial,
+        )["rtp"]
+    return calcular_rtp(pesos, rng)
+
+def otimizar_pesos():
+    """Busca determinística em pesos inteiros contra o RTP exato"""
+    multiplicadores = [dados["multiplier"] for dados in symbols.values()]
+    vetor, rtp, avaliacoes = otimizar_inteiros(
+        lambda v: rtp_tigrinho(v, multiplicadores),
+        escalar_para_pool([pesos_base[s] for s in symbols], limite_pool), rtp_alvo,
+        minimos=[1] * len(symbols), maximos=[limite_pool] * len(symbols),
+        valido=lambda v: pesos_validos(v, limite_pool),
+        tolerancia=tolerancia_otimizador,
+    )
+    print(f"Otimizador: RTP {rtp:.4f}% após {avaliacoes} avaliações")
+    return dict(zip(symbols, vetor)), rtp
+
+def fronteira_pesos():
+    """Fronteira de Pareto, em volta do resultado do otimizador, das configurações
+    com RTP dentro da margem de erro"""
+    multiplicadores = [dados["multiplier"] for dados in symbols.values()]
+    pesos, _ = otimizar_pesos()
+    fronteira = explorar_fronteira(
+        lambda v: metricas_tigrinho(v, multiplicadores),
+        [pesos[s] for s in symbols], rtp_alvo, margem_erro, objetivos_pareto,
+        minimos=[1] * len(symbols), maximos=[limite_pool] * len(symbols),
+        valido=lambda v: pesos_validos(v, limite_pool),
+        max_avaliacoes=max_avaliacoes_pareto,
+    )
+    print(f"\n📐 Fronteira de Pareto ({len(fronteira)} configurações com RTP a até {margem_erro} pp do alvo):")
+    for vetor, metricas in sorted(fronteira, key=lambda c: c[1]["desvio_padrao"]):
+        print(f"  {formatar_metricas(metricas)} | pesos {vetor}")
+    # Segue com a configuração da fronteira mais próxima do RTP alvo
+    vetor, metricas = min(fronteira, key=lambda c: abs(c[1]["rtp"] - rtp_alvo))
+    return dict(zip(symbols, vetor)), metricas["rtp"]
+
+def buscar_aleatorio():
+    """Sorteio de variações de ±30%, com os candidatos simulados em paralelo"""
+    # O RTP exato leva microssegundos: não compensa abrir processos
+    melhores_pesos, melhor_rtp, _ = buscar_em_paralelo(
+        gerar_pesos_balanceados, avaliar_candidato, rtp_alvo, margem_erro, tentativas_maximas,
+        semente=semente_busca, processos=1 if usar_rtp_exato else processos,
+        ao_melhorar=lambda tentativa, rtp: print(f"Tentativa {tentativa}: RTP {rtp:.2f}%"),
+    )
+    return melhores_pesos, melhor_rtp
+
+def main():
+    global rodadas_por_teste
+
+    # Busca automática
+    if modo_busca == "pareto":
+        melhores_pesos, melhor_rtp = fronteira_pesos()
+    elif modo_busca == "otimizador":
+        melhores_pesos, melhor_rtp = otimizar_pesos()
+    else:
+        melhores_pesos, melhor_rtp = buscar_aleatorio()
+
+    # Verificação final: valor exato ou 1 milhão de rodadas
+    rodadas_por_teste = 1000000
+    rtp_final = calcular_rtp(melhores_pesos, random.Random(semente_busca))
+
+    # Resultados
+    print("\n📊 Resultado Final:")
+    print(f"RTP {'exato' if usar_rtp_exato else 'na verificação'}: {rtp_final:.2f}%")
+    print("\n🔢 Pesos finais sugeridos:")
+    for simbolo, peso in melhores_pesos.items():
+        print(f"{simbolo}: peso {peso}")
+
+    print("\n💻 Configuração final:")
+    print("symbols = {")
+    for simbolo, dados in symbols.items():
+        print(f'    "{simbolo}": {{"multiplier": {dados["multiplier"]}, "weight": {melhores_pesos[simbolo]} }},')
+    print("}")
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,33 @@
 import random
 import os
+import sys
 import msvcrt
 
-# Configuração dos símbolos e pesos ajustados para RTP ≈ 96.8%
-symbols = {
-    "🐉": {"multiplier": 100, "weight": 1 },
-    "🏆": {"multiplier": 50, "weight": 2 },
-    "🍊": {"multiplier": 25, "weight": 8 },
-    "🔑": {"multiplier": 10, "weight": 20 },
-    "💰": {"multiplier": 5, "weight": 30 },
-    "🧧": {"multiplier": 3, "weight": 39 },
-    "🔭": {"multiplier": 2, "weight": 61 },
-}
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.jogos import LINHAS, compilar
 
-
-
-# Geração do pool de símbolos com base nos pesos
-symbol_pool = []
-for emoji, data in symbols.items():
-    symbol_pool.extend([emoji] * data["weight"])
-
-# Paylines (linhas premiadas)
-paylines = [
-    [(0,0), (0,1), (0,2)],
-    [(1,0), (1,1), (1,2)],
-    [(2,0), (2,1), (2,2)],
-    [(0,0), (1,1), (2,2)],
-    [(2,0), (1,1), (0,2)]
-]
+# Símbolos, pesos, cilindros e regras: definição compartilhada por todas as ferramentas (motor.jogos)
+jogo = compilar("dragao")
 
 # Parâmetros do jogo
 saldo = 264.00
 aposta_total =4.00
-linhas_ativas = len(paylines) 
+linhas_ativas = LINHAS
 aposta_por_linha = aposta_total / linhas_ativas
 rodadas = 0
 total_ganho = 0
 rodada_da_fortuna = False  
-
-#Usado para criar a probabilidade do terceiro multiplicador nas rodadas da fortuna
-chance_terceiro_giro = 0.21
-prob_rodada_da_fortuna = 0.03
 rodadas_fortuna = 0
 
 
 # Funções principais
-def gerar_grade():
-    return [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-
-# Girar Cilindro (Exclusivo do Fortune Dragon)
-
-def girar_cilindro():
-    cylinder = {
-        "1":  {"multiplier": 1,  "weight": 0 if rodada_da_fortuna else 10},
-        "2":  {"multiplier": 2,  "weight": 12 if rodada_da_fortuna else 24},
-        "5":  {"multiplier": 5,  "weight": 5 if rodada_da_fortuna else 15},
-        "10": {"multiplier": 10, "weight": 3  if rodada_da_fortuna else 4},
-    }
-    opcoes = list(cylinder.keys())
-    pesos = [cylinder[key]["weight"] for key in opcoes]
-    return int(random.choices(opcoes, weights=pesos, k=1)[0])
-
 def acionar_fortuna():
-    global prob_rodada_da_fortuna, rodadas_fortuna
-    if random.random() < prob_rodada_da_fortuna:
-        rodadas_fortuna = 8
+    global rodadas_fortuna
+    if random.random() < jogo.prob_fortuna:
+        rodadas_fortuna = jogo.rodadas_fortuna
         return True
     return False
 
-
-def calcular_premio(grade):
-    global visualizar_multi, rodadas_fortuna
-    multiplicador_dragao = (
-        (girar_cilindro() + girar_cilindro() + (girar_cilindro() if random.random() < chance_terceiro_giro else 0))
-        if rodada_da_fortuna
-        else girar_cilindro()
-    )
-    visualizar_multi = multiplicador_dragao
-    ganho_total = 0
-    # Verifica a quantidade de símbolos únicos 
-    for linha in paylines:
-        simbolos = [grade[x][y] for x, y in linha]
-        simbolos_reais = [s for s in simbolos if s != "🐉"]
-
-        if not simbolos_reais or all(s == simbolos_reais[0] for s in simbolos_reais):
-            if simbolos_reais:
-                simbolo_vencedor = simbolos_reais[0]
-            else:
-                simbolo_vencedor = "🐉"
-            multiplicador = symbols[simbolo_vencedor]["multiplier"]
-            ganho_total += aposta_por_linha * multiplicador * multiplicador_dragao
-
-    return ganho_total
-
 def mostrar_grade(grade):
     for linha in grade:
         print(" | ".join(linha))
@@ -113,8 +48,10 @@ while saldo >= aposta_total:
             rodada_da_fortuna = True
 
     os.system('cls' if os.name == 'nt' else 'clear')
-    grade = gerar_grade()
-    ganho = calcular_premio(grade)
+    linhas = jogo.sortear_linhas()
+    grade = jogo.grade(linhas)
+    visualizar_multi = jogo.girar_cilindro(rodada_da_fortuna)
+    ganho = jogo.premio_linhas(linhas) * visualizar_multi * aposta_por_linha
     
     # Decrementa as rodadas da fortuna após o cálculo do prêmio
     if rodada_da_fortuna:
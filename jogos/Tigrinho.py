@@ -1,67 +1,23 @@
-import random
 import os
+import sys
 import time
 import msvcrt
 
-# Configuração dos símbolos e pesos ajustados para RTP ≈ 96.8%
-symbols = {
-    "🐯": {"multiplier": 250, "weight": 1 },
-    "🏆": {"multiplier": 100, "weight": 2 },
-    "🍊": {"multiplier": 25, "weight": 5 },
-    "🔑": {"multiplier": 10, "weight": 4 },
-    "💰": {"multiplier": 8, "weight": 7 },
-    "🧧": {"multiplier": 5, "weight": 12 },
-    "🔭": {"multiplier": 3, "weight": 44 },
-}
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.jogos import LINHAS, compilar
 
-# Geração do pool de símbolos com base nos pesos
-symbol_pool = []
-for emoji, data in symbols.items():
-    symbol_pool.extend([emoji] * data["weight"])
-
-# Paylines (linhas premiadas)
-paylines = [
-    [(0,0), (0,1), (0,2)],
-    [(1,0), (1,1), (1,2)],
-    [(2,0), (2,1), (2,2)],
-    [(0,0), (1,1), (2,2)],
-    [(2,0), (1,1), (0,2)]
-]
+# Símbolos, pesos e regras: definição compartilhada por todas as ferramentas (motor.jogos)
+jogo = compilar("tigrinho")
 
 # Parâmetros do jogo
 saldo = 264.00
 aposta_total =4.00
-linhas_ativas = len(paylines)
+linhas_ativas = LINHAS
 aposta_por_linha = aposta_total / linhas_ativas
 rodadas = 0
 total_ganho = 0
 
 # Funções principais
-def gerar_grade():
-    return [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-
-def calcular_premio(grade):
-    ganho_total = 0
-
-    # Verifica a quantidade de símbolos únicos (ignorando tigres)
-    simbolos_na_grade = [s for linha in grade for s in linha if s != "🐯"]
-    simbolos_distintos = set(simbolos_na_grade)
-    multiplicador_bonus = 10 if len(simbolos_distintos) <= 1 else 1
-
-    for linha in paylines:
-        simbolos = [grade[x][y] for x, y in linha]
-        simbolos_reais = [s for s in simbolos if s != "🐯"]
-
-        if not simbolos_reais or all(s == simbolos_reais[0] for s in simbolos_reais):
-            if simbolos_reais:
-                simbolo_vencedor = simbolos_reais[0]
-            else:
-                simbolo_vencedor = "🐯"
-            multiplicador = symbols[simbolo_vencedor]["multiplier"]
-            ganho_total += aposta_por_linha * multiplicador * multiplicador_bonus
-
-    return ganho_total
-
 def mostrar_grade(grade):
     for linha in grade:
         print(" | ".join(linha))
@@ -77,8 +33,9 @@ while saldo >= aposta_total:
             continue
 
     os.system('cls' if os.name == 'nt' else 'clear')
-    grade = gerar_grade()
-    ganho = calcular_premio(grade)
+    linhas = jogo.sortear_linhas()
+    grade = jogo.grade(linhas)
+    ganho = jogo.premio_linhas(linhas) * aposta_por_linha
     saldo -= aposta_total
     saldo += ganho
     total_ganho += ganho
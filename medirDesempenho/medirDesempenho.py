@@ -0,0 +1,329 @@
+"""Velocidade dos jogos, das campanhas e das buscas de pesos em cada motor,
+gravada em JSON para acompanhar o desempenho ao longo do tempo na mesma máquina.
+
+- giros/s de cada jogo: sorteio da grade (e do cilindro, no Dragão) e cálculo
+  do prêmio, separados, no laço em Python e no motor vetorizado; leitura dos
+  prêmios de uma fita pré-gerada (motor.fitas); giros das
+  rodadas grátis, com a fortuna, no núcleo compilado (lá as duas etapas não se
+  separam); e o motor vetorizado dividido entre os processos do pool;
+- jogadores/s de cada script de simularBonusDeposito, simularCashback e
+  simularRodadasGratis: laço em Python, núcleo compilado, motor da população
+  e motor da população no pool;
+- candidatos/s de cada script de buscaPesos: RTP exato, Monte Carlo e Monte
+  Carlo no pool.
+
+Os scripts são importados como estão e rodam as suas próprias funções de lote
+(`simular_lote`, `avaliar_candidato`); só as chaves que escolhem o motor são
+trocadas. Cada caso roda uma vez para aquecer (o Numba compila na primeira
+chamada) e depois `repeticoes` vezes, ficando a melhor marca. Casos que não
+dá para medir aqui (núcleo sem Numba, pool com um processo só) entram no
+arquivo com o motivo.
+"""
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from multiprocessing import cpu_count
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from motor import nucleo
+from motor.estatisticas import Acumulador
+from motor.fitas import MODOS, FitaGiros, caminho_fita
+from motor.jogos import compilar
+from motor.paralelo import mapear_lotes
+from motor.populacao import Jogo
+from motor.sementes import LOTE, gerador_numpy, gerador_python, semente_derivada
+
+# Os scripts são importados pelo nome do arquivo, também nos processos do pool
+PASTAS_SCRIPTS = ("simularBonusDeposito", "simularCashback", "simularRodadasGratis", "buscaPesos")
+for pasta in PASTAS_SCRIPTS:
+    sys.path.insert(0, os.path.join(RAIZ, pasta))
+
+# === Configurações das medições ===
+repeticoes = 3  # Cada caso roda N vezes depois do aquecimento; fica a melhor marca
+processos = cpu_count()  # Processos dos casos "pool"
+semente = 2024
+secoes = ("giros", "jogadores", "candidatos")
+giros = {"python": 200000, "vetorizado": 2000000, "compilado": 2000000}  # Giros por medição; no pool, vetorizado por processo
+jogadores = {"python": 200, "compilado": 2000, "vetorizado": 10000}  # Jogadores por medição; no pool, vetorizado por processo
+candidatos = {"exato": 200, "monte_carlo": 4}  # Candidatos por medição; no pool, monte_carlo por processo
+rodadas_por_candidato = 100000  # rodadas_por_teste das buscas no Monte Carlo
+pasta_resultados = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+# Populações das campanhas, como no main de cada script
+media_salario = 354
+media_aposta = 12
+max_rodadas = 10000
+
+JOGOS = ("tigrinho", "ratinho", "dragao")
+CAMPANHAS = {
+    "simularBonusDeposito": ("Tigrinho", "Rato", "Dragao"),
+    "simularCashback": ("cashbackTigrinho", "cashbackRato", "cashbackDragao"),
+    "simularRodadasGratis": ("rodadasGratisTigre", "rodadasGratisRato", "rodadasGratisDragao"),
+}
+BUSCAS = {
+    "acharPesosTigre": "gerar_pesos_balanceados",
+    "acharPesosRato": "gerar_pesos_balanceados",
+    "acharPesosDragao": "gerar_parametros_aleatorios",
+}
+
+# Chaves de cada script que escolhem o motor
+MOTORES_CAMPANHA = {
+    "python": {"usar_motor_populacao": False, "usar_nucleo_compilado": False},
+    "compilado": {"usar_motor_populacao": False, "usar_nucleo_compilado": True},
+    "vetorizado": {"usar_motor_populacao": True},
+}
+MOTORES_BUSCA = {
+    "exato": {"usar_rtp_exato": True},
+    "monte_carlo": {"usar_rtp_exato": False, "teste_sequencial": False, "rodadas_por_teste": rodadas_por_candidato},
+}
+
+
+def medir(funcao):
+    """Melhor tempo, em segundos, de `repeticoes` chamadas de `funcao` depois de uma de aquecimento."""
+    funcao()
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def registro(quantidade, segundos, **campos):
+    return {**campos, "quantidade": quantidade, "segundos": segundos, "por_segundo": quantidade / segundos}
+
+
+def indisponivel(motivo, **campos):
+    return {**campos, "disponivel": False, "motivo": motivo}
+
+
+def motivo_pool():
+    return None if processos > 1 else "pool com um processo só"
+
+
+def executar(tarefa):
+    """Executado nos processos do pool: aplica as chaves do motor no script e
+    chama uma das suas funções de lote."""
+    nome, chaves, funcao, argumento = tarefa
+    modulo = importlib.import_module(nome)
+    vars(modulo).update(chaves)
+    return getattr(modulo, funcao)(argumento)
+
+
+# === Giros ===
+
+def sortear_giros(jogo, n, rng):
+    """Grades (e multiplicadores do cilindro, no Dragão) de N giros normais."""
+    if jogo.nome == "dragao":
+        return [(jogo.sortear_linhas(rng), jogo.girar_cilindro(False, rng)) for _ in range(n)]
+    return [(jogo.sortear_linhas(rng), 1) for _ in range(n)]
+
+
+def pagar_giros(jogo, sorteados):
+    premio = jogo.premio_linhas
+    return sum(premio(linhas) * multiplicador for linhas, multiplicador in sorteados)
+
+
+def sortear_lote(jogo, n, rng):
+    linhas = jogo.gerar_linhas(n, rng)
+    if jogo.nome == "dragao":
+        return linhas, jogo.girar_cilindros(np.zeros(n, dtype=bool), rng)
+    return linhas, 1
+
+
+def pagar_lote(jogo, sorteados):
+    linhas, multiplicadores = sorteados
+    return float((jogo.premios(linhas) * multiplicadores).sum())
+
+
+def giros_no_pool(tarefa):
+    """Executado nos processos do pool: sorteia e paga um lote vetorizado."""
+    nome, n, indice = tarefa
+    jogo = compilar(nome)
+    return pagar_lote(jogo, sortear_lote(jogo, n, gerador_numpy(semente, LOTE, indice)))
+
+
+def medir_giros():
+    resultados = []
+    for nome in JOGOS:
+        jogo = compilar(nome)
+
+        n = giros["python"]
+        sorteados = sortear_giros(jogo, n, gerador_python(semente, LOTE, 0))
+        resultados.append(registro(n, medir(lambda: sortear_giros(jogo, n, gerador_python(semente, LOTE, 0))),
+                                   jogo=nome, motor="python", etapa="sorteio"))
+        resultados.append(registro(n, medir(lambda: pagar_giros(jogo, sorteados)),
+                                   jogo=nome, motor="python", etapa="pagamento"))
+
+        n = giros["vetorizado"]
+        sorteados = sortear_lote(jogo, n, gerador_numpy(semente, LOTE, 0))
+        resultados.append(registro(n, medir(lambda: sortear_lote(jogo, n, gerador_numpy(semente, LOTE, 0))),
+                                   jogo=nome, motor="vetorizado", etapa="sorteio"))
+        resultados.append(registro(n, medir(lambda: pagar_lote(jogo, sorteados)),
+                                   jogo=nome, motor="vetorizado", etapa="pagamento"))
+
+        # Prêmios lidos de uma fita pré-gerada (motor.fitas), gerada fora da medição. A fita tem o
+        # dobro dos giros lidos, não o tamanho padrão, e é apagada no fim: a medição não deixa
+        # centenas de MB em motor/cache/
+        fita = FitaGiros(jogo, 2 * n, semente).carregar()
+        normais = np.zeros(n, dtype=bool)
+        resultados.append(registro(n, medir(lambda: fita.ler(normais, gerador_numpy(semente, LOTE, 0))),
+                                   jogo=nome, motor="fita", etapa="leitura"))
+        fita.fitas = None  # Fecha os mapas antes de apagar os arquivos (no Windows não dá com eles abertos)
+        for modo in MODOS[:1] if nome == "tigrinho" else MODOS:
+            os.remove(caminho_fita(jogo, modo, fita.giros, fita.semente))
+
+        if nucleo.DISPONIVEL:
+            # Rodadas grátis com 1000 jogadores: o giro inteiro, com a fortuna e o acumulador por giro
+            n = giros["compilado"]
+            jogo_populacao = Jogo(jogo, fortuna_apos_giro_normal=(nome == "dragao"))
+            segundos = medir(lambda: nucleo.sessoes_rodadas_gratis(jogo_populacao, semente, 0, 1000, n // 1000,
+                                                                   0.5, Acumulador()))
+            resultados.append(registro(n // 1000 * 1000, segundos, jogo=nome, motor="compilado", etapa="giro"))
+        else:
+            resultados.append(indisponivel("Numba não instalado", jogo=nome, motor="compilado", etapa="giro"))
+
+        if motivo_pool():
+            resultados.append(indisponivel(motivo_pool(), jogo=nome, motor="pool", etapa="giro"))
+        else:
+            n = giros["vetorizado"]
+            tarefas = [(nome, n, k) for k in range(processos)]
+            segundos = medir(lambda: list(mapear_lotes(giros_no_pool, tarefas, processos)))
+            resultados.append(registro(n * processos, segundos, jogo=nome, motor="pool", etapa="giro",
+                                       processos=processos))
+    return resultados
+
+
+# === Jogadores ===
+
+def tarefas_campanha(modulo, campanha, num_jogadores):
+    """Tarefas de `simular_lote`, como no main de cada script."""
+    tamanho = modulo.TAMANHO_LOTE
+    inicios = list(enumerate(range(0, num_jogadores, tamanho)))
+    if campanha == "simularBonusDeposito":
+        saldos, apostas = modulo.sortear_populacao(num_jogadores, media_salario, media_aposta)
+        return [(k, i, saldos[i:i + tamanho], apostas[i:i + tamanho], max_rodadas) for k, i in inicios]
+    if campanha == "simularCashback":
+        saldos = modulo.sortear_saldos(num_jogadores, media_salario)
+        return [(k, i, saldos[i:i + tamanho]) for k, i in inicios]
+    return [(k, i, min(tamanho, num_jogadores - i)) for k, i in inicios]
+
+
+def medir_jogadores():
+    resultados = []
+    for campanha, nomes in CAMPANHAS.items():
+        for nome in nomes:
+            modulo = importlib.import_module(nome)
+            casos = dict(MOTORES_CAMPANHA)
+            casos["pool"] = MOTORES_CAMPANHA["vetorizado"]
+            for motor, chaves in casos.items():
+                campos = {"campanha": campanha, "script": nome, "motor": motor}
+                if motor == "compilado" and not nucleo.DISPONIVEL:
+                    resultados.append(indisponivel("Numba não instalado", **campos))
+                    continue
+                if motor == "pool" and motivo_pool():
+                    resultados.append(indisponivel(motivo_pool(), **campos))
+                    continue
+
+                if motor == "pool":
+                    num_jogadores = jogadores["vetorizado"] * processos
+                    tarefas = [(nome, chaves, "simular_lote", tarefa)
+                               for tarefa in tarefas_campanha(modulo, campanha, num_jogadores)]
+                    segundos = medir(lambda: list(mapear_lotes(executar, tarefas, processos)))
+                    campos["processos"] = processos
+                else:
+                    num_jogadores = jogadores[motor]
+                    tarefas = [(nome, chaves, "simular_lote", tarefa)
+                               for tarefa in tarefas_campanha(modulo, campanha, num_jogadores)]
+                    segundos = medir(lambda: list(map(executar, tarefas)))
+                resultados.append(registro(num_jogadores, segundos, **campos))
+    return resultados
+
+
+# === Candidatos das buscas de pesos ===
+
+def medir_candidatos():
+    resultados = []
+    for nome, gerar in BUSCAS.items():
+        modulo = importlib.import_module(nome)
+        rng = gerador_python(semente, LOTE, 0)
+        gerados = [getattr(modulo, gerar)(rng) for _ in range(max(candidatos["exato"],
+                                                                  candidatos["monte_carlo"] * processos))]
+        casos = dict(MOTORES_BUSCA)
+        casos["pool"] = MOTORES_BUSCA["monte_carlo"]
+        for motor, chaves in casos.items():
+            campos = {"script": nome, "motor": motor}
+            if motor == "pool" and motivo_pool():
+                resultados.append(indisponivel(motivo_pool(), **campos))
+                continue
+            quantidade = candidatos["monte_carlo"] * processos if motor == "pool" else candidatos[motor]
+            tarefas = [(nome, chaves, "avaliar_candidato", (candidato, semente_derivada(semente, i)))
+                       for i, candidato in enumerate(gerados[:quantidade])]
+            if motor == "pool":
+                segundos = medir(lambda: list(mapear_lotes(executar, tarefas, processos)))
+                campos["processos"] = processos
+            else:
+                segundos = medir(lambda: list(map(executar, tarefas)))
+            if motor != "exato":
+                campos["rodadas_por_candidato"] = rodadas_por_candidato
+            resultados.append(registro(quantidade, segundos, **campos))
+    return resultados
+
+
+def maquina():
+    """O que muda os números de uma execução para outra."""
+    try:
+        versao = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        versao = None
+    try:
+        import numba
+        versao_numba = numba.__version__
+    except ImportError:
+        versao_numba = None
+    return {
+        "sistema": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "nucleos": cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": versao_numba,
+        "commit": versao,
+    }
+
+
+def main():
+    medicoes = {"giros": medir_giros, "jogadores": medir_jogadores, "candidatos": medir_candidatos}
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "maquina": maquina(),
+        "configuracao": {"repeticoes": repeticoes, "processos": processos, "semente": semente},
+    }
+    for secao in secoes:
+        print(f"Medindo {secao}...")
+        relatorio[secao] = medicoes[secao]()
+        for caso in relatorio[secao]:
+            rotulo = " | ".join(str(v) for k, v in caso.items()
+                                if k in ("jogo", "campanha", "script", "motor", "etapa"))
+            if caso.get("disponivel") is False:
+                print(f"  {rotulo}: {caso['motivo']}")
+            else:
+                print(f"  {rotulo}: {caso['por_segundo']:,.0f}/s")
+
+    os.makedirs(pasta_resultados, exist_ok=True)
+    caminho = os.path.join(pasta_resultados, f"desempenho_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {caminho}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Rotinas compartilhadas pelos scripts de jogos, busca de pesos e simulações de promoções."""
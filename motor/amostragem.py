@@ -0,0 +1,65 @@
+"""Sorteio ponderado em O(1) pelo método alias (Walker/Vose).
+
+A tabela é montada uma vez por configuração de pesos e serve tanto para sorteios
+individuais (`random` do Python) quanto para lotes com NumPy. Os pesos podem ser
+fracionários, ao contrário do `symbol_pool` expandido por repetição.
+"""
+import random
+
+import numpy as np
+
+
+class AmostradorAlias:
+    def __init__(self, pesos, valores=None):
+        pesos = [float(p) for p in pesos]
+        if any(p < 0 for p in pesos) or sum(pesos) <= 0:
+            raise ValueError("Os pesos precisam ser não negativos e com soma positiva")
+
+        n = len(pesos)
+        total = sum(pesos)
+        escala = [p * n / total for p in pesos]
+        prob = [1.0] * n
+        alias = list(range(n))
+        pequenos = [i for i, e in enumerate(escala) if e < 1.0]
+        grandes = [i for i, e in enumerate(escala) if e >= 1.0]
+        while pequenos and grandes:
+            menor = pequenos.pop()
+            maior = grandes.pop()
+            prob[menor] = escala[menor]
+            alias[menor] = maior
+            escala[maior] -= 1.0 - escala[menor]
+            (pequenos if escala[maior] < 1.0 else grandes).append(maior)
+        # O que sobra nas listas tem probabilidade 1 (apenas erro de arredondamento)
+
+        self.n = n
+        self.valores = list(valores) if valores is not None else list(range(n))
+        self.prob = prob
+        self.alias = alias
+        self._prob = np.array(prob)
+        self._alias = np.array(alias, dtype=np.intp)
+        self._valores = np.array(self.valores)
+
+    @classmethod
+    def de_dicionario(cls, pesos_por_valor, converter=None):
+        """Para dicionários como os cilindros: {"2": peso, ...}."""
+        valores = list(pesos_por_valor)
+        if converter is not None:
+            valores = [converter(v) for v in valores]
+        return cls(list(pesos_por_valor.values()), valores)
+
+    def sortear_indice(self, rng=random):
+        u = rng.random() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def sortear(self, rng=random):
+        return self.valores[self.sortear_indice(rng)]
+
+    def sortear_indices(self, tamanho, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        u = rng.random(tamanho) * self.n
+        i = u.astype(np.intp)
+        return np.where(u - i < self._prob[i], i, self._alias[i])
+
+    def sortear_lote(self, tamanho, rng=None):
+        return self._valores[self.sortear_indices(tamanho, rng)]
@@ -0,0 +1,88 @@
+"""Resultados por jogador em colunas de tamanho fixo, gravados lote a lote.
+
+Cada coluna é um .npy (float64, int32, bool...) num diretório, com um
+`metadados.json` que diz as colunas, o total de jogadores e a configuração
+da campanha. Os arquivos são criados com o tamanho da campanha inteira e cada
+lote escreve a sua fatia pelo mapeamento em memória, na posição do seu
+primeiro jogador: a memória do processo não cresce com o número de jogadores
+e uma campanha retomada (motor.retomada) continua escrevendo nos mesmos
+arquivos. Um .npz não serve: não dá para acrescentar a ele aos pedaços nem
+mapeá-lo em memória.
+
+`carregar_colunas` devolve as colunas mapeadas em memória (np.load com
+mmap_mode), então estatísticas novas sobre um milhão de jogadores saem em
+segundos, sem simular de novo:
+
+    colunas = carregar_colunas("simularBonusDeposito/jogadores")
+    np.percentile(colunas["lucro_inicial"], [5, 50, 95])
+"""
+import json
+import os
+
+import numpy as np
+
+METADADOS = "metadados.json"
+
+
+class GravadorColunas:
+    """Escreve as colunas de `total` jogadores em `diretorio`; `colunas` é
+    {nome: dtype}. Com `continuar`, reabre os arquivos de uma gravação
+    interrompida em vez de criá-los de novo. `metadados` vai para o JSON."""
+
+    def __init__(self, diretorio, colunas, total, continuar=False, **metadados):
+        self.diretorio = diretorio
+        self.total = int(total)
+        self.colunas = {nome: np.dtype(tipo) for nome, tipo in colunas.items()}
+        self.metadados = metadados
+        os.makedirs(diretorio, exist_ok=True)
+        if continuar:
+            self.arquivos = {nome: np.load(self._caminho(nome), mmap_mode="r+") for nome in self.colunas}
+            for nome, arquivo in self.arquivos.items():
+                if arquivo.shape != (self.total,) or arquivo.dtype != self.colunas[nome]:
+                    raise ValueError(f"A coluna {nome} em {diretorio} não é a desta campanha")
+        else:
+            self.arquivos = {nome: np.lib.format.open_memmap(self._caminho(nome), mode="w+", dtype=tipo,
+                                                             shape=(self.total,))
+                             for nome, tipo in self.colunas.items()}
+        self._gravar_metadados(completo=False)
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, f"{nome}.npy")
+
+    def _gravar_metadados(self, completo):
+        dados = {
+            "total": self.total,
+            "colunas": {nome: tipo.str for nome, tipo in self.colunas.items()},
+            "completo": completo,
+            **self.metadados,
+        }
+        with open(os.path.join(self.diretorio, METADADOS), "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo, indent=2, ensure_ascii=False, default=str)
+
+    def gravar(self, inicio, valores):
+        """Escreve os vetores de `valores` ({coluna: vetor}) a partir do jogador `inicio`."""
+        for nome, arquivo in self.arquivos.items():
+            vetor = np.asarray(valores[nome])
+            arquivo[inicio:inicio + len(vetor)] = vetor.astype(arquivo.dtype, copy=False)
+
+    def fechar(self):
+        """Descarrega os mapeamentos e marca a gravação como completa."""
+        for arquivo in self.arquivos.values():
+            arquivo.flush()
+        self.arquivos = {}
+        self._gravar_metadados(completo=True)
+
+
+def ler_metadados(diretorio):
+    with open(os.path.join(diretorio, METADADOS), encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def carregar_colunas(diretorio, incompleto=False):
+    """{coluna: vetor mapeado em memória, só leitura} de uma gravação completa
+    (com `incompleto`, também de uma interrompida: os jogadores que faltam valem zero)."""
+    metadados = ler_metadados(diretorio)
+    if not metadados["completo"] and not incompleto:
+        raise ValueError(f"A gravação em {diretorio} não terminou; retome a campanha com --resume")
+    return {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode="r")
+            for nome in metadados["colunas"]}
@@ -0,0 +1,165 @@
+"""Distribuição exata do prêmio de um giro, por enumeração de todas as grades.
+
+A enumeração não depende dos pesos: cada grade entra numa classe definida pela
+contagem de cada símbolo nas células sorteadas, e a probabilidade de uma grade
+da classe é prod(p[s] ** contagem[s]). Os pares (classe, prêmio) e o número de
+grades de cada par são calculados uma vez, salvos em motor/cache/, e avaliar
+novos pesos custa apenas uma potência por classe e um bincount.
+
+No Ratinho com a fortuna (`fortuna_rato`) só as 6 células fora da coluna do
+meio são sorteadas; nos demais casos são as 9. No Dragão o prêmio sai sem o
+multiplicador do cilindro, que é independente da grade.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from motor import tabelas
+from motor.vetorizado import premios_de_linhas
+
+# As contagens vão até 9, então cabem num dígito decimal por símbolo
+_DIGITO_CLASSE = 10 ** np.arange(tabelas.BASE, dtype=np.int64)
+# Prêmios em apostas por linha ficam bem abaixo disso
+_LIMITE_PREMIO = 1 << 24
+
+
+def _codigos_sorteados(fortuna_rato):
+    codigos = np.arange(tabelas.TAMANHO_LINHA, dtype=np.intp)
+    if fortuna_rato:
+        codigos = codigos[np.array(tabelas.MEIO)[codigos] == 0]
+    return codigos
+
+
+def _classe_das_linhas(codigos, fortuna_rato):
+    """Chave da classe (contagens em dígitos decimais) de cada código de linha."""
+    digitos = np.stack([codigos // 49, codigos // 7 % 7, codigos % 7], axis=1)
+    if fortuna_rato:
+        digitos = digitos[:, [0, 2]]  # O 🐭 fixo no meio não é sorteado
+    contagens = np.zeros((len(codigos), tabelas.BASE), dtype=np.int64)
+    for coluna in digitos.T:
+        contagens[np.arange(len(codigos)), coluna] += 1
+    return contagens @ _DIGITO_CLASSE
+
+
+def _enumerar(jogo, multiplicadores, fortuna_rato, regras):
+    codigos = _codigos_sorteados(fortuna_rato)
+    classe_linha = _classe_das_linhas(codigos, fortuna_rato)
+    r1 = np.repeat(codigos, len(codigos))
+    r2 = np.tile(codigos, len(codigos))
+    classe_r12 = np.repeat(classe_linha, len(codigos)) + np.tile(classe_linha, len(codigos))
+
+    pares = []
+    for r0, classe_r0 in zip(codigos, classe_linha):
+        linhas = np.stack([np.full_like(r1, r0), r1, r2])
+        premio = premios_de_linhas(linhas, jogo, multiplicadores, **regras).astype(np.int64)
+        pares.append(np.unique((classe_r0 + classe_r12) * _LIMITE_PREMIO + premio, return_counts=True))
+
+    chaves = np.concatenate([c for c, _ in pares])
+    unicas, inverso = np.unique(chaves, return_inverse=True)
+    quantidades = np.bincount(inverso, weights=np.concatenate([q for _, q in pares]))
+
+    classes, classe_de = np.unique(unicas // _LIMITE_PREMIO, return_inverse=True)
+    valores, valor_de = np.unique(unicas % _LIMITE_PREMIO, return_inverse=True)
+    contagens = classes[:, None] // _DIGITO_CLASSE % 10
+    return {
+        "contagens": contagens.astype(np.int8),
+        "valores": valores,
+        "classe": classe_de,
+        "valor": valor_de,
+        "quantidade": quantidades.astype(np.int64),
+    }
+
+
+class DistribuicaoGrades:
+    def __init__(self, jogo, multiplicadores, fortuna_rato=False, multiplicador_bonus=10, premio_jackpot=tabelas.PREMIO_JACKPOT_RATINHO):
+        if fortuna_rato and jogo != "ratinho":
+            raise ValueError("A fortuna com a coluna de 🐭 só existe no Ratinho")
+        multiplicadores = [int(m) for m in multiplicadores]
+        regras = {}
+        if jogo == "tigrinho":
+            regras["multiplicador_bonus"] = multiplicador_bonus
+        elif jogo == "ratinho":
+            regras["premio_jackpot"] = premio_jackpot
+        chave = {"jogo": jogo, "multiplicadores": multiplicadores, "fortuna_rato": fortuna_rato, **regras}
+
+        caminho = tabelas.caminho_cache(f"distribuicao_{jogo}", chave, ".npz")
+        if os.path.exists(caminho):
+            with np.load(caminho) as arquivo:
+                dados = {nome: arquivo[nome] for nome in arquivo.files}
+        else:
+            dados = _enumerar(jogo, multiplicadores, fortuna_rato, regras)
+            temporario = tabelas.temporario_cache(caminho)
+            np.savez(temporario, **dados)
+            tabelas.publicar_cache(temporario, caminho)
+
+        self.jogo = jogo
+        self.fortuna_rato = fortuna_rato
+        self.valores = dados["valores"]
+        self._contagens = dados["contagens"].astype(np.float64)
+        self._classe = dados["classe"]
+        self._valor = dados["valor"]
+        self._quantidade = dados["quantidade"].astype(np.float64)
+
+        # Somas por classe: com elas cada conjunto de pesos custa um produto matriz-vetor
+        premio_par = self.valores[self._valor].astype(np.float64)
+        n_classes = len(self._contagens)
+        self._premio_par = premio_par
+        self._soma = np.bincount(self._classe, self._quantidade * premio_par, n_classes)
+        self._soma_quadrados = np.bincount(self._classe, self._quantidade * premio_par ** 2, n_classes)
+        self._ganhos = np.bincount(self._classe, self._quantidade * (premio_par > 0), n_classes)
+        self._maximo = np.zeros(n_classes)
+        np.maximum.at(self._maximo, self._classe, premio_par)
+        self._caudas = {}
+
+    def _prob_grade_por_classe(self, pesos):
+        """Probabilidade de uma grade específica de cada classe."""
+        pesos = np.asarray(pesos, dtype=np.float64)
+        if len(pesos) != tabelas.BASE or np.any(pesos < 0) or pesos.sum() <= 0:
+            raise ValueError(f"Esperados {tabelas.BASE} pesos não negativos com soma positiva")
+        p = pesos / pesos.sum()
+        if np.all(p > 0):
+            return np.exp(self._contagens @ np.log(p))
+        # 0 ** 0 = 1: símbolo com peso zero só anula as classes em que aparece
+        prob = np.exp(self._contagens @ np.log(np.where(p > 0, p, 1.0)))
+        prob[(self._contagens[:, p == 0] > 0).any(axis=1)] = 0.0
+        return prob
+
+    def _cauda(self, limiar):
+        """Grades por classe com prêmio >= limiar (calculado uma vez por limiar)."""
+        if limiar not in self._caudas:
+            self._caudas[limiar] = np.bincount(
+                self._classe, self._quantidade * (self._premio_par >= limiar), len(self._contagens))
+        return self._caudas[limiar]
+
+    @lru_cache(maxsize=64)
+    def _matriz_caudas(self, limiares):
+        return np.array([self._cauda(limiar) for limiar in limiares])
+
+    def probabilidades(self, pesos):
+        """Probabilidade de cada valor em `self.valores` para os pesos dados."""
+        prob_par = self._quantidade * self._prob_grade_por_classe(pesos)[self._classe]
+        return np.bincount(self._valor, weights=prob_par, minlength=len(self.valores))
+
+    def resumo(self, pesos, limiares=()):
+        """Prêmio esperado, probabilidade de ganho, segundo momento e prêmio máximo
+        de um giro, mais P(prêmio >= limiar) para cada limiar pedido."""
+        prob = self._prob_grade_por_classe(pesos)
+        return {
+            "media": float(prob @ self._soma),
+            "prob_ganho": float(prob @ self._ganhos),
+            "segundo_momento": float(prob @ self._soma_quadrados),
+            "maximo": float(self._maximo[prob > 0].max()),
+            "prob_acima": (self._matriz_caudas(tuple(limiares)) @ prob).tolist() if limiares else [],
+        }
+
+
+@lru_cache(maxsize=32)
+def _distribuicao_memorizada(jogo, multiplicadores, fortuna_rato, multiplicador_bonus, premio_jackpot):
+    return DistribuicaoGrades(jogo, multiplicadores, fortuna_rato, multiplicador_bonus, premio_jackpot)
+
+
+def distribuicao_grades(jogo, multiplicadores, fortuna_rato=False, multiplicador_bonus=10, premio_jackpot=tabelas.PREMIO_JACKPOT_RATINHO):
+    """Como `DistribuicaoGrades`, mas reaproveita a mesma instância entre chamadas."""
+    return _distribuicao_memorizada(jogo, tuple(int(m) for m in multiplicadores), fortuna_rato,
+                                    multiplicador_bonus, premio_jackpot)
@@ -0,0 +1,156 @@
+"""Estatísticas em fluxo, com memória constante, que podem ser juntadas.
+
+Cada processo acumula os seus giros e jogadores e devolve só os acumuladores;
+o processo principal junta tudo com as fórmulas de Chan para média e
+variância. O resultado não depende de quantos giros ou jogadores passaram
+por eles, ao contrário das listas com um valor por giro.
+"""
+import math
+from bisect import bisect_right
+
+import numpy as np
+
+# Ganho do giro dividido pela aposta total. O menor prêmio de qualquer jogo
+# paga 0.4x a aposta, então o primeiro intervalo só tem os giros sem prêmio.
+BORDAS_GANHO_APOSTA = (0.0, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 2000.0)
+
+
+class Acumulador:
+    """Contagem, soma, média e variância (Welford), mínimo, máximo e, com
+    `bordas`, um histograma: o intervalo i vai de bordas[i] a bordas[i + 1] e
+    o último é aberto. Valores abaixo de bordas[0] entram no primeiro."""
+
+    def __init__(self, bordas=None):
+        self.n = 0
+        self.soma = 0.0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self.bordas = tuple(float(b) for b in bordas) if bordas is not None else None
+        self.histograma = [0] * len(self.bordas) if bordas is not None else None
+
+    def adicionar(self, x):
+        self.n += 1
+        self.soma += x
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (x - self.media)
+        if x < self.minimo:
+            self.minimo = x
+        if x > self.maximo:
+            self.maximo = x
+        if self.bordas is not None:
+            self.histograma[max(bisect_right(self.bordas, x) - 1, 0)] += 1
+
+    def adicionar_lote(self, valores):
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        if len(valores) == 0:
+            return
+        lote = Acumulador(self.bordas)
+        lote.n = len(valores)
+        lote.soma = float(valores.sum())
+        lote.media = lote.soma / lote.n
+        lote.m2 = float(((valores - lote.media) ** 2).sum())
+        lote.minimo = float(valores.min())
+        lote.maximo = float(valores.max())
+        if self.bordas is not None:
+            indices = np.maximum(np.searchsorted(self.bordas, valores, side="right") - 1, 0)
+            lote.histograma = np.bincount(indices, minlength=len(self.bordas)).tolist()
+        self.juntar(lote)
+
+    def juntar(self, outro):
+        if self.bordas != outro.bordas:
+            raise ValueError("Só dá para juntar acumuladores com as mesmas bordas")
+        if outro.n == 0:
+            return self
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        self.m2 += outro.m2 + delta * delta * self.n * outro.n / n
+        self.media += delta * outro.n / n
+        self.n = n
+        self.soma += outro.soma
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        if self.bordas is not None:
+            self.histograma = [a + b for a, b in zip(self.histograma, outro.histograma)]
+        return self
+
+    @property
+    def variancia(self):
+        """Variância populacional, como `np.var`."""
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def desvio_padrao(self):
+        return math.sqrt(self.variancia)
+
+
+class Covariancias:
+    """Médias e co-momentos de k variáveis observadas juntas (uma sessão por
+    observação), para estimadores que precisam de covariâncias no fim."""
+
+    def __init__(self, k):
+        self.n = 0
+        self.medias = [0.0] * k
+        self.comomentos = [[0.0] * k for _ in range(k)]
+
+    def adicionar(self, *valores):
+        self.n += 1
+        deltas = [x - m for x, m in zip(valores, self.medias)]
+        self.medias = [m + d / self.n for m, d in zip(self.medias, deltas)]
+        for i, d in enumerate(deltas):
+            linha = self.comomentos[i]
+            for j, (x, m) in enumerate(zip(valores, self.medias)):
+                linha[j] += d * (x - m)
+
+    def adicionar_lote(self, *colunas):
+        """Uma observação por posição das colunas (vetores do mesmo tamanho)."""
+        dados = np.array([np.asarray(c, dtype=np.float64).ravel() for c in colunas])
+        if dados.shape[1] == 0:
+            return
+        lote = Covariancias(len(colunas))
+        lote.n = dados.shape[1]
+        lote.medias = dados.mean(axis=1).tolist()
+        centrados = dados - dados.mean(axis=1, keepdims=True)
+        lote.comomentos = (centrados @ centrados.T).tolist()
+        self.juntar(lote)
+
+    def juntar(self, outro):
+        if outro.n == 0:
+            return self
+        n = self.n + outro.n
+        deltas = [b - a for a, b in zip(self.medias, outro.medias)]
+        fator = self.n * outro.n / n
+        for i, (linha, linha_outro) in enumerate(zip(self.comomentos, outro.comomentos)):
+            for j in range(len(linha)):
+                linha[j] += linha_outro[j] + deltas[i] * deltas[j] * fator
+        self.medias = [m + d * outro.n / n for m, d in zip(self.medias, deltas)]
+        self.n = n
+        return self
+
+    def covariancia(self, i, j):
+        return self.comomentos[i][j] / self.n if self.n else 0.0
+
+
+def juntar_resultados(destino, origem):
+    """Junta dois dicionários de resultados parciais: números são somados e
+    acumuladores (e medidores de motor.instrumentacao) juntados, chave a chave."""
+    for chave, valor in origem.items():
+        if hasattr(valor, "juntar"):
+            destino[chave].juntar(valor)
+        else:
+            destino[chave] += valor
+    return destino
+
+
+def formatar_histograma(acumulador, unidade="x"):
+    """Uma linha por intervalo não vazio, com a fração das observações."""
+    linhas = []
+    bordas = acumulador.bordas
+    for i, quantidade in enumerate(acumulador.histograma):
+        if quantidade == 0:
+            continue
+        fim = f"{bordas[i + 1]:g}{unidade})" if i + 1 < len(bordas) else "∞)"
+        linhas.append(f"  [{bordas[i]:g}{unidade}, {fim}: {quantidade / acumulador.n * 100:.4f}%")
+    return "\n".join(linhas)
@@ -0,0 +1,223 @@
+"""Fitas de giros pré-gerados, mapeadas em memória.
+
+Com a configuração do jogo fixa, o resultado de um giro em apostas por linha
+não depende da promoção: as nove campanhas sorteiam grades iguais em
+distribuição. Uma fita guarda, para um jogo e um modo ("normal" ou "fortuna":
+coluna do meio de 🐭 no Ratinho, cilindro da fortuna no Dragão), o prêmio de
+cada giro e a soma das paylines (para a variável de controle) num .npy em
+motor/cache/, gerado uma vez e lido com np.load(mmap_mode="r"). Várias
+campanhas, em vários processos, leem o mesmo arquivo sem custo de geração.
+
+`FitaGiros.ler` entrega os giros de um passo do motor vetorizado
+(motor.populacao): os jogadores de cada modo leem uma fatia contígua da fita
+a partir de uma posição sorteada com o rng do lote, então o resultado continua
+reproduzível pela semente da campanha. Fatias de passos diferentes podem se
+sobrepor; com a fita bem maior que o número de giros de um passo isso só
+reaproveita giros de vez em quando, sem viés. O que a fita não tem, o sorteio
+da fortuna antes ou depois do giro, continua vindo do rng.
+
+Uma campanha lida de uma fita converge para o RTP da própria fita, não para o
+exato. Por isso os scripts geram a fita com a semente da campanha
+(`semente_campanha`): campanhas com sementes diferentes leem fitas
+independentes e o erro da fita entra na variação entre elas, em vez de ser o
+mesmo em todas. `FitaGiros` conta os giros entregues e avisa quando eles
+passam do tamanho da fita, ou seja, quando a campanha já está repetindo giros.
+
+O tamanho padrão (`TAMANHO_PADRAO`, 128 MB por modo) é menor que uma campanha
+de bônus, que chega a 100-200 milhões de giros. Uma fita maior que a campanha
+tem 1 << 28 giros, 2 GB por modo e por semente: `giros_fita` no script, ou
+gerada antes, com a semente da campanha:
+
+    python -m motor.fitas ratinho --giros 268435456 --semente 2024
+
+Cada semente e cada tamanho têm o seu arquivo. Para ver as fitas do cache e
+apagar as que não servem mais (de um jogo, de uma semente ou todas):
+
+    python -m motor.fitas --listar
+    python -m motor.fitas ratinho --remover --semente 2024
+"""
+import argparse
+import glob
+import os
+import re
+import warnings
+
+import numpy as np
+
+from motor import tabelas
+from motor.jogos import DEFINICOES, compilar
+from motor.sementes import FITA, gerador_numpy
+
+MODOS = ("normal", "fortuna")
+TAMANHO_PADRAO = 1 << 24  # Giros por fita: 128 MB por modo
+BLOCO = 1 << 20  # Giros gerados de cada vez
+DTYPE = np.dtype([("premio", "<i4"), ("soma", "<i4")])
+_NOME = re.compile(r"fita_(?P<jogo>[a-z]+)_(?P<modo>[a-z]+)_s(?P<semente>\d+)_g(?P<giros>\d+)_[0-9a-f]+\.npy$")
+
+
+def _chave(avaliador, modo, giros, semente):
+    return {
+        "jogo": avaliador.nome,
+        "symbols": avaliador.symbols,
+        "multiplicador_bonus": avaliador.multiplicador_bonus,
+        "premio_jackpot": avaliador.premio_jackpot,
+        "cilindro_normal": avaliador.cilindro_normal,
+        "cilindro_fortuna": avaliador.cilindro_fortuna,
+        "chance_terceiro_giro": avaliador.chance_terceiro_giro,
+        "modo": modo,
+        "giros": int(giros),
+        "semente": int(semente),
+    }
+
+
+def caminho_fita(avaliador, modo, giros=TAMANHO_PADRAO, semente=0):
+    return tabelas.caminho_cache(f"fita_{avaliador.nome}_{modo}_s{int(semente)}_g{int(giros)}",
+                                 _chave(avaliador, modo, giros, semente), ".npy")
+
+
+def gerar_fita(avaliador, modo, giros=TAMANHO_PADRAO, semente=0):
+    """Gera a fita em motor/cache/ (por um temporário deste processo, como as
+    tabelas) e devolve o caminho. Se outro processo gerou a mesma fita ao mesmo
+    tempo, fica a dele."""
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconhecido: {modo}")
+    caminho = caminho_fita(avaliador, modo, giros, semente)
+    rng = gerador_numpy(semente, FITA, MODOS.index(modo))
+    temporario = tabelas.temporario_cache(caminho)
+    try:
+        fita = np.lib.format.open_memmap(temporario, mode="w+", dtype=DTYPE, shape=(int(giros),))
+        for inicio in range(0, len(fita), BLOCO):
+            n = min(BLOCO, len(fita) - inicio)
+            fortuna = np.full(n, modo == "fortuna")
+            linhas = avaliador.gerar_linhas(n, rng, fortuna)
+            soma = avaliador.somas_linhas(linhas)
+            if avaliador.nome == "dragao":
+                premio = soma * avaliador.girar_cilindros(fortuna, rng)
+            else:
+                premio = avaliador.premios(linhas)
+            fita["premio"][inicio:inicio + n] = premio
+            fita["soma"][inicio:inicio + n] = soma
+        fita.flush()
+        del fita
+    except BaseException:
+        # Uma geração interrompida não deixa um temporário de gigabytes para trás
+        os.remove(temporario)
+        raise
+    tabelas.publicar_cache(temporario, caminho)
+    return caminho
+
+
+def carregar_fita(avaliador, modo, giros=TAMANHO_PADRAO, semente=0):
+    """A fita mapeada em memória, só leitura; gerada na primeira vez."""
+    caminho = caminho_fita(avaliador, modo, giros, semente)
+    if not os.path.exists(caminho):
+        gerar_fita(avaliador, modo, giros, semente)
+    return np.load(caminho, mmap_mode="r")
+
+
+def listar_fitas(jogos=None, semente=None):
+    """[(caminho, jogo, modo, semente, giros, bytes)] das fitas em motor/cache/,
+    só dos `jogos` e da `semente` pedidos (None: todos)."""
+    fitas = []
+    for caminho in sorted(glob.glob(os.path.join(tabelas.PASTA_CACHE, "fita_*.npy"))):
+        nome = _NOME.match(os.path.basename(caminho))
+        if nome is None:
+            continue
+        if jogos and nome["jogo"] not in jogos or semente is not None and int(nome["semente"]) != semente:
+            continue
+        fitas.append((caminho, nome["jogo"], nome["modo"], int(nome["semente"]), int(nome["giros"]),
+                      os.path.getsize(caminho)))
+    return fitas
+
+
+class FitaGiros:
+    """As fitas de um `motor.jogos.Avaliador`: a normal e, no Ratinho e no
+    Dragão, a da fortuna. Os arquivos só são abertos (e gerados, se faltarem)
+    em `carregar` ou na primeira leitura, não ao criar o objeto: os scripts
+    criam a sua FitaGiros ao importar e chamam `carregar` no main, antes do
+    pool. `lidos` conta os giros entregues por modo neste processo."""
+
+    def __init__(self, avaliador, giros=TAMANHO_PADRAO, semente=0):
+        self.avaliador = avaliador
+        self.giros = int(giros)
+        self.semente = semente
+        self.fitas = None
+        self.lidos = {False: 0, True: 0}
+        self._avisou = set()
+
+    def carregar(self):
+        """Abre as fitas, gerando as que faltam em motor/cache/; devolve a própria FitaGiros."""
+        if self.fitas is None:
+            avaliador, giros, semente = self.avaliador, self.giros, self.semente
+            self.fitas = {False: carregar_fita(avaliador, "normal", giros, semente),
+                          True: carregar_fita(avaliador, "fortuna", giros, semente)
+                          if avaliador.nome != "tigrinho" else None}
+        return self
+
+    def contagem(self):
+        """`lidos` como vetor (normal, fortuna): a diferença antes e depois de um
+        lote é somada entre os lotes, como os outros resultados."""
+        return np.array([self.lidos[False], self.lidos[True]], dtype=np.int64)
+
+    def conferir(self, giros, modo=False):
+        """Avisa (uma vez por modo) se `giros` giros do modo passam do tamanho da
+        fita. Com o pool, cada processo só vê os seus: o processo principal
+        confere o total da campanha, modo a modo, no fim."""
+        if giros > self.giros and modo not in self._avisou:
+            self._avisou.add(modo)
+            warnings.warn(f"{giros} giros {MODOS[modo]} lidos de uma fita de {self.giros}: a campanha repete "
+                          "giros da fita e o resultado carrega o erro dela; aumente giros_fita", stacklevel=2)
+
+    def ler(self, fortuna, rng):
+        """(prêmio, soma das paylines) de um giro por jogador, em apostas por
+        linha; `fortuna` é o vetor (N,) de quem gira no modo da fortuna."""
+        self.carregar()
+        fortuna = np.asarray(fortuna, dtype=bool)
+        premio = np.empty(len(fortuna))
+        soma = np.empty(len(fortuna))
+        for modo, quem in ((False, ~fortuna), (True, fortuna)):
+            k = int(np.count_nonzero(quem))
+            if k == 0:
+                continue
+            fita = self.fitas[modo]
+            if k > len(fita):
+                raise ValueError(f"A fita tem {len(fita)} giros e o passo pede {k}")
+            inicio = int(rng.integers(len(fita) - k + 1))
+            trecho = fita[inicio:inicio + k]
+            premio[quem] = trecho["premio"]
+            soma[quem] = trecho["soma"]
+            self.lidos[modo] += k
+            self.conferir(self.lidos[modo], modo)
+        return premio, soma
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera, lista ou apaga as fitas de giros em motor/cache/.")
+    parser.add_argument("jogos", nargs="*", default=list(DEFINICOES), help="tigrinho, ratinho, dragao")
+    parser.add_argument("--giros", type=int, default=TAMANHO_PADRAO)
+    parser.add_argument("--semente", type=int, default=None,
+                        help="a semente_campanha do script que vai ler a fita (0 ao gerar sem ela)")
+    parser.add_argument("--listar", action="store_true", help="lista as fitas do cache, sem gerar nada")
+    parser.add_argument("--remover", action="store_true",
+                        help="apaga as fitas dos jogos (e da --semente, se dada), sem gerar nada")
+    argumentos = parser.parse_args()
+    if argumentos.listar or argumentos.remover:
+        fitas = listar_fitas(argumentos.jogos, argumentos.semente)
+        for caminho, jogo, modo, semente, giros, tamanho in fitas:
+            if argumentos.remover:
+                os.remove(caminho)
+            print(f"{'Apagada: ' if argumentos.remover else ''}{jogo} ({modo}), semente {semente}: "
+                  f"{giros} giros, {tamanho / 2 ** 20:.0f} MB em {caminho}")
+        total = sum(fita[5] for fita in fitas) / 2 ** 20
+        print(f"{len(fitas)} fitas, {total:.0f} MB{' liberados' if argumentos.remover else ''}")
+        return
+    semente = argumentos.semente if argumentos.semente is not None else 0
+    for nome in argumentos.jogos:
+        avaliador = compilar(nome)
+        for modo in MODOS[:1] if nome == "tigrinho" else MODOS:
+            caminho = gerar_fita(avaliador, modo, argumentos.giros, semente)
+            print(f"{nome} ({modo}): {argumentos.giros} giros em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
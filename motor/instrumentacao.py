@@ -0,0 +1,208 @@
+"""Tempos por etapa, contadores e um perfilador por amostragem para as campanhas.
+
+Desligado (o padrão dos scripts), o medidor é `DESLIGADO`: `etapa` devolve um
+contexto vazio e `contar` não faz nada, então o custo é o de uma chamada por
+etapa. As etapas ficam nos trechos que trabalham em lote (um lote de jogadores,
+um passo do motor vetorizado, a junção dos resultados), nunca dentro do giro
+do laço em Python; para ver como o tempo se divide entre as funções do giro
+serve o perfilador.
+
+Ligado, cada lote tem o seu `Medidor`, que vai no dicionário de resultados
+e é somado pelo `juntar_resultados` como os acumuladores: as etapas que rodam
+no pool somam o tempo de todos os processos. `medido` embrulha a função de
+lote para contar os lotes, o tamanho em bytes do resultado que volta pelo pool
+e, com `perfilar`, amostrar a pilha do processo a cada `INTERVALO` segundos
+enquanto o lote roda (o núcleo compilado aparece como a função Python que o
+chama).
+"""
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+INTERVALO = 0.005  # Segundos entre duas amostras do perfilador
+
+
+class Medidor:
+    """Segundos e chamadas por etapa, contadores e amostras do perfilador."""
+
+    ligado = True
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.segundos = defaultdict(float)
+        self.chamadas = defaultdict(int)
+        self.contadores = defaultdict(int)
+        self.amostras = 0
+        self.amostras_proprias = Counter()  # Função no topo da pilha
+        self.amostras_acumuladas = Counter()  # Função em qualquer ponto da pilha
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.segundos[nome] += time.perf_counter() - inicio
+            self.chamadas[nome] += 1
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] += int(quantidade)
+
+    def registrar_pilha(self, quadro):
+        funcoes = []
+        while quadro is not None:
+            codigo = quadro.f_code
+            funcoes.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+            quadro = quadro.f_back
+        self.amostras += 1
+        self.amostras_proprias[funcoes[0]] += 1
+        self.amostras_acumuladas.update(set(funcoes))
+
+    def juntar(self, outro):
+        if not outro.ligado:
+            return
+        for nome, segundos in outro.segundos.items():
+            self.segundos[nome] += segundos
+            self.chamadas[nome] += outro.chamadas[nome]
+        for nome, quantidade in outro.contadores.items():
+            self.contadores[nome] += quantidade
+        self.amostras += outro.amostras
+        self.amostras_proprias.update(outro.amostras_proprias)
+        self.amostras_acumuladas.update(outro.amostras_acumuladas)
+
+    def __getstate__(self):
+        # O relógio de perf_counter não vale em outro processo: vai o tempo já decorrido
+        estado = self.__dict__.copy()
+        estado["inicio"] = time.perf_counter() - self.inicio
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self.inicio = time.perf_counter() - estado["inicio"]
+
+
+class _Desligado:
+    """Medidor que não mede nada."""
+
+    ligado = False
+    _vazio = nullcontext()
+
+    def etapa(self, nome):
+        return self._vazio
+
+    def contar(self, nome, quantidade=1):
+        pass
+
+    def juntar(self, outro):
+        pass
+
+    def __reduce__(self):
+        # Volta do pool como o mesmo objeto
+        return "DESLIGADO"
+
+
+DESLIGADO = _Desligado()
+
+
+def novo_medidor(ligado):
+    return Medidor() if ligado else DESLIGADO
+
+
+@contextmanager
+def perfilando(medidor, ligado=True, intervalo=INTERVALO):
+    """Amostra a pilha da thread atual a cada `intervalo` segundos, numa thread à parte."""
+    if not ligado or not medidor.ligado:
+        yield
+        return
+    alvo = threading.get_ident()
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(intervalo):
+            quadro = sys._current_frames().get(alvo)
+            if quadro is not None:
+                medidor.registrar_pilha(quadro)
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        amostrador.join()
+
+
+class _LoteMedido:
+    """A função de lote, com o lote inteiro cronometrado (e perfilado) e o
+    tamanho do resultado que volta pelo pool. Precisa ser picklable: guarda a
+    função de módulo, não uma closure."""
+
+    def __init__(self, funcao, perfilar):
+        self.funcao = funcao
+        self.perfilar = perfilar
+
+    def __call__(self, tarefa):
+        extra = Medidor()
+        with extra.etapa("lote"), perfilando(extra, self.perfilar):
+            resultados = self.funcao(tarefa)
+        medidor = resultados["medidor"]
+        medidor.juntar(extra)
+        medidor.contar("lotes")
+        # O que o pool serializa para devolver o lote (sem o pool, o que serializaria)
+        with medidor.etapa("serializacao"):
+            medidor.contar("bytes_ipc", len(pickle.dumps(resultados, pickle.HIGHEST_PROTOCOL)))
+        return resultados
+
+
+def medido(funcao, ligado, perfilar=False):
+    """`funcao(tarefa)`, que devolve resultados com um "medidor", pronta para
+    `motor.paralelo.mapear_lotes`; desligado, a própria função."""
+    return _LoteMedido(funcao, perfilar) if ligado else funcao
+
+
+def _bytes(quantidade):
+    for unidade in ("B", "KB", "MB", "GB"):
+        if quantidade < 1024 or unidade == "GB":
+            return f"{quantidade:.1f} {unidade}"
+        quantidade /= 1024
+
+
+def formatar(medidor, giros=None, jogadores=None, linhas_perfilador=15):
+    """Resumo por etapa, contadores e as funções com mais amostras do perfilador.
+
+    Os % são do tempo de parede desde a criação do medidor (o do processo
+    principal); etapas dos lotes somam todos os processos do pool.
+    """
+    total = time.perf_counter() - medidor.inicio
+    linhas = ["\n=== ETAPAS (motor.instrumentacao) ===", f"Tempo de parede: {total:.2f} s"]
+    for nome in sorted(medidor.segundos, key=medidor.segundos.get, reverse=True):
+        segundos, chamadas = medidor.segundos[nome], medidor.chamadas[nome]
+        linhas.append(f"  {nome:<22} {segundos:9.3f} s {segundos / total * 100:7.1f}%  "
+                      f"{chamadas:>9} chamadas  {segundos / chamadas * 1e3:9.3f} ms/chamada")
+
+    contadores = dict(medidor.contadores)
+    if giros is not None:
+        contadores["giros"] = int(giros)
+    if jogadores is not None:
+        contadores["jogadores"] = int(jogadores)
+    if contadores:
+        linhas.append("Contadores:")
+        for nome, quantidade in sorted(contadores.items()):
+            texto = _bytes(quantidade) if nome.startswith("bytes") else f"{quantidade:,}"
+            linhas.append(f"  {nome:<22} {texto}")
+        for nome in ("giros", "jogadores"):
+            if contadores.get(nome):
+                linhas.append(f"  {nome + '/s':<22} {contadores[nome] / total:,.0f}")
+
+    if medidor.amostras:
+        linhas.append(f"Perfilador: {medidor.amostras} amostras a cada {INTERVALO * 1e3:g} ms "
+                      "(% na própria função / na pilha)")
+        for funcao, quantidade in medidor.amostras_proprias.most_common(linhas_perfilador):
+            linhas.append(f"  {quantidade / medidor.amostras * 100:5.1f}% / "
+                          f"{medidor.amostras_acumuladas[funcao] / medidor.amostras * 100:5.1f}%  {funcao}")
+    return "\n".join(linhas)
+
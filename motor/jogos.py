@@ -0,0 +1,233 @@
+"""Definição única do Tigrinho, Ratinho e Dragão e o avaliador compilado de cada jogo.
+
+`DEFINICOES` guarda os símbolos (no formato `symbols` dos scripts, coringa na
+posição 0) e as regras especiais de cada jogo. `compilar` transforma uma
+definição, com ou sem campos trocados, num `Avaliador`: as tabelas de
+pagamento de motor.tabelas, os sorteadores das linhas e do cilindro e as médias
+da variável de controle são montados uma vez e servem tanto a um giro de cada
+vez (jogos interativos, laço por jogador, buscas por simulação) quanto a lotes
+com NumPy (motor.vetorizado, motor.populacao).
+
+Os giros trabalham com os códigos das três linhas da grade (ver motor.tabelas)
+e os prêmios saem em apostas por linha; `grade` devolve os emojis para exibir.
+
+Valores canônicos onde as cópias antigas tinham divergido:
+- cilindros do Dragão com pesos 10/24/15/4 e 0/12/5/3 (RTP 96,88%);
+- Ratinho com os pesos e a fortuna de 20% das campanhas (RTP 96,72%);
+- jackpot do Ratinho de 1000 vezes a aposta total (1000 * 5 apostas por linha).
+"""
+import copy
+import json
+import random
+
+from motor import tabelas, vetorizado
+from motor.amostragem import AmostradorAlias
+from motor.rtp_exato import linha_esperada
+
+LINHAS = 5
+
+PAYLINES = [
+    [(0, 0), (0, 1), (0, 2)],
+    [(1, 0), (1, 1), (1, 2)],
+    [(2, 0), (2, 1), (2, 2)],
+    [(0, 0), (1, 1), (2, 2)],
+    [(2, 0), (1, 1), (0, 2)],
+]
+
+DEFINICOES = {
+    "tigrinho": {
+        "symbols": {
+            "🐯": {"multiplier": 250, "weight": 1},
+            "🏆": {"multiplier": 100, "weight": 2},
+            "🍊": {"multiplier": 25, "weight": 5},
+            "🔑": {"multiplier": 10, "weight": 4},
+            "💰": {"multiplier": 8, "weight": 7},
+            "🧧": {"multiplier": 5, "weight": 12},
+            "🔭": {"multiplier": 3, "weight": 44},
+        },
+        "multiplicador_bonus": 10,  # Grade com no máximo um símbolo além do 🐯
+    },
+    "ratinho": {
+        "symbols": {
+            "🐭": {"multiplier": 300, "weight": 2},
+            "🏆": {"multiplier": 100, "weight": 2},
+            "🍊": {"multiplier": 50, "weight": 3},
+            "🔑": {"multiplier": 30, "weight": 10},
+            "💰": {"multiplier": 15, "weight": 11},
+            "🧧": {"multiplier": 5, "weight": 21},
+            "🔭": {"multiplier": 3, "weight": 57},
+        },
+        "prob_fortuna": 0.2,  # Sorteada antes de cada giro fora da fortuna; termina no primeiro ganho
+        "premio_jackpot": tabelas.PREMIO_JACKPOT_RATINHO,  # Grade toda de 🐭, em apostas por linha
+    },
+    "dragao": {
+        "symbols": {
+            "🐉": {"multiplier": 100, "weight": 1},
+            "🏆": {"multiplier": 50, "weight": 2},
+            "🍊": {"multiplier": 25, "weight": 8},
+            "🔑": {"multiplier": 10, "weight": 20},
+            "💰": {"multiplier": 5, "weight": 30},
+            "🧧": {"multiplier": 3, "weight": 39},
+            "🔭": {"multiplier": 2, "weight": 61},
+        },
+        "cilindro_normal": {"1": 10, "2": 24, "5": 15, "10": 4},
+        "cilindro_fortuna": {"1": 0, "2": 12, "5": 5, "10": 3},
+        "chance_terceiro_giro": 0.21,  # Terceiro giro do cilindro na rodada da fortuna
+        "prob_fortuna": 0.03,  # Sorteada antes de cada giro fora da fortuna
+        "rodadas_fortuna": 8,
+    },
+}
+
+
+def definicao(nome, **alteracoes):
+    """Cópia da definição de `nome` com os campos de `alteracoes` trocados.
+
+    `pesos` (lista na ordem dos símbolos ou {símbolo: peso}) troca só os pesos.
+    """
+    if nome not in DEFINICOES:
+        raise ValueError(f"Jogo desconhecido: {nome}")
+    resultado = copy.deepcopy(DEFINICOES[nome])
+    pesos = alteracoes.pop("pesos", None)
+    desconhecidos = set(alteracoes) - set(resultado)
+    if desconhecidos:
+        raise ValueError(f"Campos que o {nome} não tem: {sorted(desconhecidos)}")
+    resultado.update(copy.deepcopy(alteracoes))
+    if pesos is not None:
+        if not isinstance(pesos, dict):
+            pesos = dict(zip(resultado["symbols"], pesos))
+        for simbolo, dados in resultado["symbols"].items():
+            dados["weight"] = pesos[simbolo]
+    return resultado
+
+
+class Avaliador:
+    """Um jogo compilado. Giro a giro:
+
+        linhas = jogo.sortear_linhas(rng, fortuna)
+        premio = jogo.premio_linhas(linhas)        # * jogo.girar_cilindro(fortuna, rng) no Dragão
+
+    e em lote, com os códigos em (3, N):
+
+        linhas = jogo.gerar_linhas(n, rng, fortuna)
+        premios = jogo.premios(linhas)             # * jogo.girar_cilindros(fortuna, rng) no Dragão
+
+    `fortuna` é o rato da fortuna no Ratinho (coluna do meio de 🐭) e a rodada
+    da fortuna no Dragão (dois ou três giros do cilindro da fortuna).
+    """
+
+    def __init__(self, nome, symbols, multiplicador_bonus=10, prob_fortuna=0.0, premio_jackpot=tabelas.PREMIO_JACKPOT_RATINHO,
+                 cilindro_normal=None, cilindro_fortuna=None, chance_terceiro_giro=0.0, rodadas_fortuna=8):
+        if nome not in DEFINICOES:
+            raise ValueError(f"Jogo desconhecido: {nome}")
+        if nome == "dragao" and (cilindro_normal is None or cilindro_fortuna is None):
+            raise ValueError("O Dragão precisa dos dois cilindros")
+        self.nome = nome
+        self.symbols = symbols
+        self.simbolos = list(symbols)
+        self.pesos = [dados["weight"] for dados in symbols.values()]
+        self.multiplicadores = [int(dados["multiplier"]) for dados in symbols.values()]
+        self.multiplicador_bonus = multiplicador_bonus
+        self.prob_fortuna = prob_fortuna
+        self.premio_jackpot = premio_jackpot
+        self.cilindro_normal = cilindro_normal
+        self.cilindro_fortuna = cilindro_fortuna
+        self.chance_terceiro_giro = chance_terceiro_giro
+        self.rodadas_fortuna = rodadas_fortuna
+
+        dados = tabelas.carregar_tabelas(nome, self.multiplicadores, multiplicador_bonus)
+        self._linha = dados["linha"]
+        self._mascara = dados.get("mascara_linha")
+        self._bonus = dados.get("bonus")
+        self._alto, self._meio, self._baixo = tabelas.ALTO, tabelas.MEIO, tabelas.BAIXO
+        self._sorteio_linha = AmostradorAlias(tabelas.pesos_das_linhas(self.pesos))
+        self._sorteio_linha_fortuna = (AmostradorAlias(tabelas.pesos_das_linhas(self.pesos, fortuna_rato=True))
+                                       if nome == "ratinho" else self._sorteio_linha)
+        if nome == "dragao":
+            self._cilindro_normal = AmostradorAlias.de_dicionario(cilindro_normal, int)
+            self._cilindro_fortuna = AmostradorAlias.de_dicionario(cilindro_fortuna, int)
+        self._pesos_lote = vetorizado.pesos_de(symbols)
+        self._multiplicadores_lote = vetorizado.multiplicadores_de(symbols)
+
+        # Médias exatas da soma das paylines: a variável de controle de motor.variancia
+        self.media_linhas = LINHAS * linha_esperada(self.pesos, self.multiplicadores)
+        self.media_linhas_fortuna = (LINHAS * linha_esperada(self.pesos, self.multiplicadores, coringas_fixos=1)
+                                     if nome == "ratinho" else self.media_linhas)
+
+    # === Um giro de cada vez ===
+
+    def sortear_linhas(self, rng=random, fortuna=False):
+        """Códigos (r0, r1, r2) das três linhas de uma grade."""
+        sortear = (self._sorteio_linha_fortuna if fortuna else self._sorteio_linha).sortear_indice
+        return sortear(rng), sortear(rng), sortear(rng)
+
+    def soma_linhas(self, linhas):
+        """Soma das 5 paylines em apostas por linha, sem regra especial."""
+        r0, r1, r2 = linhas
+        linha, meio = self._linha, self._meio[r1]
+        return (linha[r0] + linha[r1] + linha[r2]
+                + linha[self._alto[r0] + meio + self._baixo[r2]]
+                + linha[self._alto[r2] + meio + self._baixo[r0]])
+
+    def premio_linhas(self, linhas):
+        """Prêmio do giro em apostas por linha (no Dragão, antes do cilindro)."""
+        if self.nome == "tigrinho":
+            r0, r1, r2 = linhas
+            mascara = self._mascara
+            return self.soma_linhas(linhas) * self._bonus[mascara[r0] | mascara[r1] | mascara[r2]]
+        if self.nome == "ratinho" and linhas[0] == linhas[1] == linhas[2] == 0:
+            return self.premio_jackpot  # Todas as células são 🐭
+        return self.soma_linhas(linhas)
+
+    def controle(self, linhas, fortuna=False):
+        """Soma das paylines menos a média exata no estado: média zero."""
+        media = self.media_linhas_fortuna if fortuna else self.media_linhas
+        return self.soma_linhas(linhas) - media
+
+    def girar_cilindro(self, fortuna=False, rng=random):
+        """Multiplicador do Dragão: um giro normal, ou dois giros da fortuna e um
+        terceiro com probabilidade `chance_terceiro_giro`."""
+        if not fortuna:
+            return self._cilindro_normal.sortear(rng)
+        sortear = self._cilindro_fortuna.sortear
+        multiplicador = sortear(rng) + sortear(rng)
+        if rng.random() < self.chance_terceiro_giro:
+            multiplicador += sortear(rng)
+        return multiplicador
+
+    def grade(self, linhas):
+        """Grade 3x3 de emojis, para exibir."""
+        return [[self.simbolos[s] for s in (r // 49, r // 7 % 7, r % 7)] for r in linhas]
+
+    def linhas_da_grade(self, grade):
+        """Códigos das linhas de uma grade de emojis."""
+        indice = {simbolo: i for i, simbolo in enumerate(self.simbolos)}
+        return tuple(tabelas.codificar_linha(indice[a], indice[b], indice[c]) for a, b, c in grade)
+
+    # === Lotes com NumPy ===
+
+    def gerar_linhas(self, n, rng=None, fortuna=False):
+        """Códigos das linhas de N grades, como (3, N); `fortuna` pode ser um vetor (N,)."""
+        return vetorizado.gerar_linhas(n, self._pesos_lote, rng, fortuna if self.nome == "ratinho" else False)
+
+    def somas_linhas(self, linhas):
+        return vetorizado.premios_de_linhas(linhas, "dragao", self._multiplicadores_lote)
+
+    def premios(self, linhas):
+        return vetorizado.premios_de_linhas(linhas, self.nome, self._multiplicadores_lote,
+                                            self.multiplicador_bonus, self.premio_jackpot)
+
+    def girar_cilindros(self, fortuna, rng=None):
+        return vetorizado.girar_cilindros(fortuna, self.cilindro_normal, self.cilindro_fortuna,
+                                          self.chance_terceiro_giro, rng)
+
+
+_compilados = {}
+
+
+def compilar(nome, **alteracoes):
+    """`Avaliador` da definição de `nome` (ver `definicao`), montado uma vez por
+    configuração em cada processo."""
+    chave = (nome, json.dumps(alteracoes, sort_keys=True, default=str))
+    if chave not in _compilados:
+        _compilados[chave] = Avaliador(nome, **definicao(nome, **alteracoes))
+    return _compilados[chave]
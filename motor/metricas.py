@@ -0,0 +1,121 @@
+"""Métricas exatas de longo prazo por giro, a partir da distribuição do prêmio.
+
+Tudo em múltiplos da aposta total (5 apostas por linha):
+- rtp: retorno esperado em %;
+- frequencia_acerto: % dos giros com algum prêmio;
+- desvio_padrao: desvio padrão do prêmio de um giro;
+- ganho_maximo: maior prêmio possível de um giro;
+- prob_ganho_alto: probabilidade de um giro pagar `limiar_ganho_alto` vezes a
+  aposta ou mais (exposição a prêmios grandes).
+
+Nos jogos com rodada da fortuna o giro "médio" é a mistura dos estados com os
+pesos da distribuição estacionária das cadeias de `motor.rtp_exato`.
+"""
+import math
+
+from motor.distribuicao import distribuicao_grades
+from motor.rtp_exato import (
+    cadeia_fortuna_dragao,
+    cadeia_fortuna_ratinho,
+    distribuicao_estacionaria,
+)
+from motor.tabelas import PREMIO_JACKPOT_RATINHO
+
+LINHAS = 5
+LIMIAR_GANHO_ALTO = 100
+
+
+def _metricas(estados, limiar_ganho_alto):
+    """Combina estados [(fração dos giros, resumo em apostas por linha)]."""
+    media = sum(f * r["media"] for f, r in estados)
+    segundo_momento = sum(f * r["segundo_momento"] for f, r in estados)
+    variancia = max(segundo_momento - media ** 2, 0.0)
+    return {
+        "rtp": media / LINHAS * 100,
+        "frequencia_acerto": sum(f * r["prob_ganho"] for f, r in estados) * 100,
+        "desvio_padrao": math.sqrt(variancia) / LINHAS,
+        "ganho_maximo": max(r["maximo"] for f, r in estados if f > 0) / LINHAS,
+        "prob_ganho_alto": sum(f * r["prob_acima"][0] for f, r in estados),
+        "limiar_ganho_alto": limiar_ganho_alto,
+    }
+
+
+def metricas_tigrinho(pesos, multiplicadores, multiplicador_bonus=10,
+                      limiar_ganho_alto=LIMIAR_GANHO_ALTO):
+    d = distribuicao_grades("tigrinho", multiplicadores, multiplicador_bonus=multiplicador_bonus)
+    return _metricas([(1.0, d.resumo(pesos, [limiar_ganho_alto * LINHAS]))], limiar_ganho_alto)
+
+
+def metricas_ratinho(pesos, multiplicadores, prob_fortuna, premio_jackpot=PREMIO_JACKPOT_RATINHO,
+                     limite_rodadas=None, limiar_ganho_alto=LIMIAR_GANHO_ALTO):
+    limiares = [limiar_ganho_alto * LINHAS]
+    normal = distribuicao_grades("ratinho", multiplicadores, premio_jackpot=premio_jackpot).resumo(pesos, limiares)
+    fortuna = distribuicao_grades("ratinho", multiplicadores, fortuna_rato=True,
+                                  premio_jackpot=premio_jackpot).resumo(pesos, limiares)
+    pi = distribuicao_estacionaria(
+        cadeia_fortuna_ratinho(prob_fortuna, fortuna["prob_ganho"], limite_rodadas))
+    return _metricas([(pi[0], normal), (1.0 - pi[0], fortuna)], limiar_ganho_alto)
+
+
+def distribuicao_cilindro(cilindro):
+    """{multiplicador: probabilidade} de um cilindro no formato dos scripts."""
+    total = float(sum(cilindro.values()))
+    return {int(valor): peso / total for valor, peso in cilindro.items() if peso > 0}
+
+
+def _somar(a, b):
+    soma = {}
+    for va, pa in a.items():
+        for vb, pb in b.items():
+            soma[va + vb] = soma.get(va + vb, 0.0) + pa * pb
+    return soma
+
+
+def distribuicao_multiplicador_fortuna(cilindro_fortuna, chance_terceiro_giro):
+    """Soma de dois giros do cilindro da fortuna, mais um terceiro com a chance dada."""
+    giro = distribuicao_cilindro(cilindro_fortuna)
+    dois = _somar(giro, giro)
+    tres = _somar(dois, giro)
+    resultado = {v: p * (1 - chance_terceiro_giro) for v, p in dois.items()}
+    for v, p in tres.items():
+        resultado[v] = resultado.get(v, 0.0) + p * chance_terceiro_giro
+    return resultado
+
+
+def _com_multiplicador(base, caudas, multiplicadores, limiar):
+    """Resumo de linha * multiplicador, com a grade e o cilindro independentes.
+    `caudas` leva cada limiar inteiro de linha a P(linha >= limiar)."""
+    positivos = [(m, p) for m, p in multiplicadores.items() if m > 0]
+    return {
+        "media": base["media"] * sum(m * p for m, p in positivos),
+        "segundo_momento": base["segundo_momento"] * sum(m * m * p for m, p in positivos),
+        "prob_ganho": base["prob_ganho"] * sum(p for _, p in positivos),
+        "maximo": base["maximo"] * max(m for m, _ in positivos),
+        "prob_acima": [sum(p * caudas[math.ceil(limiar / m)] for m, p in positivos)],
+    }
+
+
+def metricas_dragao(pesos, multiplicadores, cilindro_normal, cilindro_fortuna, chance_terceiro_giro,
+                    prob_fortuna, rodadas_fortuna=8, ativa_apos_giro_normal=False,
+                    limiar_ganho_alto=LIMIAR_GANHO_ALTO):
+    limiar = limiar_ganho_alto * LINHAS
+    mult_normal = distribuicao_cilindro(cilindro_normal)
+    mult_fortuna = distribuicao_multiplicador_fortuna(cilindro_fortuna, chance_terceiro_giro)
+    # O prêmio da linha é inteiro: L * m >= limiar se L >= ceil(limiar / m)
+    limiares = sorted({math.ceil(limiar / m) for m in (*mult_normal, *mult_fortuna) if m > 0})
+    base = distribuicao_grades("dragao", multiplicadores).resumo(pesos, limiares)
+    caudas = dict(zip(limiares, base["prob_acima"]))
+
+    normal = _com_multiplicador(base, caudas, mult_normal, limiar)
+    fortuna = _com_multiplicador(base, caudas, mult_fortuna, limiar)
+    pi = distribuicao_estacionaria(
+        cadeia_fortuna_dragao(prob_fortuna, rodadas_fortuna, ativa_apos_giro_normal))
+    return _metricas([(pi[0], normal), (1.0 - pi[0], fortuna)], limiar_ganho_alto)
+
+
+def formatar_metricas(metricas):
+    texto = (f"RTP {metricas['rtp']:.2f}% | acerto {metricas['frequencia_acerto']:.1f}% | "
+             f"desvio {metricas['desvio_padrao']:.2f}x | máx {metricas['ganho_maximo']:.0f}x")
+    if metricas["prob_ganho_alto"] > 0:
+        texto += f" | >= {metricas['limiar_ganho_alto']}x: 1 em {1 / metricas['prob_ganho_alto']:,.0f} giros"
+    return texto
@@ -0,0 +1,453 @@
+"""Laço por jogador das campanhas compilado com Numba, quando ele está instalado.
+
+As regras da fortuna no Dragão e no Ratinho e a aposta do cashback dependem do
+giro anterior de cada jogador, então no motor vetorizado (motor.populacao) cada
+passo ainda arrasta os vetores de todos. Aqui a sessão inteira de cada jogador
+roda em código de máquina, com as mesmas contas e na mesma ordem do laço em
+Python dos scripts (`simular_jogador`).
+
+Para dar os mesmos números com a mesma semente, o núcleo tem o seu próprio
+Mersenne Twister, idêntico ao do `random` do Python: semeado com as palavras de
+`motor.sementes.chave_python` ele sorteia a mesma sequência que
+`gerador_python` para o jogador. As sessões devolvem as tuplas de
+`simular_jogador` e acumulam os ganhos por giro no `Acumulador` do lote na
+mesma ordem, então o resultado é idêntico bit a bit ao do laço em Python.
+
+Sem o Numba (`DISPONIVEL` falso) as funções continuam corretas, mas rodam em
+Python puro e bem mais devagar que o próprio laço dos scripts: eles voltam
+para `simular_jogador` nesse caso.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from motor import tabelas
+from motor.instrumentacao import DESLIGADO
+from motor.sementes import JOGADOR, chave_python
+
+try:
+    from numba import njit
+
+    DISPONIVEL = True
+except ImportError:
+    DISPONIVEL = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda funcao: funcao
+
+LINHAS = 5
+APOSTA_MINIMA = 0.5
+TIGRINHO, RATINHO, DRAGAO = range(3)
+CODIGOS = {"tigrinho": TIGRINHO, "ratinho": RATINHO, "dragao": DRAGAO}
+
+# Mersenne Twister (MT19937) como em Modules/_randommodule.c; o estado tem as
+# 624 palavras e, na última posição, o índice da próxima
+N, M = 624, 397
+BITS_32 = 0xFFFFFFFF
+
+# O jogo vai para o núcleo em quatro arrays (`Nucleo`), desempacotados uma vez por
+# lote: dentro do laço compilado só há leitura de arrays, sem atributos.
+# Linhas de `tabela`, uma coluna por código de linha da grade (motor.tabelas)
+PREMIO_LINHA, BONUS, PROB_LINHA, ALIAS_LINHA, PROB_LINHA_FORTUNA, ALIAS_LINHA_FORTUNA = range(6)
+# Linhas de `indices`
+ALTO, MEIO, BAIXO, MASCARA = range(4)
+# Linhas de `cilindros`: prob., alias e multiplicador de cada cilindro do Dragão
+PROB_CILINDRO, ALIAS_CILINDRO, VALOR_CILINDRO = 0, 1, 2
+PROB_CILINDRO_FORTUNA, ALIAS_CILINDRO_FORTUNA, VALOR_CILINDRO_FORTUNA = 3, 4, 5
+# Posições de `parametros`
+(CODIGO, PREMIO_JACKPOT, MEDIA_LINHAS, MEDIA_LINHAS_FORTUNA, PROB_FORTUNA, RODADAS_FORTUNA,
+ CHANCE_TERCEIRO_GIRO, FORTUNA_APOS_GIRO_NORMAL, TAMANHO_CILINDRO, TAMANHO_CILINDRO_FORTUNA) = range(10)
+
+Nucleo = namedtuple("Nucleo", ["tabela", "indices", "cilindros", "parametros"])
+
+
+def _linhas_alias(amostrador, largura):
+    """(prob, alias, valores) de um `AmostradorAlias`, completados até `largura`."""
+    linhas = np.zeros((3, largura))
+    if amostrador is not None:
+        linhas[0, :amostrador.n] = amostrador.prob
+        linhas[1, :amostrador.n] = amostrador.alias
+        linhas[2, :amostrador.n] = amostrador.valores
+    return linhas
+
+
+@lru_cache(maxsize=None)
+def empacotar(jogo):
+    """Tabelas e regras de um `motor.populacao.Jogo` nos arrays do núcleo."""
+    avaliador = jogo.avaliador
+    largura = tabelas.TAMANHO_LINHA
+    bonus = np.zeros(largura)
+    if avaliador._bonus is not None:
+        bonus[:len(avaliador._bonus)] = avaliador._bonus
+    tabela = np.vstack([
+        np.array(avaliador._linha, dtype=np.float64), bonus,
+        _linhas_alias(avaliador._sorteio_linha, largura)[:2],
+        _linhas_alias(avaliador._sorteio_linha_fortuna, largura)[:2],
+    ])
+    mascara = avaliador._mascara if avaliador._mascara is not None else [0] * largura
+    indices = np.array([tabelas.ALTO, tabelas.MEIO, tabelas.BAIXO, mascara], dtype=np.int64)
+
+    cilindro = getattr(avaliador, "_cilindro_normal", None)
+    cilindro_fortuna = getattr(avaliador, "_cilindro_fortuna", None)
+    tamanhos = [c.n if c is not None else 0 for c in (cilindro, cilindro_fortuna)]
+    cilindros = np.vstack([_linhas_alias(cilindro, max(tamanhos + [1])),
+                           _linhas_alias(cilindro_fortuna, max(tamanhos + [1]))])
+
+    parametros = np.array([
+        CODIGOS[avaliador.nome], avaliador.premio_jackpot, avaliador.media_linhas, avaliador.media_linhas_fortuna,
+        jogo.prob_fortuna, jogo.rodadas_fortuna, avaliador.chance_terceiro_giro, jogo.fortuna_apos_giro_normal,
+        *tamanhos,
+    ], dtype=np.float64)
+    return Nucleo(tabela, indices, cilindros, parametros)
+
+
+def chaves_jogadores(semente, inicio, quantidade):
+    """(quantidade, 4) palavras das sementes dos jogadores inicio, inicio + 1, ..."""
+    chaves = np.empty((quantidade, 4), dtype=np.int64)
+    for j in range(quantidade):
+        chaves[j] = chave_python(semente, JOGADOR, inicio + j)
+    return chaves
+
+
+# === Números aleatórios ===
+
+@njit(cache=True)
+def _semear(estado, chave):
+    """init_by_array do CPython, com a chave sem as palavras altas nulas."""
+    tamanho = len(chave)
+    while tamanho > 1 and chave[tamanho - 1] == 0:
+        tamanho -= 1
+    estado[0] = 19650218
+    for i in range(1, N):
+        estado[i] = (1812433253 * (estado[i - 1] ^ (estado[i - 1] >> 30)) + i) & BITS_32
+    i, j = 1, 0
+    for _ in range(max(N, tamanho)):
+        estado[i] = ((estado[i] ^ ((estado[i - 1] ^ (estado[i - 1] >> 30)) * 1664525)) + chave[j] + j) & BITS_32
+        i += 1
+        j += 1
+        if i >= N:
+            estado[0] = estado[N - 1]
+            i = 1
+        if j >= tamanho:
+            j = 0
+    for _ in range(N - 1):
+        estado[i] = ((estado[i] ^ ((estado[i - 1] ^ (estado[i - 1] >> 30)) * 1566083941)) - i) & BITS_32
+        i += 1
+        if i >= N:
+            estado[0] = estado[N - 1]
+            i = 1
+    estado[0] = 0x80000000
+    estado[N] = N
+
+
+@njit(cache=True, inline="always")
+def _palavra(estado):
+    if estado[N] >= N:
+        for k in range(N):
+            y = (estado[k] & 0x80000000) | (estado[(k + 1) % N] & 0x7FFFFFFF)
+            estado[k] = estado[(k + M) % N] ^ (y >> 1) ^ (0x9908B0DF if y & 1 else 0)
+        estado[N] = 0
+    y = estado[estado[N]]
+    estado[N] += 1
+    y ^= y >> 11
+    y ^= (y << 7) & 0x9D2C5680
+    y ^= (y << 15) & 0xEFC60000
+    y ^= y >> 18
+    return y
+
+
+@njit(cache=True, inline="always")
+def _aleatorio(estado):
+    """`random.random()`: 53 bits de duas palavras."""
+    a = _palavra(estado) >> 5
+    b = _palavra(estado) >> 6
+    return (a * 67108864.0 + b) * (1.0 / 9007199254740992.0)
+
+
+@njit(cache=True, inline="always")
+def _sortear(tabela, linha, tamanho, estado):
+    """`AmostradorAlias.sortear_indice`, com as probabilidades na linha `linha` de
+    `tabela` e os alias na seguinte."""
+    u = _aleatorio(estado) * tamanho
+    i = int(u)
+    return i if u - i < tabela[linha, i] else int(tabela[linha + 1, i])
+
+
+# === Um giro ===
+
+@njit(cache=True, inline="always")
+def _cilindro(cilindros, parametros, fortuna, estado):
+    """`Avaliador.girar_cilindro`."""
+    if not fortuna:
+        return cilindros[VALOR_CILINDRO, _sortear(cilindros, PROB_CILINDRO, parametros[TAMANHO_CILINDRO], estado)]
+    tamanho = parametros[TAMANHO_CILINDRO_FORTUNA]
+    multiplicador = (cilindros[VALOR_CILINDRO_FORTUNA, _sortear(cilindros, PROB_CILINDRO_FORTUNA, tamanho, estado)]
+                     + cilindros[VALOR_CILINDRO_FORTUNA, _sortear(cilindros, PROB_CILINDRO_FORTUNA, tamanho, estado)])
+    if _aleatorio(estado) < parametros[CHANCE_TERCEIRO_GIRO]:
+        multiplicador += cilindros[VALOR_CILINDRO_FORTUNA, _sortear(cilindros, PROB_CILINDRO_FORTUNA, tamanho, estado)]
+    return multiplicador
+
+
+@njit(cache=True, inline="always")
+def _girar(tabela, indices, cilindros, parametros, fortuna, estado):
+    """Um giro com as regras da fortuna de `motor.populacao.Jogo`; `fortuna[0]`
+    guarda os giros da fortuna que faltam (Dragão) ou 1/0 (Ratinho) e `fortuna[1]`
+    conta as ativações, os dois alterados no lugar. Devolve (prêmio, controle)
+    em apostas por linha."""
+    codigo = int(parametros[CODIGO])
+    apos_giro_normal = parametros[FORTUNA_APOS_GIRO_NORMAL] > 0
+    if fortuna[0] == 0 and (codigo == RATINHO or (codigo == DRAGAO and not apos_giro_normal)):
+        if _aleatorio(estado) < parametros[PROB_FORTUNA]:
+            fortuna[0] = 1 if codigo == RATINHO else int(parametros[RODADAS_FORTUNA])
+            fortuna[1] += 1
+    ativa = fortuna[0] > 0
+
+    sorteio = PROB_LINHA_FORTUNA if codigo == RATINHO and ativa else PROB_LINHA
+    tamanho = tabela.shape[1]
+    r0 = _sortear(tabela, sorteio, tamanho, estado)
+    r1 = _sortear(tabela, sorteio, tamanho, estado)
+    r2 = _sortear(tabela, sorteio, tamanho, estado)
+    meio = indices[MEIO, r1]
+    soma = (tabela[PREMIO_LINHA, r0] + tabela[PREMIO_LINHA, r1] + tabela[PREMIO_LINHA, r2]
+            + tabela[PREMIO_LINHA, indices[ALTO, r0] + meio + indices[BAIXO, r2]]
+            + tabela[PREMIO_LINHA, indices[ALTO, r2] + meio + indices[BAIXO, r0]])
+
+    premio = soma
+    if codigo == TIGRINHO:
+        premio = soma * tabela[BONUS, indices[MASCARA, r0] | indices[MASCARA, r1] | indices[MASCARA, r2]]
+    elif codigo == RATINHO and r0 == 0 and r1 == 0 and r2 == 0:
+        premio = parametros[PREMIO_JACKPOT]
+    elif codigo == DRAGAO:
+        premio = soma * _cilindro(cilindros, parametros, ativa, estado)
+
+    if codigo == RATINHO and ativa:
+        controle = soma - parametros[MEDIA_LINHAS_FORTUNA]
+        if premio > 0:
+            fortuna[0] = 0
+    else:
+        controle = soma - parametros[MEDIA_LINHAS]
+    if codigo == DRAGAO:
+        if ativa:
+            fortuna[0] -= 1
+        elif apos_giro_normal and _aleatorio(estado) < parametros[PROB_FORTUNA]:
+            fortuna[0] = int(parametros[RODADAS_FORTUNA])
+            fortuna[1] += 1
+    return premio, controle
+
+
+@njit(cache=True, inline="always")
+def _acumular(acumulador, histograma, bordas, x):
+    """`Acumulador.adicionar` sobre (n, soma, média, m2, mínimo, máximo)."""
+    acumulador[0] += 1
+    acumulador[1] += x
+    delta = x - acumulador[2]
+    acumulador[2] += delta / acumulador[0]
+    acumulador[3] += delta * (x - acumulador[2])
+    if x < acumulador[4]:
+        acumulador[4] = x
+    if x > acumulador[5]:
+        acumulador[5] = x
+    if len(bordas):
+        i = 0
+        while i < len(bordas) and bordas[i] <= x:
+            i += 1
+        histograma[max(i - 1, 0)] += 1
+
+
+# === Sessões ===
+
+@njit(cache=True)
+def _sessoes_bonus_deposito(nucleo, chaves, saldos_iniciais, apostas, rollover, multiplicador_bonus_inicial,
+                            limite_bonus, somente_bonus, max_rodadas, acumulador, histograma, bordas):
+    tabela, indices, cilindros, parametros = nucleo
+    n = len(saldos_iniciais)
+    saida = np.zeros((7, n))
+    estado = np.zeros(N + 1, dtype=np.int64)
+    fortuna = np.zeros(2, dtype=np.int64)  # Giros da fortuna que faltam, ativações
+    for j in range(n):
+        _semear(estado, chaves[j])
+        fortuna[0] = 0
+        saldo_inicial, aposta_total = saldos_iniciais[j], apostas[j]
+        valor_bonus = min(saldo_inicial * (multiplicador_bonus_inicial - 1), limite_bonus)
+        saldo = saldo_inicial + valor_bonus
+        aposta_por_linha = aposta_total / LINHAS
+        meta_apostas = rollover * (valor_bonus if somente_bonus else saldo)
+        rodadas, total_ganho, total_apostado, controle, atingiu = 0, 0.0, 0.0, 0.0, False
+
+        while saldo >= aposta_total and rodadas < max_rodadas and total_apostado < meta_apostas:
+            saldo -= aposta_total
+            total_apostado += aposta_total
+            premio, desvio = _girar(tabela, indices, cilindros, parametros, fortuna, estado)
+            ganho = premio * aposta_por_linha
+            controle += aposta_por_linha * desvio
+            saldo += ganho
+            total_ganho += ganho
+            _acumular(acumulador, histograma, bordas, ganho / aposta_total)
+            rodadas += 1
+            if total_apostado >= meta_apostas:
+                atingiu = True
+                break
+
+        saida[0, j] = saldo - (saldo_inicial + valor_bonus)
+        saida[1, j] = saldo - saldo_inicial
+        saida[2, j] = rodadas
+        saida[3, j] = atingiu
+        saida[4, j] = total_ganho
+        saida[5, j] = saldo
+        saida[6, j] = controle
+    return saida, fortuna[1]
+
+
+@njit(cache=True)
+def _sessoes_cashback(nucleo, chaves, saldos_iniciais, cashback_percentual, rollover_multiplicador, valor_maximo,
+                      acumulador, histograma, bordas):
+    tabela, indices, cilindros, parametros = nucleo
+    n = len(saldos_iniciais)
+    saida = np.zeros((6, n))
+    estado = np.zeros(N + 1, dtype=np.int64)
+    fortuna = np.zeros(2, dtype=np.int64)  # Giros da fortuna que faltam, ativações
+    for j in range(n):
+        _semear(estado, chaves[j])
+        fortuna[0] = 0
+        cashback = min(saldos_iniciais[j] * (cashback_percentual / 100), valor_maximo)
+        saldo = cashback
+        total_apostado, controle, total_ganho, rodadas, atingiu = 0.0, 0.0, 0.0, 0, False
+
+        # `rng.uniform(0.10, 0.20)` e `round` (metade para o par) do laço em Python
+        percentual_escolhido = 0.10 + (0.20 - 0.10) * _aleatorio(estado)
+        aposta_fixa = np.rint(percentual_escolhido * cashback / APOSTA_MINIMA) * APOSTA_MINIMA
+        if aposta_fixa < APOSTA_MINIMA:
+            aposta_fixa = APOSTA_MINIMA
+
+        while saldo >= APOSTA_MINIMA:
+            if saldo >= aposta_fixa:
+                aposta_total = aposta_fixa
+            else:
+                aposta_total = np.rint(saldo / APOSTA_MINIMA) * APOSTA_MINIMA
+                if aposta_total < APOSTA_MINIMA:
+                    break
+            aposta_por_linha = aposta_total / LINHAS
+
+            saldo -= aposta_total
+            total_apostado += aposta_total
+            premio, desvio = _girar(tabela, indices, cilindros, parametros, fortuna, estado)
+            ganho = premio * aposta_por_linha
+            controle += aposta_por_linha * desvio
+            saldo += ganho
+            total_ganho += ganho
+            _acumular(acumulador, histograma, bordas, ganho / aposta_total)
+            rodadas += 1
+
+            if total_apostado >= cashback * rollover_multiplicador:
+                atingiu = True
+                break
+
+        saida[0, j] = saldo - cashback
+        saida[1, j] = rodadas
+        saida[2, j] = total_apostado
+        saida[3, j] = total_ganho
+        saida[4, j] = atingiu
+        saida[5, j] = controle
+    return saida, fortuna[1]
+
+
+@njit(cache=True)
+def _sessoes_rodadas_gratis(nucleo, chaves, num_rodadas, aposta, acumulador, histograma, bordas):
+    tabela, indices, cilindros, parametros = nucleo
+    n = len(chaves)
+    saida = np.zeros((3, n))
+    estado = np.zeros(N + 1, dtype=np.int64)
+    fortuna = np.zeros(2, dtype=np.int64)  # Giros da fortuna que faltam, ativações
+    aposta_por_linha = aposta / LINHAS
+    for j in range(n):
+        _semear(estado, chaves[j])
+        fortuna[0] = 0
+        saldo, controle, total_apostado = 0.0, 0.0, 0.0
+        for _ in range(num_rodadas):
+            premio, desvio = _girar(tabela, indices, cilindros, parametros, fortuna, estado)
+            ganho = premio * aposta_por_linha
+            controle += aposta_por_linha * desvio
+            saldo += ganho
+            total_apostado += aposta
+            _acumular(acumulador, histograma, bordas, ganho / aposta)
+        saida[0, j] = saldo
+        saida[1, j] = total_apostado
+        saida[2, j] = controle
+    return saida, fortuna[1]
+
+
+# === Interface no formato dos scripts ===
+
+def _vetores(acumulador):
+    """Estado de um `motor.estatisticas.Acumulador` para o núcleo."""
+    valores = np.array([acumulador.n, acumulador.soma, acumulador.media, acumulador.m2,
+                        acumulador.minimo, acumulador.maximo], dtype=np.float64)
+    if acumulador.bordas is None:
+        return valores, np.zeros(0, dtype=np.int64), np.zeros(0)
+    return valores, np.array(acumulador.histograma, dtype=np.int64), np.array(acumulador.bordas)
+
+
+def _devolver(acumulador, valores, histograma):
+    acumulador.n = int(valores[0])
+    acumulador.soma, acumulador.media, acumulador.m2 = float(valores[1]), float(valores[2]), float(valores[3])
+    acumulador.minimo, acumulador.maximo = float(valores[4]), float(valores[5])
+    if acumulador.bordas is not None:
+        acumulador.histograma = histograma.tolist()
+
+
+def _com_acumulador(ganhos_rodada, medidor, sessoes, *args):
+    valores, histograma, bordas = _vetores(ganhos_rodada)
+    saida, ativacoes = sessoes(*args, valores, histograma, bordas)
+    _devolver(ganhos_rodada, valores, histograma)
+    if ativacoes:
+        medidor.contar("ativacoes_fortuna", ativacoes)
+    return saida
+
+
+def sessoes_bonus_deposito(jogo, semente, inicio, saldos_iniciais, apostas, rollover, multiplicador_bonus_inicial,
+                           limite_bonus, somente_bonus, max_rodadas, ganhos_rodada, medidor=DESLIGADO):
+    """`simular_jogador` de simularBonusDeposito para os jogadores inicio, inicio + 1, ...
+    da campanha `semente`, com o ganho / aposta de cada giro em `ganhos_rodada`
+    e as ativações da fortuna contadas no `medidor` (motor.instrumentacao).
+
+    Devolve uma tupla por jogador: (lucro_bonus, lucro_inicial, rodadas,
+    atingiu_rollover, total_ganho, saldo, saldo_inicial, aposta, controle).
+    """
+    saldos_iniciais = np.asarray(saldos_iniciais, dtype=np.float64)
+    apostas = np.asarray(apostas, dtype=np.float64)
+    saida = _com_acumulador(ganhos_rodada, medidor, _sessoes_bonus_deposito, empacotar(jogo),
+                            chaves_jogadores(semente, inicio, len(saldos_iniciais)), saldos_iniciais, apostas,
+                            float(rollover), float(multiplicador_bonus_inicial), float(limite_bonus),
+                            bool(somente_bonus), int(max_rodadas))
+    lucro_bonus, lucro_inicial, rodadas, atingiu, ganho, saldo, controle = saida.tolist()
+    return list(zip(lucro_bonus, lucro_inicial, map(int, rodadas), map(bool, atingiu), ganho, saldo,
+                    saldos_iniciais.tolist(), apostas.tolist(), controle))
+
+
+def sessoes_cashback(jogo, semente, inicio, saldos_iniciais, cashback_percentual, rollover_multiplicador,
+                     valor_maximo, ganhos_rodada, medidor=DESLIGADO):
+    """`simular_jogador` de simularCashback para os jogadores inicio, inicio + 1, ...
+
+    Devolve uma tupla por jogador: (lucro, rodadas, total_apostado, total_ganho,
+    atingiu_rollover, controle).
+    """
+    saldos_iniciais = np.asarray(saldos_iniciais, dtype=np.float64)
+    saida = _com_acumulador(ganhos_rodada, medidor, _sessoes_cashback, empacotar(jogo),
+                            chaves_jogadores(semente, inicio, len(saldos_iniciais)), saldos_iniciais,
+                            float(cashback_percentual), float(rollover_multiplicador), float(valor_maximo))
+    lucro, rodadas, apostado, ganho, atingiu, controle = saida.tolist()
+    return list(zip(lucro, map(int, rodadas), apostado, ganho, map(bool, atingiu), controle))
+
+
+def sessoes_rodadas_gratis(jogo, semente, inicio, num_jogadores, num_rodadas, aposta, ganhos_rodada,
+                           medidor=DESLIGADO):
+    """`simular_jogador` de simularRodadasGratis para os jogadores inicio, inicio + 1, ...
+
+    Devolve uma tupla por jogador: (saldo, total_apostado, controle).
+    """
+    saida = _com_acumulador(ganhos_rodada, medidor, _sessoes_rodadas_gratis, empacotar(jogo),
+                            chaves_jogadores(semente, inicio, num_jogadores), int(num_rodadas), float(aposta))
+    return list(zip(*saida.tolist()))
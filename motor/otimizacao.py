@@ -0,0 +1,160 @@
+"""Busca determinística de pesos inteiros contra uma função de RTP exata.
+
+Substitui o sorteio de variações de ±30% dos `buscaPesos`: partindo dos pesos
+de referência, testa mudanças em uma coordenada (±passo) e transferências de
+`passo` entre duas coordenadas, fica com a que mais reduz o erro e reduz o
+passo pela metade quando nenhuma melhora. Num ótimo local com passo 1 ainda
+fora da tolerância, recomeça do melhor ponto com o passo inicial, enquanto o
+ciclo anterior tiver melhorado algo. É uma busca local: não percorre todas as
+configurações válidas. Sem sorteios, a mesma entrada sempre leva ao mesmo
+resultado.
+
+`explorar_fronteira` parte do resultado da busca e percorre, com os mesmos
+movimentos, as configurações com RTP dentro da margem, devolvendo as que não
+são dominadas nos objetivos pedidos (frequência de acerto, volatilidade...).
+"""
+from collections import deque
+
+
+def _vizinhos(vetor, passo):
+    n = len(vetor)
+    for i in range(n):
+        for sinal in (1, -1):
+            vizinho = list(vetor)
+            vizinho[i] += sinal * passo
+            yield vizinho
+    # Pares de coordenadas: transferências mantêm o tamanho do pool, e os
+    # movimentos conjuntos dão a resolução fina que um passo sozinho não alcança
+    for i in range(n):
+        for j in range(i + 1, n):
+            for si, sj in ((1, -1), (-1, 1), (1, 1), (-1, -1)):
+                vizinho = list(vetor)
+                vizinho[i] += si * passo
+                vizinho[j] += sj * passo
+                yield vizinho
+
+
+def otimizar_inteiros(calcular_rtp, inicial, rtp_alvo, minimos, maximos, valido=None,
+                      tolerancia=0.01, passo_inicial=None, max_avaliacoes=20000):
+    """Minimiza |calcular_rtp(vetor) - rtp_alvo| sobre vetores inteiros com
+    minimos[i] <= vetor[i] <= maximos[i] e `valido(vetor)` verdadeiro (ex.: limite
+    do pool). Para ao chegar em `tolerancia` (pontos percentuais); num ótimo
+    local com passo 1 fora dela, volta ao passo inicial a partir do melhor ponto,
+    até um ciclo inteiro de passos não melhorar nada.
+
+    Devolve (vetor, rtp, avaliacoes).
+    """
+    vetor = [int(v) for v in inicial]
+    for i, v in enumerate(vetor):
+        vetor[i] = min(max(v, minimos[i]), maximos[i])
+    if valido is not None and not valido(vetor):
+        raise ValueError("O ponto inicial não respeita as restrições")
+
+    rtp = calcular_rtp(vetor)
+    erro = abs(rtp - rtp_alvo)
+    avaliacoes = 1
+    passo = passo_maximo = passo_inicial or max(1, max(vetor) // 4)
+    melhorou = False  # No ciclo de passos atual, de passo_maximo até 1
+    visitados = {tuple(vetor)}
+
+    while erro > tolerancia and avaliacoes < max_avaliacoes:
+        melhor = None
+        for vizinho in _vizinhos(vetor, passo):
+            chave = tuple(vizinho)
+            if chave in visitados:
+                continue
+            if any(v < lo or v > hi for v, lo, hi in zip(vizinho, minimos, maximos)):
+                continue
+            if valido is not None and not valido(vizinho):
+                continue
+            visitados.add(chave)
+            rtp_vizinho = calcular_rtp(vizinho)
+            avaliacoes += 1
+            erro_vizinho = abs(rtp_vizinho - rtp_alvo)
+            # Desigualdade estrita: empates ficam com o primeiro vizinho na ordem fixa
+            if erro_vizinho < erro and (melhor is None or erro_vizinho < melhor[2]):
+                melhor = (vizinho, rtp_vizinho, erro_vizinho)
+
+        if melhor is not None:
+            vetor, rtp, erro = melhor
+            melhorou = True
+        elif passo > 1:
+            passo //= 2
+        elif melhorou and passo_maximo > 1:
+            # Ótimo local com passo 1: os passos grandes em volta do novo ponto ainda não foram vistos
+            passo, melhorou = passo_maximo, False
+        else:
+            break  # Um ciclo inteiro sem melhora
+
+    return vetor, rtp, avaliacoes
+
+
+def escalar_para_pool(pesos, limite_pool):
+    """Multiplica os pesos pelo maior inteiro que cabe no pool: as probabilidades
+    não mudam, mas o otimizador ganha resolução."""
+    escala = max(1, limite_pool // int(sum(pesos)))
+    return [int(p) * escala for p in pesos]
+
+
+def pesos_validos(pesos, limite_pool):
+    """Pool dentro do limite."""
+    return sum(pesos) <= limite_pool
+
+
+def _domina(a, b, objetivos):
+    """`a` é pelo menos tão bom quanto `b` em tudo e melhor em algum objetivo."""
+    melhor_em_algum = False
+    for nome, sentido in objetivos.items():
+        x, y = (a[nome], b[nome]) if sentido == "min" else (b[nome], a[nome])
+        if x > y:
+            return False
+        melhor_em_algum = melhor_em_algum or x < y
+    return melhor_em_algum
+
+
+def fronteira_pareto(candidatos, objetivos):
+    """Filtra [(vetor, metricas)] deixando só os não dominados.
+    `objetivos` leva o nome da métrica a "min" ou "max"."""
+    fronteira = []
+    for vetor, metricas in candidatos:
+        if any(_domina(m, metricas, objetivos) for _, m in fronteira):
+            continue
+        fronteira = [(v, m) for v, m in fronteira if not _domina(metricas, m, objetivos)]
+        fronteira.append((vetor, metricas))
+    return fronteira
+
+
+def explorar_fronteira(calcular_metricas, inicial, rtp_alvo, margem_erro, objetivos, minimos, maximos,
+                       valido=None, max_avaliacoes=5000, passo=1):
+    """Busca em largura, a partir de `inicial`, pelos vetores com |rtp - rtp_alvo|
+    <= margem_erro. `calcular_metricas(vetor)` devolve um dicionário com "rtp" e
+    as métricas de `objetivos`. Devolve a fronteira de Pareto [(vetor, metricas)]."""
+    inicial = [int(v) for v in inicial]
+    metricas = calcular_metricas(inicial)
+    if abs(metricas["rtp"] - rtp_alvo) > margem_erro:
+        raise ValueError("O ponto inicial precisa estar dentro da margem de RTP")
+
+    candidatos = [(inicial, metricas)]
+    fila = deque([inicial])
+    visitados = {tuple(inicial)}
+    avaliacoes = 1
+    while fila and avaliacoes < max_avaliacoes:
+        vetor = fila.popleft()
+        for vizinho in _vizinhos(vetor, passo):
+            if avaliacoes >= max_avaliacoes:
+                break
+            chave = tuple(vizinho)
+            if chave in visitados:
+                continue
+            visitados.add(chave)
+            if any(v < lo or v > hi for v, lo, hi in zip(vizinho, minimos, maximos)):
+                continue
+            if valido is not None and not valido(vizinho):
+                continue
+            metricas = calcular_metricas(vizinho)
+            avaliacoes += 1
+            if abs(metricas["rtp"] - rtp_alvo) <= margem_erro:
+                candidatos.append((vizinho, metricas))
+                fila.append(vizinho)
+
+    return fronteira_pareto(candidatos, objetivos)
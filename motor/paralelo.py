@@ -0,0 +1,66 @@
+"""Pool de processos com resultados que não dependem do número de processos.
+
+Na busca aleatória de parâmetros (`buscar_em_paralelo`) os candidatos são
+gerados no processo principal, em ordem, por um `random.Random`
+com a semente da busca, e cada um é simulado com o fluxo `índice` da semente
+(ver motor.sementes). Os resultados são lidos na ordem dos candidatos, então o
+melhor até agora e a parada ao entrar na margem dão exatamente o mesmo resultado
+com 1 ou 32 processos.
+
+Com `sementes_comuns` todos os candidatos são simulados com a mesma semente
+(números aleatórios comuns): a comparação entre dois candidatos fica bem menos
+ruidosa do que o RTP de cada um isolado.
+
+`mapear_lotes` faz o mesmo para as campanhas: cada lote de jogadores tem o seu
+fluxo, e os resultados parciais chegam na ordem dos lotes.
+"""
+import random
+from multiprocessing import Pool
+
+from motor.sementes import semente_derivada
+
+
+def mapear_lotes(funcao, tarefas, processos=1):
+    """Gera `funcao(tarefa)` para cada tarefa, na ordem das tarefas, com o trabalho
+    dividido entre `processos` processos. Juntando os resultados nessa ordem, até
+    as somas de ponto flutuante saem iguais com qualquer número de processos."""
+    if processos <= 1:
+        yield from map(funcao, tarefas)
+        return
+    with Pool(processos) as pool:
+        yield from pool.imap(funcao, tarefas)
+
+
+def buscar_em_paralelo(gerar, avaliar, rtp_alvo, margem_erro, tentativas, semente=0,
+                       processos=1, tamanho_lote=None, ao_melhorar=None, sementes_comuns=False):
+    """Sorteia até `tentativas` candidatos com `gerar(rng)` e avalia cada um com
+    `avaliar((candidato, semente))`, que precisa ser uma função de módulo (pickle).
+    `ao_melhorar(tentativa, rtp)` é chamada a cada novo melhor.
+
+    Devolve (melhor_candidato, melhor_rtp, tentativas_avaliadas).
+    """
+    gerador = random.Random(semente)
+    tamanho_lote = tamanho_lote or 4 * processos
+    pool = Pool(processos) if processos > 1 else None
+    mapear = pool.imap if pool is not None else map
+
+    melhor, melhor_rtp = None, None
+    try:
+        for inicio in range(0, tentativas, tamanho_lote):
+            indices = range(inicio, min(inicio + tamanho_lote, tentativas))
+            lote = [(gerar(gerador), semente_derivada(semente, 0 if sementes_comuns else i))
+                    for i in indices]
+            # imap devolve na ordem do lote, mesmo com os processos terminando fora de ordem
+            for i, (candidato, _), rtp in zip(indices, lote, mapear(avaliar, lote)):
+                if melhor_rtp is None or abs(rtp - rtp_alvo) < abs(melhor_rtp - rtp_alvo):
+                    melhor, melhor_rtp = candidato, rtp
+                    if ao_melhorar is not None:
+                        ao_melhorar(i + 1, rtp)
+                    if abs(rtp - rtp_alvo) <= margem_erro:
+                        return melhor, melhor_rtp, i + 1
+        return melhor, melhor_rtp, tentativas
+    finally:
+        if pool is not None:
+            # Descarta o resto do lote quando a busca para cedo
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,241 @@
+"""Simulação das campanhas com a população inteira de jogadores em vetores.
+
+O estado de todos os jogadores ativos (saldo, total apostado, aposta, meta de
+rollover, rodada da fortuna...) fica em vetores NumPy e cada passo faz um giro
+de todos eles de uma vez. Quem quebra, atinge o rollover ou chega ao limite de
+rodadas sai dos vetores no fim do passo e o seu resultado é gravado na posição
+original, então os passos seguintes só trabalham com quem ainda joga.
+
+As regras são as dos scripts de simularBonusDeposito, simularCashback e
+simularRodadasGratis. Os resultados são vetores por jogador, na ordem da
+entrada; com `ganhos_rodada` (um `motor.estatisticas.Acumulador`) o ganho /
+aposta de cada giro também é acumulado. Com um `medidor` ligado
+(motor.instrumentacao) cada etapa do passo é cronometrada e as ativações da
+fortuna são contadas.
+"""
+import numpy as np
+
+from motor.instrumentacao import DESLIGADO
+
+LINHAS = 5
+APOSTA_MINIMA = 0.5
+
+
+class Jogo:
+    """Regras de um giro de um `motor.jogos.Avaliador`, incluindo a fortuna.
+
+    No Dragão a fortuna é sorteada antes de cada giro fora dela e dura
+    `rodadas_fortuna` giros; com `fortuna_apos_giro_normal` (rodadas grátis) o
+    sorteio acontece depois de um giro normal. No Ratinho a fortuna é sorteada
+    antes de cada giro fora dela e termina no primeiro giro com prêmio.
+
+    Com uma `fita` (motor.fitas.FitaGiros) a grade, o prêmio e o cilindro de
+    cada giro são lidos da fita em vez de sorteados; a fortuna continua sorteada.
+    """
+
+    def __init__(self, avaliador, fortuna_apos_giro_normal=False, fita=None):
+        self.avaliador = avaliador
+        self.fita = fita
+        self.nome = avaliador.nome
+        self.prob_fortuna = avaliador.prob_fortuna
+        self.rodadas_fortuna = avaliador.rodadas_fortuna
+        self.fortuna_apos_giro_normal = fortuna_apos_giro_normal
+
+    def girar(self, fortuna, rng, medidor=DESLIGADO):
+        """Um giro de cada jogador. `fortuna` (inteiros, alterado no lugar) guarda os
+        giros da fortuna que faltam no Dragão e 1/0 no Ratinho.
+
+        Devolve (prêmio, controle) em apostas por linha.
+        """
+        avaliador = self.avaliador
+        n = len(fortuna)
+        with medidor.etapa("giro.fortuna"):
+            if self.nome == "dragao" and not self.fortuna_apos_giro_normal:
+                novas = (fortuna == 0) & (rng.random(n) < self.prob_fortuna)
+                fortuna[novas] = self.rodadas_fortuna
+                if medidor.ligado:
+                    medidor.contar("ativacoes_fortuna", np.count_nonzero(novas))
+            elif self.nome == "ratinho":
+                sorteio = rng.random(n) < self.prob_fortuna
+                if medidor.ligado:
+                    medidor.contar("ativacoes_fortuna", np.count_nonzero(sorteio & (fortuna == 0)))
+                fortuna[sorteio] = 1
+            ativa = fortuna > 0
+
+        if self.fita is not None:
+            with medidor.etapa("giro.fita"):
+                premio, soma_linhas = self.fita.ler(ativa, rng)
+        else:
+            with medidor.etapa("giro.grade"):
+                linhas = avaliador.gerar_linhas(n, rng, ativa)
+            with medidor.etapa("giro.premio"):
+                # O Dragão sem o cilindro é só a soma das linhas: a variável de controle
+                soma_linhas = avaliador.somas_linhas(linhas)
+                if self.nome != "dragao":
+                    premio = avaliador.premios(linhas)
+            if self.nome == "dragao":
+                with medidor.etapa("giro.cilindro"):
+                    premio = soma_linhas * avaliador.girar_cilindros(ativa, rng)
+
+        with medidor.etapa("giro.fortuna"):
+            if self.nome == "ratinho":
+                controle = soma_linhas - np.where(ativa, avaliador.media_linhas_fortuna, avaliador.media_linhas)
+                fortuna[ativa & (premio > 0)] = 0
+            else:
+                controle = soma_linhas - avaliador.media_linhas
+            if self.nome == "dragao":
+                sorteio = rng.random(n) < self.prob_fortuna if self.fortuna_apos_giro_normal else None
+                fortuna[ativa] -= 1
+                if sorteio is not None:
+                    novas = ~ativa & sorteio
+                    fortuna[novas] = self.rodadas_fortuna
+                    if medidor.ligado:
+                        medidor.contar("ativacoes_fortuna", np.count_nonzero(novas))
+        return premio, controle
+
+
+def _novo_estado(ativos, **vetores):
+    """Estado dos jogadores ativos: o índice original e um vetor por grandeza."""
+    estado = {nome: np.array(v[ativos]) for nome, v in vetores.items()}
+    estado["indice"] = ativos
+    estado["fortuna"] = np.zeros(len(ativos), dtype=np.int64)
+    return estado
+
+
+def _girar_todos(jogo, estado, aposta, rng, ganhos_rodada, medidor):
+    """Um passo: todos apostam `aposta`, giram e recebem o prêmio."""
+    premio, controle = jogo.girar(estado["fortuna"], rng, medidor)
+    with medidor.etapa("passo.saldos"):
+        estado["saldo"] -= aposta
+        estado["apostado"] += aposta
+        aposta_por_linha = aposta / LINHAS
+        ganho = premio * aposta_por_linha
+        estado["saldo"] += ganho
+        estado["ganho"] += ganho
+        estado["controle"] += aposta_por_linha * controle
+    if ganhos_rodada is not None:
+        with medidor.etapa("passo.ganhos_rodada"):
+            ganhos_rodada.adicionar_lote(ganho / aposta)
+
+
+def _compactar(estado, continua, resultado, rodadas, medidor):
+    """Grava quem terminou em `resultado` e tira essas posições do estado."""
+    if continua.all():
+        return estado
+    with medidor.etapa("passo.compactacao"):
+        fim = ~continua
+        indices = estado["indice"][fim]
+        resultado["rodadas"][indices] = rodadas
+        for nome, vetor in resultado.items():
+            if nome in estado:
+                vetor[indices] = estado[nome][fim]
+        return {nome: v[continua] for nome, v in estado.items()}
+
+
+def _resultado(n, **extras):
+    resultado = {
+        "rodadas": np.zeros(n, dtype=np.int64),
+        "saldo": np.zeros(n),
+        "apostado": np.zeros(n),
+        "ganho": np.zeros(n),
+        "controle": np.zeros(n),
+        "atingiu_rollover": np.zeros(n, dtype=bool),
+    }
+    resultado.update(extras)
+    return resultado
+
+
+def simular_bonus_deposito(jogo, saldos_iniciais, apostas, rollover, multiplicador_bonus_inicial,
+                           limite_bonus, somente_bonus=False, max_rodadas=10000, rng=None, ganhos_rodada=None,
+                           medidor=DESLIGADO):
+    """Bônus de depósito: o jogador recebe o bônus e joga com a aposta fixa até
+    quebrar, cumprir `rollover` vezes o saldo (ou só o bônus) ou fazer
+    `max_rodadas` giros.
+
+    Devolve vetores por jogador: rodadas, saldo (final), apostado, ganho,
+    controle, atingiu_rollover, bonus, lucro_bonus e lucro_inicial.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    saldos_iniciais = np.asarray(saldos_iniciais, dtype=np.float64)
+    apostas = np.asarray(apostas, dtype=np.float64)
+    n = len(saldos_iniciais)
+
+    bonus = np.minimum(saldos_iniciais * (multiplicador_bonus_inicial - 1), limite_bonus)
+    saldo = saldos_iniciais + bonus
+    meta = rollover * (bonus if somente_bonus else saldo)
+    resultado = _resultado(n, bonus=bonus)
+    resultado["saldo"][:] = saldo
+
+    ativos = np.flatnonzero((saldo >= apostas) & (meta > 0)) if max_rodadas > 0 else np.zeros(0, dtype=np.intp)
+    estado = _novo_estado(ativos, saldo=saldo, aposta=apostas, meta=meta,
+                          apostado=np.zeros(n), ganho=np.zeros(n), controle=np.zeros(n))
+    rodadas = 0
+    while len(estado["indice"]):
+        _girar_todos(jogo, estado, estado["aposta"], rng, ganhos_rodada, medidor)
+        rodadas += 1
+        atingiu = estado["apostado"] >= estado["meta"]
+        estado["atingiu_rollover"] = atingiu
+        continua = ~atingiu & (estado["saldo"] >= estado["aposta"]) & (rodadas < max_rodadas)
+        estado = _compactar(estado, continua, resultado, rodadas, medidor)
+
+    resultado["lucro_bonus"] = resultado["saldo"] - (saldos_iniciais + bonus)
+    resultado["lucro_inicial"] = resultado["saldo"] - saldos_iniciais
+    return resultado
+
+
+def simular_cashback(jogo, saldos_iniciais, cashback_percentual, rollover_multiplicador,
+                     valor_maximo=float("inf"), rng=None, ganhos_rodada=None, medidor=DESLIGADO):
+    """Cashback: o jogador joga o cashback com uma aposta fixa sorteada entre 10% e
+    20% dele (múltiplo de R$ 0,50), apostando o que sobra quando o saldo não
+    cobre a aposta, até quebrar ou apostar `rollover_multiplicador` vezes o
+    cashback.
+
+    Devolve vetores por jogador: rodadas, saldo (final), apostado, ganho,
+    controle, atingiu_rollover, cashback, aposta_fixa e lucro.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    saldos_iniciais = np.asarray(saldos_iniciais, dtype=np.float64)
+    n = len(saldos_iniciais)
+
+    cashback = np.minimum(saldos_iniciais * (cashback_percentual / 100), valor_maximo)
+    aposta_fixa = np.round(rng.uniform(0.10, 0.20, n) * cashback / APOSTA_MINIMA) * APOSTA_MINIMA
+    aposta_fixa = np.maximum(aposta_fixa, APOSTA_MINIMA)
+    resultado = _resultado(n, cashback=cashback, aposta_fixa=aposta_fixa)
+    resultado["saldo"][:] = cashback
+
+    estado = _novo_estado(np.flatnonzero(cashback >= APOSTA_MINIMA), saldo=cashback, aposta_fixa=aposta_fixa,
+                          meta=cashback * rollover_multiplicador,
+                          apostado=np.zeros(n), ganho=np.zeros(n), controle=np.zeros(n))
+    rodadas = 0
+    while len(estado["indice"]):
+        saldo = estado["saldo"]
+        # Sem saldo para a aposta fixa, aposta o saldo arredondado para múltiplo de R$ 0,50
+        aposta = np.where(saldo >= estado["aposta_fixa"], estado["aposta_fixa"],
+                          np.round(saldo / APOSTA_MINIMA) * APOSTA_MINIMA)
+        _girar_todos(jogo, estado, aposta, rng, ganhos_rodada, medidor)
+        rodadas += 1
+        atingiu = estado["apostado"] >= estado["meta"]
+        estado["atingiu_rollover"] = atingiu
+        continua = ~atingiu & (estado["saldo"] >= APOSTA_MINIMA)
+        estado = _compactar(estado, continua, resultado, rodadas, medidor)
+
+    resultado["lucro"] = resultado["saldo"] - cashback
+    return resultado
+
+
+def simular_rodadas_gratis(jogo, num_jogadores, num_rodadas, aposta, rng=None, ganhos_rodada=None,
+                           medidor=DESLIGADO):
+    """Rodadas grátis: cada jogador faz `num_rodadas` giros de `aposta` sem pagar.
+
+    Devolve vetores por jogador: rodadas, saldo (= ganho), apostado, ganho e controle.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    resultado = _resultado(num_jogadores)
+    estado = _novo_estado(np.arange(num_jogadores), saldo=np.zeros(num_jogadores),
+                          apostado=np.zeros(num_jogadores), ganho=np.zeros(num_jogadores),
+                          controle=np.zeros(num_jogadores))
+    for _ in range(num_rodadas):
+        _girar_todos(jogo, estado, aposta, rng, ganhos_rodada, medidor)
+        estado["saldo"] += aposta  # O giro é grátis
+    estado = _compactar(estado, np.zeros(num_jogadores, dtype=bool), resultado, num_rodadas, medidor)
+    return resultado
@@ -0,0 +1,87 @@
+"""Checkpoints das campanhas: retomar com `--resume` de onde a execução parou.
+
+O resultado de um lote só depende da semente da campanha e do índice do lote
+ou dos jogadores (motor.sementes), e os lotes são juntados na ordem. Então o
+estado de uma campanha interrompida é o dicionário de resultados já juntados
+mais quantos lotes entraram nele: a posição dos geradores de cada lote sai do
+índice, sem nada mais para guardar. Retomando com os lotes que faltam, na
+mesma ordem, até as somas de ponto flutuante saem iguais às de uma execução
+sem interrupção.
+
+O arquivo é gravado por inteiro num temporário e trocado com `os.replace`,
+então uma interrupção no meio da gravação (ou no meio de uma junção) deixa o
+checkpoint anterior intacto. A assinatura da configuração (lotes, parâmetros
+da campanha, jogo) vai junto: retomar depois de mudar a configuração é erro,
+não uma mistura de duas campanhas.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import time
+
+OPCAO = "--resume"
+
+
+def pediu_retomada(argumentos=None):
+    """Se a linha de comando (ou `argumentos`) pede para retomar."""
+    return OPCAO in (sys.argv[1:] if argumentos is None else argumentos)
+
+
+def assinatura(configuracao):
+    """Resumo SHA-256 do pickle de `configuracao` (tarefas, parâmetros, jogo)."""
+    return hashlib.sha256(pickle.dumps(configuracao, pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+
+class Checkpoint:
+    """Estado de uma campanha em `caminho`, gravado a cada `intervalo` segundos
+    (None não grava nada).
+
+        checkpoint = Checkpoint(caminho, (tarefas, ...), intervalo)
+        resultados, feitos = checkpoint.retomar(novos_resultados, pediu_retomada())
+        for lote, parcial in enumerate(mapear_lotes(funcao, tarefas[feitos:]), start=feitos + 1):
+            juntar_resultados(resultados, parcial)
+            checkpoint.gravar(resultados, lote)
+        checkpoint.concluir()
+    """
+
+    def __init__(self, caminho, configuracao, intervalo=60.0):
+        self.caminho = caminho
+        self.assinatura = assinatura(configuracao)
+        self.intervalo = intervalo
+        self._ultima = time.monotonic()
+
+    def retomar(self, novos_resultados, retomar=True):
+        """(resultados, lotes já juntados): os do arquivo ao retomar, senão
+        `novos_resultados()` e zero."""
+        if not retomar:
+            return novos_resultados(), 0
+        if not os.path.exists(self.caminho):
+            print(f"Nenhum checkpoint em {self.caminho}; começando do início")
+            return novos_resultados(), 0
+        with open(self.caminho, "rb") as arquivo:
+            estado = pickle.load(arquivo)
+        if estado["assinatura"] != self.assinatura:
+            raise ValueError(f"O checkpoint {self.caminho} é de outra configuração da campanha; "
+                             "apague o arquivo ou volte à configuração dele")
+        print(f"Retomando de {self.caminho}: {estado['lotes']} lotes já simulados")
+        self._ultima = time.monotonic()
+        return estado["resultados"], estado["lotes"]
+
+    def gravar(self, resultados, lotes, forcar=False):
+        """Grava o estado depois de `lotes` lotes juntados, se já passou o intervalo."""
+        if self.intervalo is None or (not forcar and time.monotonic() - self._ultima < self.intervalo):
+            return
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "wb") as arquivo:
+            pickle.dump({"assinatura": self.assinatura, "lotes": lotes, "resultados": resultados},
+                        arquivo, pickle.HIGHEST_PROTOCOL)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho)
+        self._ultima = time.monotonic()
+
+    def concluir(self):
+        """Campanha completa: o checkpoint não serve mais."""
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
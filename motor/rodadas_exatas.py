@@ -0,0 +1,221 @@
+"""Distribuição exata do ganho de um número fixo de rodadas grátis, sem simulação.
+
+O ganho das rodadas é a soma dos prêmios de N giros: sem fortuna, a
+distribuição do prêmio de um giro (`motor.distribuicao`) convoluída N vezes.
+Com fortuna o prêmio depende do estado do giro e o estado do giro seguinte
+depende do atual (no Ratinho, também do prêmio), então cada transição
+(origem, destino) leva a sub-distribuição dos prêmios do giro em `origem`
+quando o seguinte está em `destino`, e as convoluções andam pelos estados
+como numa cadeia de Markov.
+
+As convoluções são produtos no domínio da frequência: cada sub-distribuição é
+transformada uma vez, cada giro custa um produto por transição e há uma única
+transformada inversa no fim. Os prêmios são inteiros em apostas por linha, então
+o resultado só tem o arredondamento da FFT (~1e-15 em cada probabilidade); o
+mínimo e o máximo possíveis saem exatos de uma programação dinâmica à parte.
+"""
+import math
+
+import numpy as np
+
+from motor.distribuicao import distribuicao_grades
+from motor.metricas import distribuicao_cilindro, distribuicao_multiplicador_fortuna
+from motor.rtp_exato import cadeia_fortuna_dragao
+from motor.tabelas import PREMIO_JACKPOT_RATINHO
+
+LINHAS = 5
+
+
+def _extremos(inicial, transicoes, num_giros, escolher):
+    """Menor (escolher=np.minimum) ou maior (np.maximum) soma possível."""
+    vazio = math.inf if escolher is np.minimum else -math.inf
+    melhor = np.where(np.asarray(inicial) > 0, 0.0, vazio)
+    for _ in range(num_giros):
+        novo = np.full(len(melhor), vazio)
+        for origem, destino, premios, _ in transicoes:
+            if melhor[origem] != vazio:
+                extremo = premios.min() if escolher is np.minimum else premios.max()
+                novo[destino] = escolher(novo[destino], melhor[origem] + extremo)
+        melhor = novo
+    return int(escolher.reduce(melhor[melhor != vazio]))
+
+
+class DistribuicaoRodadas:
+    """Distribuição do ganho total de `num_giros` giros.
+
+    `inicial[s]` é a probabilidade de o primeiro giro estar no estado s e cada
+    transição é (origem, destino, prêmios, probabilidades), com os prêmios
+    inteiros em apostas por linha. Valores e estatísticas saem multiplicados por
+    `aposta_por_linha` (em R$ com a aposta por linha dos scripts).
+    """
+
+    def __init__(self, inicial, transicoes, num_giros, aposta_por_linha=1.0):
+        inicial = np.asarray(inicial, dtype=np.float64)
+        transicoes = [(o, d, np.asarray(v, dtype=np.int64), np.asarray(p, dtype=np.float64))
+                      for o, d, v, p in transicoes]
+        transicoes = [(o, d, v[p > 0], p[p > 0]) for o, d, v, p in transicoes if np.any(p > 0)]
+        n_estados = len(inicial)
+        self.num_giros = num_giros
+        self.aposta_por_linha = aposta_por_linha
+        self._minimo = _extremos(inicial, transicoes, num_giros, np.minimum)
+        self._maximo = _extremos(inicial, transicoes, num_giros, np.maximum)
+
+        # Convolução circular sem sobreposição: a FFT cobre todas as somas possíveis
+        tamanho = self._maximo + 1
+        tamanho_fft = 1 << max(tamanho - 1, 1).bit_length()
+        espectros = []
+        for origem, destino, premios, probabilidades in transicoes:
+            densa = np.zeros(tamanho_fft)
+            np.add.at(densa, premios, probabilidades)
+            espectros.append((origem, destino, np.fft.rfft(densa)))
+        if n_estados == 1:
+            # Sem fortuna são N convoluções iguais: uma potência do espectro
+            espectro_soma = inicial[0] * sum(e for _, _, e in espectros) ** num_giros
+        else:
+            estado = [np.full(tamanho_fft // 2 + 1, inicial[s], dtype=np.complex128) for s in range(n_estados)]
+            for _ in range(num_giros):
+                novo = [np.zeros_like(estado[0]) for _ in range(n_estados)]
+                for origem, destino, espectro in espectros:
+                    novo[destino] += estado[origem] * espectro
+                estado = novo
+            espectro_soma = np.sum(estado, axis=0)
+        probabilidades = np.fft.irfft(espectro_soma, tamanho_fft)[:tamanho]
+        self._premios = np.arange(tamanho)
+        self.probabilidades = np.clip(probabilidades, 0.0, None)
+        self.valores = self._premios * aposta_por_linha
+
+        # Momentos de um giro, pela ocupação dos estados em cada giro
+        massa = np.zeros((n_estados, n_estados))
+        momento1 = np.zeros(n_estados)
+        momento2 = np.zeros(n_estados)
+        for origem, destino, premios, probabilidades in transicoes:
+            massa[origem, destino] += probabilidades.sum()
+            momento1[origem] += probabilidades @ premios
+            momento2[origem] += probabilidades @ premios.astype(np.float64) ** 2
+        ocupacao = inicial
+        soma1 = soma2 = 0.0
+        for _ in range(num_giros):
+            soma1 += ocupacao @ momento1
+            soma2 += ocupacao @ momento2
+            ocupacao = ocupacao @ massa
+        media_giro = soma1 / num_giros
+        self.media = soma1 * aposta_por_linha
+        self.media_giro = media_giro * aposta_por_linha
+        self.desvio_giro = math.sqrt(max(soma2 / num_giros - media_giro ** 2, 0.0)) * aposta_por_linha
+
+    @property
+    def minimo(self):
+        return self._minimo * self.aposta_por_linha
+
+    @property
+    def maximo(self):
+        return self._maximo * self.aposta_por_linha
+
+    @property
+    def desvio_padrao(self):
+        media = self.probabilidades @ self.valores
+        return math.sqrt(max(self.probabilidades @ self.valores ** 2 - media ** 2, 0.0))
+
+    @property
+    def rtp(self):
+        """Ganho esperado sobre o valor apostado nas rodadas, em %."""
+        return self.media / (self.num_giros * LINHAS * self.aposta_por_linha) * 100
+
+    def prob_acima(self, limite):
+        """P(ganho > limite), comparando em apostas por linha inteiras."""
+        premio_limite = math.floor(limite / self.aposta_por_linha + 1e-9)
+        return float(self.probabilidades[self._premios > premio_limite].sum())
+
+    def quantil(self, q):
+        """Menor ganho com P(ganho <= valor) >= q."""
+        acumulada = np.cumsum(self.probabilidades)
+        return float(self.valores[min(np.searchsorted(acumulada, q - 1e-12), len(acumulada) - 1)])
+
+
+def giros_tigrinho(pesos, multiplicadores, multiplicador_bonus=10):
+    """(inicial, transições) dos giros do Tigrinho: um único estado."""
+    d = distribuicao_grades("tigrinho", multiplicadores, multiplicador_bonus=multiplicador_bonus)
+    return [1.0], [(0, 0, d.valores, d.probabilidades(pesos))]
+
+
+def giros_ratinho(pesos, multiplicadores, prob_fortuna, premio_jackpot=PREMIO_JACKPOT_RATINHO):
+    """(inicial, transições) dos giros do Ratinho. Estado 0: giro normal; 1: giro
+    no rato da fortuna. A fortuna é sorteada antes de cada giro fora dela e
+    termina no primeiro giro com prêmio."""
+    normal = distribuicao_grades("ratinho", multiplicadores, premio_jackpot=premio_jackpot)
+    fortuna = distribuicao_grades("ratinho", multiplicadores, fortuna_rato=True, premio_jackpot=premio_jackpot)
+    prob_normal = normal.probabilidades(pesos)
+    prob_fortuna_grade = fortuna.probabilidades(pesos)
+    ganhou = fortuna.valores > 0
+    transicoes = [
+        (0, 0, normal.valores, (1 - prob_fortuna) * prob_normal),
+        (0, 1, normal.valores, prob_fortuna * prob_normal),
+        (1, 0, fortuna.valores[ganhou], (1 - prob_fortuna) * prob_fortuna_grade[ganhou]),
+        (1, 1, fortuna.valores[ganhou], prob_fortuna * prob_fortuna_grade[ganhou]),
+        (1, 1, [0], [prob_fortuna_grade[~ganhou].sum()]),
+    ]
+    return [1 - prob_fortuna, prob_fortuna], transicoes
+
+
+def _com_cilindro(grade, pesos, cilindro):
+    """Prêmios (linhas * multiplicador) e probabilidades, com grade e cilindro independentes."""
+    valores = grade.valores
+    probabilidades = grade.probabilidades(pesos)
+    premios = np.concatenate([valores * m for m in cilindro])
+    return premios, np.concatenate([probabilidades * p for p in cilindro.values()])
+
+
+def giros_dragao(pesos, multiplicadores, cilindro_normal, cilindro_fortuna, chance_terceiro_giro,
+                 prob_fortuna, rodadas_fortuna=8, ativa_apos_giro_normal=False):
+    """(inicial, transições) dos giros do Dragão, com os estados de
+    `motor.rtp_exato.cadeia_fortuna_dragao`."""
+    grade = distribuicao_grades("dragao", multiplicadores)
+    normal = _com_cilindro(grade, pesos, distribuicao_cilindro(cilindro_normal))
+    fortuna = _com_cilindro(grade, pesos, distribuicao_multiplicador_fortuna(cilindro_fortuna, chance_terceiro_giro))
+    cadeia = cadeia_fortuna_dragao(prob_fortuna, rodadas_fortuna, ativa_apos_giro_normal)
+    transicoes = []
+    for origem, linha in enumerate(cadeia):
+        premios, probabilidades = normal if origem == 0 else fortuna
+        for destino, prob in enumerate(linha):
+            if prob > 0:
+                transicoes.append((origem, destino, premios, prob * probabilidades))
+    # O primeiro giro sai de um estado sem fortuna
+    inicial = [1.0] + [0.0] * rodadas_fortuna if ativa_apos_giro_normal else cadeia[0]
+    return inicial, transicoes
+
+
+def rodadas_tigrinho(pesos, multiplicadores, num_giros, aposta_por_linha=1.0, multiplicador_bonus=10):
+    return DistribuicaoRodadas(*giros_tigrinho(pesos, multiplicadores, multiplicador_bonus),
+                               num_giros, aposta_por_linha)
+
+
+def rodadas_ratinho(pesos, multiplicadores, prob_fortuna, num_giros, aposta_por_linha=1.0, premio_jackpot=PREMIO_JACKPOT_RATINHO):
+    return DistribuicaoRodadas(*giros_ratinho(pesos, multiplicadores, prob_fortuna, premio_jackpot),
+                               num_giros, aposta_por_linha)
+
+
+def rodadas_dragao(pesos, multiplicadores, cilindro_normal, cilindro_fortuna, chance_terceiro_giro,
+                   prob_fortuna, num_giros, aposta_por_linha=1.0, rodadas_fortuna=8,
+                   ativa_apos_giro_normal=True):
+    """Nas rodadas grátis a fortuna é sorteada depois de um giro normal
+    (`ativa_apos_giro_normal`)."""
+    giros = giros_dragao(pesos, multiplicadores, cilindro_normal, cilindro_fortuna, chance_terceiro_giro,
+                         prob_fortuna, rodadas_fortuna, ativa_apos_giro_normal)
+    return DistribuicaoRodadas(*giros, num_giros, aposta_por_linha)
+
+
+def formatar_rodadas(distribuicao, deposito_inicial, quantis=(0.05, 0.25, 0.5, 0.75, 0.95, 0.99)):
+    """Resumo no formato dos scripts de rodadas grátis, com o ganho líquido do depósito."""
+    linhas = [
+        f"RTP exato: {distribuicao.rtp:.2f}%",
+        f"Ganho médio líquido por jogador: R$ {distribuicao.media - deposito_inicial:.2f}",
+        f"Ganho máximo líquido possível: R$ {distribuicao.maximo - deposito_inicial:.2f}",
+        f"Ganho mínimo líquido possível: R$ {distribuicao.minimo - deposito_inicial:.2f}",
+        f"Percentual de jogadores que terminam com lucro: {distribuicao.prob_acima(deposito_inicial) * 100:.4f}%",
+        f"Volatilidade do ganho por sessão: {distribuicao.desvio_padrao:.2f}",
+        f"Volatilidade do ganho por rodada: {distribuicao.desvio_giro:.2f}",
+        "Quantis do ganho líquido:",
+    ]
+    for q in quantis:
+        linhas.append(f"  {q * 100:g}%: R$ {distribuicao.quantil(q) - deposito_inicial:.2f}")
+    return "\n".join(linhas)
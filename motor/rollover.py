@@ -0,0 +1,146 @@
+"""Probabilidade exata de cumprir o rollover do bônus, por programação dinâmica.
+
+Com a aposta fixa `a`, o valor apostado depois de t giros é t * a: cumprir a meta
+é fazer T = ceil(meta / a) giros sem o saldo ficar abaixo da aposta antes. Em
+apostas por linha (a / 5) cada giro custa 5 e paga um prêmio inteiro, então a
+mesma recorrência vale para qualquer aposta e qualquer saldo inicial. Com
+R_t(k, s) a probabilidade de quebrar faltando t giros, com saldo k e o próximo
+giro no estado de fortuna s:
+
+    R_t(k, s) = 1                                              se k < 5
+    R_t(k, s) = soma_(d, j) P(prêmio j, estado d | s) R_{t-1}(k - 5 + j, d)
+
+e R_0 = 0. Uma única varredura t = 1, 2, ... lê cada jogador quando t chega ao
+seu T, então a população inteira sai de uma passada. O saldo final esperado
+de quem cumpre segue a mesma recorrência, através de D_t(k, s) = k + m_t(s) -
+E[saldo final; cumpriu], onde m_t(s) é a soma esperada de (prêmio - 5) nos t giros.
+
+R e D valem 0 a partir de k = 5t (não dá para quebrar) e caem rápido bem antes
+disso; a grade é cortada onde os dois ficam abaixo de `tolerancia`, então a
+memória fica limitada pela região em que quebrar ainda é possível. Cada passo
+é uma correlação com o prêmio do giro, feita por FFT.
+"""
+import numpy as np
+
+LINHAS = 5
+
+
+def _nucleos(n_estados, transicoes):
+    """Prêmios densos por (origem, destino), massa das transições e deriva de
+    cada estado: prêmio esperado menos o custo de 5 apostas por linha."""
+    transicoes = [(o, d, np.asarray(v, dtype=np.int64), np.asarray(p, dtype=np.float64))
+                  for o, d, v, p in transicoes]
+    maior = max(int(v[p > 0].max()) for _, _, v, p in transicoes if np.any(p > 0))
+    nucleos = {}
+    massa = np.zeros((n_estados, n_estados))
+    deriva = np.zeros(n_estados)
+    for origem, destino, premios, probabilidades in transicoes:
+        if not np.any(probabilidades > 0):
+            continue
+        denso = nucleos.setdefault((origem, destino), np.zeros(maior + 1))
+        np.add.at(denso, premios, probabilidades)
+        massa[origem, destino] += probabilidades.sum()
+        deriva[origem] += probabilidades @ premios
+    deriva -= LINHAS * massa.sum(axis=1)
+    return nucleos, massa, deriva
+
+
+def resolver_rollover(giros, saldos, apostas, metas, max_rodadas=10000, tolerancia=1e-13):
+    """Probabilidade de cada jogador cumprir a meta de apostas antes de ficar sem
+    saldo para a aposta (ou de passar de `max_rodadas` giros), e o saldo final
+    esperado de quem cumpre.
+
+    `giros` é (inicial, transições) de `motor.rodadas_exatas.giros_*`; `saldos`,
+    `apostas` e `metas` são vetores por jogador em R$. Devolve (prob_rollover,
+    saldo_rollover), com nan no saldo quando a probabilidade é zero.
+    """
+    inicial, transicoes = giros
+    inicial = np.asarray(inicial, dtype=np.float64)
+    n_estados = len(inicial)
+    nucleos, massa, deriva = _nucleos(n_estados, transicoes)
+
+    saldos = np.asarray(saldos, dtype=np.float64)
+    apostas = np.asarray(apostas, dtype=np.float64)
+    metas = np.asarray(metas, dtype=np.float64)
+    unidade = apostas / LINHAS
+    # Só a parte inteira do saldo em apostas por linha decide se dá para apostar
+    posicao = saldos / unidade
+    saldo_inteiro = np.floor(posicao + 1e-9).astype(np.int64)
+    fracao = np.maximum(posicao - saldo_inteiro, 0.0)
+    giros_meta = np.ceil(metas / apostas - 1e-9).astype(np.int64)
+
+    prob = np.zeros(len(saldos))
+    saldo_cumpriu = np.zeros(len(saldos))
+    viaveis = np.flatnonzero((saldo_inteiro >= LINHAS) & (giros_meta >= 1) & (giros_meta <= max_rodadas))
+    ordem = viaveis[np.argsort(giros_meta[viaveis], kind="stable")]
+    giros_ordem = giros_meta[ordem]
+
+    # Coluna k de `grade`: R nas linhas 0..n-1 e D nas linhas n..2n-1, uma por estado.
+    # Ficam separados porque na mesma FFT o erro de D (da ordem do saldo) sujaria R.
+    grade = np.zeros((2 * n_estados, 0))
+    deriva_acumulada = np.zeros(n_estados)
+    fronteira = np.arange(LINHAS)
+    maior_premio = max(len(nucleo) for nucleo in nucleos.values())
+    tamanho_fft, espectros = 0, {}
+    lidos = 0
+    for t in range(1, int(giros_ordem[-1]) + 1 if len(ordem) else 1):
+        deriva_acumulada = deriva + massa @ deriva_acumulada
+        largura = grade.shape[1]
+        nova = np.empty((2 * n_estados, largura + LINHAS))
+        nova[:n_estados, :LINHAS] = 1.0
+        nova[n_estados:, :LINHAS] = fronteira[None, :] + deriva_acumulada[:, None]
+        if largura:
+            # Correlação circular sem dar a volta: prêmios além da largura só encontram zeros
+            tamanho = 1 << (largura + min(maior_premio, largura) - 1).bit_length()
+            if tamanho != tamanho_fft:
+                tamanho_fft = tamanho
+                espectros = {(origem, destino): np.conj(np.fft.rfft(nucleo[:tamanho // 2], tamanho))
+                             for (origem, destino), nucleo in nucleos.items()}
+            transformada = np.fft.rfft(grade, tamanho_fft, axis=1)
+            soma = np.zeros_like(transformada)
+            for (origem, destino), espectro in espectros.items():
+                soma[[origem, n_estados + origem]] += transformada[[destino, n_estados + destino]] * espectro
+            nova[:, LINHAS:] = np.fft.irfft(soma, tamanho_fft, axis=1)[:, :largura]
+
+        escala = 1.0 + np.abs(deriva_acumulada).max() + LINHAS
+        relevante = ((np.abs(nova[:n_estados]) > tolerancia).any(axis=0)
+                     | (np.abs(nova[n_estados:]) > tolerancia * escala).any(axis=0))
+        grade = nova[:, :max(np.flatnonzero(relevante)[-1] + 1, LINHAS)]
+
+        fim = np.searchsorted(giros_ordem, t, side="right")
+        if fim > lidos:
+            indices = ordem[lidos:fim]
+            k = saldo_inteiro[indices]
+            valores = np.zeros((2 * n_estados, len(indices)))
+            dentro = k < grade.shape[1]
+            valores[:, dentro] = grade[:, k[dentro]]
+            prob[indices] = 1.0 - inicial @ valores[:n_estados]
+            saldo_cumpriu[indices] = inicial @ (k[None, :] + deriva_acumulada[:, None] - valores[n_estados:])
+            lidos = fim
+
+    prob = np.clip(prob, 0.0, 1.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        saldo_rollover = np.where(prob > 0, (saldo_cumpriu / prob + fracao) * unidade, np.nan)
+    return prob, saldo_rollover
+
+
+def formatar_rollover(prob_rollover, saldo_rollover, saldos_iniciais):
+    """Resumo no formato dos scripts de bônus de depósito: quantos devem cumprir o
+    rollover e o saldo e o lucro (sobre o depósito) esperados de quem cumpre."""
+    saldos_iniciais = np.asarray(saldos_iniciais, dtype=np.float64)
+    esperados = prob_rollover.sum()
+    cumprem = prob_rollover > 0
+    linhas = [
+        f"Probabilidade média de atingir o rollover: {prob_rollover.mean() * 100:.4f}%",
+        f"Jogadores que devem atingir o rollover: {esperados:.1f} de {len(prob_rollover)}",
+        f"Jogadores sem chance de atingir o rollover: {(~cumprem).sum()}",
+    ]
+    if esperados > 0:
+        pesos = prob_rollover[cumprem]
+        saldo_medio = pesos @ saldo_rollover[cumprem] / esperados
+        lucro_medio = pesos @ (saldo_rollover[cumprem] - saldos_iniciais[cumprem]) / esperados
+        linhas += [
+            f"Saldo final médio de quem atinge o rollover: R$ {saldo_medio:.2f}",
+            f"Lucro médio de quem atinge o rollover (relativo ao saldo inicial): R$ {lucro_medio:.2f}",
+        ]
+    return "\n".join(linhas)
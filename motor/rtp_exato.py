@@ -0,0 +1,165 @@
+"""Cálculo exato de RTP a partir dos pesos dos símbolos, sem simulação.
+
+Convenção: as listas `pesos` e `multiplicadores` seguem a ordem do dicionário
+`symbols` dos scripts, com o coringa (🐯, 🐭, 🐉) sempre na posição 0.
+"""
+
+from motor.tabelas import PREMIO_JACKPOT_RATINHO
+
+CORINGA = 0
+
+
+def probabilidades(pesos):
+    total = float(sum(pesos))
+    if total <= 0:
+        raise ValueError("A soma dos pesos precisa ser positiva")
+    return [p / total for p in pesos]
+
+
+def rtp_tigrinho(pesos, multiplicadores, multiplicador_bonus=10):
+    """RTP exato (%) do Tigrinho: 5 linhas, 🐯 coringa e bônus x10 quando a grade
+    tem no máximo um símbolo distinto além do tigre.
+
+    As grades são agrupadas por classe de símbolos: para cada símbolo s, uma linha
+    só paga s se as três células estiverem em {🐯, s} com pelo menos um s, e o bônus
+    só acontece se as nove células estiverem em {🐯, s}. Como todas as linhas têm
+    três células, o RTP é o valor esperado de uma única linha.
+    """
+    p = probabilidades(pesos)
+    pw = p[CORINGA]
+    mw = multiplicadores[CORINGA]
+
+    linha = mw * pw ** 3
+    linha_bonus = mw * pw ** 9
+    for s in range(len(p)):
+        if s == CORINGA:
+            continue
+        q = pw + p[s]
+        linha += multiplicadores[s] * (q ** 3 - pw ** 3)
+        # Grade inteira em {🐯, s} com ao menos um s: toda linha paga
+        linha_bonus += multiplicadores[s] * q ** 6 * (q ** 3 - pw ** 3)
+        linha_bonus += mw * pw ** 3 * (q ** 6 - pw ** 6)
+
+    esperado = linha + (multiplicador_bonus - 1) * linha_bonus
+    return esperado * 100
+
+
+def linha_esperada(pesos, multiplicadores, coringas_fixos=0):
+    """Valor esperado de uma payline, em apostas por linha, sem regras especiais.
+    `coringas_fixos` células da linha são sempre o coringa (1 na fortuna do Ratinho)."""
+    p = probabilidades(pesos)
+    pw = p[CORINGA]
+    n = 3 - coringas_fixos
+    esperado = multiplicadores[CORINGA] * pw ** n
+    for s in range(len(p)):
+        if s != CORINGA:
+            esperado += multiplicadores[s] * ((pw + p[s]) ** n - pw ** n)
+    return esperado
+
+
+def media_cilindro(cilindro):
+    """Média de um cilindro no formato dos scripts: {"2": peso, ...}."""
+    total = float(sum(cilindro.values()))
+    return sum(int(valor) * peso for valor, peso in cilindro.items()) / total
+
+
+def distribuicao_estacionaria(transicoes):
+    """Resolve pi P = pi com sum(pi) = 1 por eliminação de Gauss (cadeias pequenas)."""
+    n = len(transicoes)
+    # (P^T - I) pi = 0, trocando a última equação por sum(pi) = 1
+    a = [[transicoes[j][i] - (1.0 if i == j else 0.0) for j in range(n)] + [0.0] for i in range(n)]
+    a[-1] = [1.0] * n + [1.0]
+    for col in range(n):
+        pivo = max(range(col, n), key=lambda lin: abs(a[lin][col]))
+        a[col], a[pivo] = a[pivo], a[col]
+        for lin in range(n):
+            if lin != col and a[lin][col] != 0.0:
+                fator = a[lin][col] / a[col][col]
+                a[lin] = [x - fator * y for x, y in zip(a[lin], a[col])]
+    return [a[i][n] / a[i][i] for i in range(n)]
+
+
+def cadeia_fortuna_dragao(prob_fortuna, rodadas_fortuna=8, ativa_apos_giro_normal=False):
+    """Transições entre giros: estado 0 é um giro normal e o estado k (1..8) é o
+    k-ésimo giro da rodada da fortuna.
+
+    No jogo e nas campanhas o sorteio da fortuna acontece antes de cada giro fora
+    da fortuna, então o fim de uma rodada já pode emendar outra. Nas rodadas
+    grátis (`ativa_apos_giro_normal`) o sorteio só acontece depois de um giro normal.
+    """
+    n = rodadas_fortuna + 1
+    transicoes = [[0.0] * n for _ in range(n)]
+    transicoes[0][0] = 1 - prob_fortuna
+    transicoes[0][1] = prob_fortuna
+    for k in range(1, rodadas_fortuna):
+        transicoes[k][k + 1] = 1.0
+    if ativa_apos_giro_normal:
+        transicoes[rodadas_fortuna][0] = 1.0
+    else:
+        transicoes[rodadas_fortuna] = list(transicoes[0])
+    return transicoes
+
+
+def rtp_dragao(pesos, multiplicadores, cilindro_normal, cilindro_fortuna,
+               chance_terceiro_giro, prob_fortuna, rodadas_fortuna=8, ativa_apos_giro_normal=False):
+    """RTP exato (%) de longo prazo do Dragão.
+
+    A grade e o cilindro são independentes, então o prêmio esperado de um giro é
+    E[linha] * E[multiplicador | estado]; a fração de giros da fortuna vem da
+    distribuição estacionária de `cadeia_fortuna_dragao`.
+    """
+    pi = distribuicao_estacionaria(
+        cadeia_fortuna_dragao(prob_fortuna, rodadas_fortuna, ativa_apos_giro_normal))
+    fracao_fortuna = 1.0 - pi[0]
+    mult_normal = media_cilindro(cilindro_normal)
+    mult_fortuna = (2 + chance_terceiro_giro) * media_cilindro(cilindro_fortuna)
+    mult_medio = pi[0] * mult_normal + fracao_fortuna * mult_fortuna
+    return linha_esperada(pesos, multiplicadores) * mult_medio * 100
+
+
+def cadeia_fortuna_ratinho(prob_fortuna, prob_ganho_fortuna, limite_rodadas=None):
+    """Transições entre giros do Ratinho: estado 0 é um giro normal e o estado k
+    é o k-ésimo giro seguido no rato da fortuna.
+
+    A fortuna é sorteada antes de cada giro fora dela e termina no primeiro giro
+    com prêmio. Sem `limite_rodadas` (jogo e campanhas) ela dura até esse ganho;
+    em `acharPesosRato` também termina depois de 8 giros.
+    """
+    if limite_rodadas is None:
+        # Sem limite, a posição dentro da fortuna não importa: basta um estado
+        transicoes = [[1 - prob_fortuna, prob_fortuna], [0.0, 0.0]]
+        transicoes[1][0] = prob_ganho_fortuna * (1 - prob_fortuna)
+        transicoes[1][1] = 1 - transicoes[1][0]
+        return transicoes
+
+    n = limite_rodadas + 1
+    transicoes = [[0.0] * n for _ in range(n)]
+    transicoes[0][0] = 1 - prob_fortuna
+    transicoes[0][1] = prob_fortuna
+    for k in range(1, n):
+        # Ao sair da fortuna o próximo giro já pode sortear outra
+        sai = prob_ganho_fortuna if k < limite_rodadas else 1.0
+        transicoes[k][0] = sai * (1 - prob_fortuna)
+        transicoes[k][1] = sai * prob_fortuna
+        if k < limite_rodadas:
+            transicoes[k][k + 1] = 1 - sai
+    return transicoes
+
+
+def rtp_ratinho(pesos, multiplicadores, prob_fortuna, premio_jackpot=PREMIO_JACKPOT_RATINHO, limite_rodadas=None):
+    """RTP exato (%) de longo prazo do Ratinho com o rato da fortuna.
+
+    O prêmio esperado e a chance de ganho de cada estado saem da enumeração das
+    grades (9 células no giro normal, 6 na fortuna) em `motor.distribuicao`.
+    `premio_jackpot` em apostas por linha (1000 vezes a aposta total).
+    """
+    from motor.distribuicao import distribuicao_grades
+
+    normal = distribuicao_grades("ratinho", multiplicadores, premio_jackpot=premio_jackpot).resumo(pesos)
+    fortuna = distribuicao_grades("ratinho", multiplicadores, fortuna_rato=True,
+                                  premio_jackpot=premio_jackpot).resumo(pesos)
+    pi = distribuicao_estacionaria(
+        cadeia_fortuna_ratinho(prob_fortuna, fortuna["prob_ganho"], limite_rodadas))
+    premio_medio = pi[0] * normal["media"] + (1.0 - pi[0]) * fortuna["media"]
+    # 5 linhas: a aposta total vale 5 apostas por linha
+    return premio_medio / 5 * 100
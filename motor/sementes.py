@@ -0,0 +1,54 @@
+"""Fluxos de números aleatórios reproduzíveis a partir de uma semente mestre.
+
+Cada fluxo é o filho `chave` de `np.random.SeedSequence(semente)`, o mesmo que
+`SeedSequence(semente).spawn(n)[k]` devolveria para a chave (k,), mas
+endereçável direto: o lote 734 ou o jogador 123456 têm sempre os mesmos
+números, em qualquer processo ou máquina, sem gerar os fluxos anteriores.
+Fluxos com chaves diferentes são independentes.
+
+Chaves usadas pelas campanhas:
+- (POPULACAO,): saldos iniciais e apostas de todos os jogadores;
+- (LOTE, k): o k-ésimo lote do motor vetorizado (o resultado depende do
+  tamanho do lote, mas não do número de processos);
+- (JOGADOR, i): o jogador i no laço em Python (não depende nem dos lotes);
+- (FITA, m): a fita de giros do modo m (motor.fitas).
+Nas buscas de pesos a chave é o índice do candidato.
+"""
+import random
+
+import numpy as np
+
+POPULACAO = 0
+LOTE = 1
+JOGADOR = 2
+FITA = 3
+
+
+def semente_mestre(semente=None):
+    """A própria semente, ou uma nova tirada da entropia do sistema quando None:
+    imprimindo o valor, a execução pode ser repetida."""
+    return int(semente) if semente is not None else int(np.random.SeedSequence().entropy)
+
+
+def sequencia(semente, *chave):
+    return np.random.SeedSequence(semente, spawn_key=tuple(int(c) for c in chave))
+
+
+def semente_derivada(semente, *chave):
+    """Inteiro de 64 bits do fluxo `chave`, leve para mandar a outro processo."""
+    return int(sequencia(semente, *chave).generate_state(1, np.uint64)[0])
+
+
+def gerador_numpy(semente, *chave):
+    return np.random.Generator(np.random.PCG64(sequencia(semente, *chave)))
+
+
+def chave_python(semente, *chave):
+    """Os 128 bits (4 palavras de 32 bits) com que `gerador_python` semeia o
+    Mersenne Twister do fluxo `chave`; motor.nucleo semeia o seu com eles."""
+    return sequencia(semente, *chave).generate_state(4, np.uint32)
+
+
+def gerador_python(semente, *chave):
+    """`random.Random` do fluxo `chave`, semeado com 128 bits da sequência."""
+    return random.Random(int.from_bytes(chave_python(semente, *chave).tobytes(), "little"))
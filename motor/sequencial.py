@@ -0,0 +1,44 @@
+"""Teste sequencial do RTP de um candidato por médias de blocos.
+
+O simulador entrega o RTP de blocos consecutivos de giros (o estado da rodada
+da fortuna continua de um bloco para o outro). Com as médias dos blocos como
+amostras, o intervalo de confiança é média ± z * desvio / sqrt(blocos). O
+candidato é descartado assim que o intervalo fica todo fora de
+rtp_alvo ± margem_erro, e os promissores continuam até o intervalo ficar
+estreito (`precisao`) ou até `rodadas_maximas`.
+
+Os prêmios têm cauda pesada: com poucos blocos o desvio sai subestimado até
+aparecer um prêmio grande. Por isso o mínimo de 10 blocos e z = 4; com blocos
+de 1000 giros, 60 simulações de um candidato no alvo (por jogo) não tiveram
+nenhum descarte.
+"""
+import math
+
+
+def testar_sequencial(blocos, tamanho_bloco, rtp_alvo, margem_erro, precisao, rodadas_maximas,
+                      blocos_minimos=10, z=4.0):
+    """`blocos` é um iterador com o RTP (%) de cada bloco de `tamanho_bloco` giros.
+
+    Devolve {"rtp", "meia_largura", "rodadas", "rejeitado"}.
+    """
+    k, media, m2 = 0, 0.0, 0.0
+    meia_largura = math.inf
+    for rtp_bloco in blocos:
+        # Welford: média e variância das médias dos blocos em uma passada
+        k += 1
+        delta = rtp_bloco - media
+        media += delta / k
+        m2 += delta * (rtp_bloco - media)
+        rodadas = k * tamanho_bloco
+        if k < blocos_minimos:
+            continue
+
+        meia_largura = z * math.sqrt(m2 / (k - 1) / k)
+        fora = (media - meia_largura > rtp_alvo + margem_erro
+                or media + meia_largura < rtp_alvo - margem_erro)
+        if fora:
+            return {"rtp": media, "meia_largura": meia_largura, "rodadas": rodadas, "rejeitado": True}
+        if meia_largura <= precisao or rodadas >= rodadas_maximas:
+            break
+
+    return {"rtp": media, "meia_largura": meia_largura, "rodadas": k * tamanho_bloco, "rejeitado": False}
@@ -0,0 +1,180 @@
+"""Tabelas de pagamento por linha e grades codificadas em inteiros.
+
+Com 7 símbolos, uma linha (a, b, c) vira o código a*49 + b*7 + c e a tabela
+de pagamento tem 7³ = 343 entradas. A grade inteira vira o inteiro de 9 dígitos
+na base 7 formado pelas três linhas, com a célula (0, 0) no dígito mais
+significativo. As diagonais saem das linhas com as tabelas ALTO, MEIO e BAIXO,
+então um giro custa cinco consultas à tabela mais a regra especial do jogo.
+
+As tabelas de cada jogo ficam salvas em motor/cache/ e só são recompiladas
+quando os multiplicadores mudam.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+CORINGA = 0
+BASE = 7
+TAMANHO_LINHA = BASE ** 3
+
+ALTO = [(r // 49) * 49 for r in range(TAMANHO_LINHA)]
+MEIO = [(r // 7 % 7) * 7 for r in range(TAMANHO_LINHA)]
+BAIXO = [r % 7 for r in range(TAMANHO_LINHA)]
+
+# Jackpot do Ratinho (grade toda de 🐭): 1000 vezes a aposta total, em apostas por linha
+PREMIO_JACKPOT_RATINHO = 1000 * 5
+
+PASTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+def codificar_linha(a, b, c):
+    return a * 49 + b * 7 + c
+
+
+def codificar_grade(grade):
+    """Grade 3x3 de índices -> inteiro na base 7."""
+    r0, r1, r2 = (codificar_linha(*linha) for linha in grade)
+    return (r0 * TAMANHO_LINHA + r1) * TAMANHO_LINHA + r2
+
+
+def decodificar_grade(codigo):
+    linhas = (codigo // TAMANHO_LINHA ** 2, codigo // TAMANHO_LINHA % TAMANHO_LINHA, codigo % TAMANHO_LINHA)
+    return [[r // 49, r // 7 % 7, r % 7] for r in linhas]
+
+
+def codigos_das_linhas(r0, r1, r2):
+    """Códigos das 5 paylines: três linhas e as duas diagonais."""
+    diagonal = ALTO[r0] + MEIO[r1] + BAIXO[r2]
+    anti_diagonal = ALTO[r2] + MEIO[r1] + BAIXO[r0]
+    return r0, r1, r2, diagonal, anti_diagonal
+
+
+def compilar_tabela_linhas(multiplicadores):
+    """Pagamento de cada uma das 343 linhas em apostas por linha."""
+    tabela = []
+    for codigo in range(TAMANHO_LINHA):
+        simbolos = [codigo // 49, codigo // 7 % 7, codigo % 7]
+        reais = [s for s in simbolos if s != CORINGA]
+        if not reais:
+            tabela.append(multiplicadores[CORINGA])
+        elif all(s == reais[0] for s in reais):
+            tabela.append(multiplicadores[reais[0]])
+        else:
+            tabela.append(0)
+    return tabela
+
+
+def compilar_mascaras_linha():
+    """Bits dos símbolos (exceto o coringa) presentes em cada linha."""
+    mascaras = []
+    for codigo in range(TAMANHO_LINHA):
+        mascara = 0
+        for s in (codigo // 49, codigo // 7 % 7, codigo % 7):
+            if s != CORINGA:
+                mascara |= 1 << s
+        mascaras.append(mascara)
+    return mascaras
+
+
+def compilar_tabela_bonus(multiplicador_bonus):
+    """Multiplicador do Tigrinho por máscara da grade: bônus com até um símbolo."""
+    return [multiplicador_bonus if bin(m).count("1") <= 1 else 1 for m in range(1 << BASE)]
+
+
+def caminho_cache(prefixo, chave, extensao=".json"):
+    """Arquivo em motor/cache/ identificado por um resumo da configuração."""
+    resumo = hashlib.sha1(json.dumps(chave, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(PASTA_CACHE, f"{prefixo}_{resumo}{extensao}")
+
+
+def temporario_cache(caminho):
+    """Arquivo temporário só deste processo, ao lado de `caminho` e com a mesma
+    extensão (np.savez acrescenta .npz a nomes sem ela). Vários scripts podem
+    gerar o mesmo arquivo do cache ao mesmo tempo: com um nome fixo, um
+    truncaria o temporário do outro."""
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    raiz, extensao = os.path.splitext(os.path.basename(caminho))
+    descritor, temporario = tempfile.mkstemp(prefix=raiz + ".", suffix=".tmp" + extensao, dir=os.path.dirname(caminho))
+    os.close(descritor)
+    return temporario
+
+
+def publicar_cache(temporario, caminho):
+    """Move o temporário para `caminho`; se outro processo já gravou o arquivo
+    nesse meio tempo (com o mesmo conteúdo), fica o dele."""
+    if os.path.exists(caminho):
+        os.remove(temporario)
+    else:
+        os.replace(temporario, caminho)
+
+
+def carregar_tabelas(jogo, multiplicadores, multiplicador_bonus=10):
+    """Tabelas do jogo ("tigrinho", "ratinho" ou "dragao"), lidas do cache em disco
+    ou compiladas e salvas na primeira vez."""
+    multiplicadores = [int(m) for m in multiplicadores]
+    if len(multiplicadores) != BASE:
+        raise ValueError(f"As tabelas esperam {BASE} símbolos, recebido {len(multiplicadores)}")
+    chave = {"jogo": jogo, "multiplicadores": multiplicadores}
+    if jogo == "tigrinho":
+        chave["multiplicador_bonus"] = multiplicador_bonus
+
+    caminho = caminho_cache(f"tabelas_{jogo}", chave)
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+
+    tabelas = {"chave": chave, "linha": compilar_tabela_linhas(multiplicadores)}
+    if jogo == "tigrinho":
+        tabelas["mascara_linha"] = compilar_mascaras_linha()
+        tabelas["bonus"] = compilar_tabela_bonus(multiplicador_bonus)
+
+    temporario = temporario_cache(caminho)
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(tabelas, arquivo)
+    publicar_cache(temporario, caminho)
+    return tabelas
+
+
+def premio_linhas(r0, r1, r2, tabelas):
+    linha = tabelas["linha"]
+    return sum(linha[c] for c in codigos_das_linhas(r0, r1, r2))
+
+
+def premio_tigrinho(r0, r1, r2, tabelas):
+    mascara = tabelas["mascara_linha"]
+    bonus = tabelas["bonus"][mascara[r0] | mascara[r1] | mascara[r2]]
+    return premio_linhas(r0, r1, r2, tabelas) * bonus
+
+
+def premio_ratinho(r0, r1, r2, tabelas, premio_jackpot=PREMIO_JACKPOT_RATINHO):
+    if r0 == r1 == r2 == 0:  # Todas as células são 🐭
+        return premio_jackpot
+    return premio_linhas(r0, r1, r2, tabelas)
+
+
+def premio_grade(codigo, jogo, tabelas, **regras):
+    """Prêmio de uma grade codificada, em apostas por linha (Dragão sem cilindro)."""
+    r0 = codigo // TAMANHO_LINHA ** 2
+    r1 = codigo // TAMANHO_LINHA % TAMANHO_LINHA
+    r2 = codigo % TAMANHO_LINHA
+    if jogo == "tigrinho":
+        return premio_tigrinho(r0, r1, r2, tabelas)
+    if jogo == "ratinho":
+        return premio_ratinho(r0, r1, r2, tabelas, **regras)
+    return premio_linhas(r0, r1, r2, tabelas)
+
+
+def pesos_das_linhas(pesos, fortuna_rato=False):
+    """Peso de cada um dos 343 códigos de linha: produto dos pesos das três células.
+    No rato da fortuna a célula do meio é sempre o coringa."""
+    if len(pesos) != BASE:
+        raise ValueError(f"As tabelas esperam {BASE} símbolos, recebido {len(pesos)}")
+    resultado = []
+    for codigo in range(TAMANHO_LINHA):
+        a, b, c = codigo // 49, codigo // 7 % 7, codigo % 7
+        if fortuna_rato:
+            resultado.append(pesos[a] * pesos[c] if b == CORINGA else 0)
+        else:
+            resultado.append(pesos[a] * pesos[b] * pesos[c])
+    return resultado
@@ -0,0 +1,112 @@
+"""Redução de variância das estimativas de RTP por Monte Carlo.
+
+- Variável de controle: a soma das 5 paylines sem regra especial (sem bônus,
+  jackpot ou cilindro) tem média exata conhecida em cada estado do giro
+  (`motor.rtp_exato.linha_esperada`). A diferença L - E[L] tem média zero
+  mesmo somada até o fim de uma sessão com parada (martingal com número de
+  giros limitado), então descontar beta * controle não muda o valor esperado.
+- Sorteios antitéticos: `RandomAntitetico` repete a sequência de u de um bloco
+  como 1 - u no bloco seguinte.
+- O fator de redução é a razão entre a variância da estimativa simples e a da
+  ajustada: a mesma confiança com 1/fator dos giros.
+"""
+import random
+
+import numpy as np
+
+from motor import tabelas
+from motor.rtp_exato import linha_esperada
+
+LINHAS = 5
+
+
+class ControleLinhas:
+    """Controle de um giro numa grade de emojis: soma das paylines menos a média
+    exata no estado (normal ou com a coluna do meio fixa no coringa)."""
+
+    def __init__(self, symbols):
+        pesos = [dados["weight"] for dados in symbols.values()]
+        multiplicadores = [dados["multiplier"] for dados in symbols.values()]
+        self.indice = {simbolo: i for i, simbolo in enumerate(symbols)}
+        self.tabelas = {"linha": tabelas.compilar_tabela_linhas(multiplicadores)}
+        self.media = LINHAS * linha_esperada(pesos, multiplicadores)
+        self.media_fortuna_rato = LINHAS * linha_esperada(pesos, multiplicadores, coringas_fixos=1)
+
+    def desvio(self, grade, fortuna_rato=False):
+        """Soma das 5 paylines (em apostas por linha) menos o valor esperado."""
+        i = self.indice
+        r0, r1, r2 = (tabelas.codificar_linha(i[a], i[b], i[c]) for a, b, c in grade)
+        media = self.media_fortuna_rato if fortuna_rato else self.media
+        return tabelas.premio_linhas(r0, r1, r2, self.tabelas) - media
+
+
+def razao_com_controle(ganhos, apostados, controles):
+    """RTP (%) = soma(ganhos) / soma(apostados) por sessão, com a variável de
+    controle de média zero `controles` descontada pelo coeficiente de regressão.
+
+    Devolve (rtp_simples, rtp_ajustado, fator_reducao).
+    """
+    ganhos = np.asarray(ganhos, dtype=np.float64)
+    apostados = np.asarray(apostados, dtype=np.float64)
+    controles = np.asarray(controles, dtype=np.float64)
+    razao = ganhos.sum() / apostados.sum()
+    # Resíduo linearizado da razão: a variância do estimador é proporcional à dele
+    residuo = ganhos - razao * apostados
+    variancia_controle = controles.var()
+    if variancia_controle == 0:
+        return razao * 100, razao * 100, 1.0
+    beta = np.mean((residuo - residuo.mean()) * (controles - controles.mean())) / variancia_controle
+    ajustado = residuo - beta * controles
+    fator = residuo.var() / ajustado.var() if ajustado.var() > 0 else float("inf")
+    return razao * 100, (ganhos.sum() - beta * controles.sum()) / apostados.sum() * 100, float(fator)
+
+
+def razao_com_controle_acumulada(sessoes):
+    """Como `razao_com_controle`, a partir de um `motor.estatisticas.Covariancias`
+    com (ganho, apostado, controle) de cada sessão, sem guardar as sessões."""
+    ganho, apostado, controle = sessoes.medias
+    razao = ganho / apostado
+    variancia_controle = sessoes.covariancia(2, 2)
+    if variancia_controle == 0:
+        return razao * 100, razao * 100, 1.0
+    variancia_residuo = (sessoes.covariancia(0, 0) - 2 * razao * sessoes.covariancia(0, 1)
+                         + razao ** 2 * sessoes.covariancia(1, 1))
+    covariancia = sessoes.covariancia(0, 2) - razao * sessoes.covariancia(1, 2)
+    beta = covariancia / variancia_controle
+    variancia_ajustada = variancia_residuo - beta * covariancia
+    fator = variancia_residuo / variancia_ajustada if variancia_ajustada > 0 else float("inf")
+    return razao * 100, (ganho - beta * controle) / apostado * 100, float(fator)
+
+
+def formatar_controle(rtp_ajustado, fator):
+    return f"RTP com variável de controle: {rtp_ajustado:.2f}% (variância {fator:.1f}x menor)"
+
+
+class RandomAntitetico(random.Random):
+    """`random.Random` que alterna blocos: no bloco par grava cada u sorteado, no
+    ímpar devolve 1 - u na mesma ordem (e sorteia de novo se a sequência acabar,
+    quando o bloco espelhado pede mais números). Chame `proximo_bloco()` entre
+    os blocos."""
+
+    def __init__(self, semente=None):
+        super().__init__(semente)
+        self._gravados = []
+        self._posicao = None  # None: gravando
+
+    def random(self):
+        if self._posicao is None:
+            u = super().random()
+            self._gravados.append(u)
+            return u
+        if self._posicao < len(self._gravados):
+            u = self._gravados[self._posicao]
+            self._posicao += 1
+            return 1.0 - u if u > 0 else u  # random() nunca devolve 1.0
+        return super().random()
+
+    def proximo_bloco(self):
+        if self._posicao is None:
+            self._posicao = 0
+        else:
+            self._gravados = []
+            self._posicao = None
@@ -0,0 +1,180 @@
+"""Varredura de parâmetros das promoções: uma grade de pontos num só job.
+
+Todos os pontos da grade são simulados com os mesmos jogadores e os mesmos
+giros. O prêmio de um giro em apostas por linha, a fortuna e o cilindro não
+dependem da promoção nem da aposta, então a cada passo cada jogador faz um
+giro só (`motor.populacao.Jogo.girar`) e ele vale para todos os pontos em que
+o jogador ainda joga; o que muda entre os pontos é o bônus ou o cashback, a
+aposta em R$, a meta de rollover e quando o jogador para. São números
+aleatórios comuns no nível do giro: a diferença entre dois pontos quase não
+tem ruído, e a geração dos giros é feita uma vez para a grade inteira.
+
+O estado fica em matrizes (jogador, ponto) só com os jogadores que ainda
+jogam em algum ponto, como em motor.populacao. Com um ponto só, o resultado é
+exatamente o de `simular_bonus_deposito` / `simular_cashback` com o mesmo rng.
+"""
+import itertools
+
+import numpy as np
+
+from motor.instrumentacao import DESLIGADO
+from motor.populacao import APOSTA_MINIMA, LINHAS
+
+
+def pontos_da_grade(grade, **fixos):
+    """Produto cartesiano de `grade` ({parâmetro: valores}), na ordem dos
+    valores, com os parâmetros de `fixos` em todos os pontos."""
+    nomes = list(grade)
+    return [{**fixos, **dict(zip(nomes, valores))} for valores in itertools.product(*grade.values())]
+
+
+def _parametro(pontos, nome, dtype=np.float64):
+    return np.array([ponto[nome] for ponto in pontos], dtype=dtype)
+
+
+def _jogar(jogo, estado, resultado, aposta_do_passo, continua_apos, max_rodadas, rng, medidor):
+    """Passos até nenhum jogador jogar em nenhum ponto. `aposta_do_passo(estado)`
+    dá a aposta (m, P) de cada jogador em cada ponto; `continua_apos(estado)`,
+    depois do giro, quem segue jogando."""
+    rodadas = 0
+    while len(estado["indice"]) and rodadas < max_rodadas:
+        premio, _ = jogo.girar(estado["fortuna"], rng, medidor)
+        rodadas += 1
+        with medidor.etapa("passo.saldos"):
+            ativo = estado["ativo"]
+            aposta = np.where(ativo, aposta_do_passo(estado), 0.0)
+            ganho = premio[:, None] * (aposta / LINHAS)
+            estado["saldo"] -= aposta
+            estado["saldo"] += ganho
+            estado["apostado"] += aposta
+            estado["ganho"] += ganho
+            estado["rodadas"] += ativo
+            estado["ativo"] = ativo & continua_apos(estado)
+
+        joga = estado["ativo"].any(axis=1)
+        if not joga.all():
+            with medidor.etapa("passo.compactacao"):
+                _gravar(estado, ~joga, resultado)
+                estado = {nome: v[joga] for nome, v in estado.items()}
+    _gravar(estado, np.ones(len(estado["indice"]), dtype=bool), resultado)
+    resultado["atingiu_rollover"] = (resultado["rodadas"] > 0) & (resultado["apostado"] >= resultado["meta"])
+    return resultado
+
+
+def _gravar(estado, fim, resultado):
+    indices = estado["indice"][fim]
+    for nome, matriz in resultado.items():
+        if nome in estado:
+            matriz[indices] = estado[nome][fim]
+
+
+def _comecar(ativo, **matrizes):
+    """Resultado (n, P) e estado dos jogadores que jogam em algum ponto."""
+    n, p = ativo.shape
+    resultado = {
+        "rodadas": np.zeros((n, p), dtype=np.int64),
+        "apostado": np.zeros((n, p)),
+        "ganho": np.zeros((n, p)),
+        **{nome: np.array(np.broadcast_to(m, (n, p))) for nome, m in matrizes.items()},
+    }
+    jogadores = np.flatnonzero(ativo.any(axis=1))
+    estado = {nome: m[jogadores] for nome, m in resultado.items()}
+    estado["ativo"] = ativo[jogadores]
+    estado["indice"] = jogadores
+    estado["fortuna"] = np.zeros(len(jogadores), dtype=np.int64)
+    return resultado, estado
+
+
+def varrer_bonus_deposito(jogo, saldos_iniciais, apostas, pontos, max_rodadas=10000, rng=None,
+                          medidor=DESLIGADO):
+    """`simular_bonus_deposito` em todos os `pontos` (dicionários com rollover,
+    multiplicador_bonus_inicial, limite_bonus e somente_bonus) de uma vez.
+
+    Devolve matrizes (jogador, ponto): rodadas, saldo (final), apostado, ganho,
+    meta, atingiu_rollover, bonus e lucro (relativo ao saldo inicial).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    saldos_iniciais = np.asarray(saldos_iniciais, dtype=np.float64)[:, None]
+    apostas = np.asarray(apostas, dtype=np.float64)[:, None]
+
+    bonus = np.minimum(saldos_iniciais * (_parametro(pontos, "multiplicador_bonus_inicial") - 1),
+                       _parametro(pontos, "limite_bonus"))
+    saldo = saldos_iniciais + bonus
+    meta = _parametro(pontos, "rollover") * np.where(_parametro(pontos, "somente_bonus", bool), bonus, saldo)
+    ativo = (saldo >= apostas) & (meta > 0) & (max_rodadas > 0)
+    resultado, estado = _comecar(ativo, saldo=saldo, meta=meta, bonus=bonus, aposta=apostas)
+
+    resultado = _jogar(jogo, estado, resultado,
+                       aposta_do_passo=lambda e: e["aposta"],
+                       continua_apos=lambda e: (e["apostado"] < e["meta"]) & (e["saldo"] >= e["aposta"]),
+                       max_rodadas=max_rodadas, rng=rng, medidor=medidor)
+    resultado["lucro"] = resultado["saldo"] - saldos_iniciais
+    return resultado
+
+
+def varrer_cashback(jogo, saldos_iniciais, pontos, rng=None, medidor=DESLIGADO):
+    """`simular_cashback` em todos os `pontos` (dicionários com
+    cashback_percentual, rollover_multiplicador e valor_maximo) de uma vez. A
+    fração do cashback que vira aposta fixa é sorteada uma vez por jogador.
+
+    Devolve matrizes (jogador, ponto): rodadas, saldo (final), apostado, ganho,
+    meta, atingiu_rollover, cashback, aposta_fixa e lucro.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    saldos_iniciais = np.asarray(saldos_iniciais, dtype=np.float64)[:, None]
+    n = len(saldos_iniciais)
+
+    cashback = np.minimum(saldos_iniciais * (_parametro(pontos, "cashback_percentual") / 100),
+                          _parametro(pontos, "valor_maximo"))
+    fracao = rng.uniform(0.10, 0.20, n)[:, None]
+    aposta_fixa = np.maximum(np.round(fracao * cashback / APOSTA_MINIMA) * APOSTA_MINIMA, APOSTA_MINIMA)
+    meta = cashback * _parametro(pontos, "rollover_multiplicador")
+    resultado, estado = _comecar(cashback >= APOSTA_MINIMA, saldo=cashback, meta=meta, cashback=cashback,
+                                 aposta_fixa=aposta_fixa)
+
+    def aposta_do_passo(e):
+        # Sem saldo para a aposta fixa, aposta o saldo arredondado para múltiplo de R$ 0,50
+        return np.where(e["saldo"] >= e["aposta_fixa"], e["aposta_fixa"],
+                        np.round(e["saldo"] / APOSTA_MINIMA) * APOSTA_MINIMA)
+
+    resultado = _jogar(jogo, estado, resultado, aposta_do_passo,
+                       continua_apos=lambda e: (e["apostado"] < e["meta"]) & (e["saldo"] >= APOSTA_MINIMA),
+                       max_rodadas=np.inf, rng=rng, medidor=medidor)
+    resultado["lucro"] = resultado["saldo"] - resultado["cashback"]
+    return resultado
+
+
+def totais(jogadores, com_lucro):
+    """Somas por ponto de um lote (para `motor.estatisticas.juntar_resultados`).
+    `dif_lucro*` medem a diferença de lucro de cada ponto para o primeiro."""
+    diferenca = jogadores["lucro"] - jogadores["lucro"][:, :1]
+    return {
+        "jogadores": len(jogadores["lucro"]),
+        "apostado": jogadores["apostado"].sum(axis=0),
+        "ganho": jogadores["ganho"].sum(axis=0),
+        "com_lucro": com_lucro.sum(axis=0),
+        "atingiu_rollover": jogadores["atingiu_rollover"].sum(axis=0),
+        "lucro": jogadores["lucro"].sum(axis=0),
+        "dif_lucro": diferenca.sum(axis=0),
+        "dif_lucro2": (diferenca ** 2).sum(axis=0),
+    }
+
+
+def formatar_varredura(pontos, totais):
+    """Tabela com os parâmetros que variam, RTP, % com lucro, % que atingiu o
+    rollover, lucro médio e a diferença para o ponto 1 com o erro padrão."""
+    variam = [nome for nome in pontos[0] if len({repr(p[nome]) for p in pontos}) > 1] or list(pontos[0])
+    n = totais["jogadores"]
+    larguras = [max(len(nome), 8) + 2 for nome in variam]
+    cabecalho = "".join(f"{nome:>{largura}}" for nome, largura in zip(variam, larguras))
+    linhas = [f"{'ponto':>5}{cabecalho}{'RTP':>9}{'com lucro':>11}{'rollover':>10}{'lucro médio':>13}"
+              f"{'Δ lucro vs 1':>22}"]
+    for i, ponto in enumerate(pontos):
+        rtp = totais["ganho"][i] / totais["apostado"][i] * 100 if totais["apostado"][i] > 0 else 0.0
+        media_dif = totais["dif_lucro"][i] / n
+        erro = np.sqrt(max(totais["dif_lucro2"][i] / n - media_dif ** 2, 0.0) / n)
+        valores = "".join(f"{str(ponto[nome]):>{largura}}" for nome, largura in zip(variam, larguras))
+        linhas.append(f"{i + 1:>5}{valores}{rtp:8.2f}%{totais['com_lucro'][i] / n * 100:10.2f}%"
+                      f"{totais['atingiu_rollover'][i] / n * 100:9.4f}%{totais['lucro'][i] / n:13.2f}"
+                      f"{media_dif:+13.4f} ± {erro:.4f}")
+    return "\n".join(linhas)
@@ -1,80 +1,69 @@
-import random
+import os
+import sys
 import numpy as np
 from tqdm import tqdm
-from multiprocessing import Pool, cpu_count
+from multiprocessing import cpu_count
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.populacao import Jogo, simular_bonus_deposito
+from motor.rtp_exato import rtp_ratinho
+from motor.colunas import GravadorColunas
+from motor.estatisticas import (
+    BORDAS_GANHO_APOSTA,
+    Acumulador,
+    Covariancias,
+    formatar_histograma,
+    juntar_resultados,
+)
+from motor.fitas import TAMANHO_PADRAO, FitaGiros
+from motor.jogos import LINHAS, compilar
+from motor.paralelo import mapear_lotes
+from motor.retomada import Checkpoint, pediu_retomada
+from motor.rodadas_exatas import giros_ratinho
+from motor.rollover import formatar_rollover, resolver_rollover
+from motor import instrumentacao, nucleo
+from motor.sementes import JOGADOR, LOTE, POPULACAO, gerador_numpy, gerador_python
+from motor.varredura import formatar_varredura, pontos_da_grade, totais, varrer_bonus_deposito
+from motor.variancia import formatar_controle, razao_com_controle_acumulada
 
 # === Configurações da simulação ===
 rollover = 40
 multiplicador_bonus_inicial = 2.5
 limite_bonus = 7500
 somente_bonus = False
-
-symbols = {
-    "🐭": {"multiplier": 300, "weight": 2},
-    "🏆": {"multiplier": 100, "weight": 2},
-    "🍊": {"multiplier": 50, "weight": 3},
-    "🔑": {"multiplier": 30, "weight": 10},
-    "💰": {"multiplier": 15, "weight": 11},
-    "🧧": {"multiplier": 5, "weight": 21},
-    "🔭": {"multiplier": 3, "weight": 57},
-}
-
-symbol_pool = []
-for emoji, data in symbols.items():
-    symbol_pool.extend([emoji] * data["weight"])
-
-paylines = [
-    [(0, 0), (0, 1), (0, 2)],
-    [(1, 0), (1, 1), (1, 2)],
-    [(2, 0), (2, 1), (2, 2)],
-    [(0, 0), (1, 1), (2, 2)],
-    [(2, 0), (1, 1), (0, 2)],
-]
-
-def gerar_grade_normal():
-    return [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-
-def gerar_grade_rato_fortuna():
-    grade = [[None for _ in range(3)] for _ in range(3)]
-    for i in range(3):
-        grade[i][1] = "🐭"
-        grade[i][0] = random.choice(symbol_pool)
-        grade[i][2] = random.choice(symbol_pool)
-    return grade
-
-def calcular_premio(grade, aposta_por_linha):
-    todos_simbolos = [s for linha in grade for s in linha]
-    if all(s == "🐭" for s in todos_simbolos):
-        return aposta_por_linha * 1000 * len(paylines)
-
-    ganho_total = 0
-    for linha in paylines:
-        simbolos = [grade[x][y] for x, y in linha]
-        simbolos_sem_rato = [s for s in simbolos if s != "🐭"]
-
-        if not simbolos_sem_rato:
-            simbolo_vencedor = "🐭"
-        elif all(s == simbolos_sem_rato[0] for s in simbolos_sem_rato):
-            simbolo_vencedor = simbolos_sem_rato[0]
-        else:
-            continue
-
-        ganho_total += aposta_por_linha * symbols[simbolo_vencedor]["multiplier"]
-
-    return ganho_total
-
-def simular_jogador(args):
+usar_motor_populacao = True  # False volta para o laço por jogador
+usar_nucleo_compilado = True  # Laço por jogador compilado (motor.nucleo) se o Numba estiver instalado; mesmos números
+usar_fita = False  # Com o motor de população, lê os giros de uma fita pré-gerada em motor/cache (motor.fitas)
+giros_fita = TAMANHO_PADRAO  # Giros por modo na fita (128 MB); 1 << 28 cobre a campanha: 2 GB por modo e semente (motor.fitas)
+instrumentar = False  # True cronometra as etapas e conta fortunas e bytes do pool; resumo no fim (motor.instrumentacao)
+perfilar = False  # Com instrumentar, também amostra a pilha durante os lotes: as funções mais lentas
+modo_exato = False  # True resolve o rollover por programação dinâmica (motor.rollover), sem simular
+processos = cpu_count()  # O resultado é o mesmo com qualquer número de processos
+semente_campanha = 2024  # Semente mestre: população, lotes e jogadores têm fluxos próprios (motor.sementes)
+intervalo_checkpoint = 60  # Segundos entre gravações do estado em <script>.checkpoint (retome com --resume); None desliga
+gravar_jogadores = None  # Diretório para os resultados por jogador em colunas .npy (motor.colunas); None não grava
+grade_varredura = None  # Ex.: {"rollover": [30, 40], "limite_bonus": [5000, 7500]}: tabela com todos os pontos, mesmos jogadores e giros (motor.varredura)
+
+# Jogo: definição compartilhada, compilada uma vez (motor.jogos)
+jogo = compilar("ratinho")
+
+# Mesmas regras, com todos os jogadores em vetores (motor.populacao)
+jogo_populacao = Jogo(jogo, fita=FitaGiros(jogo, giros_fita, semente_campanha) if usar_fita else None)
+
+def simular_jogador(args, ganhos_rodada, rng, medidor=instrumentacao.DESLIGADO):
+    """`ganhos_rodada` é um `Acumulador` que recebe o ganho / aposta de cada giro;
+    `rng` é o `random.Random` do jogador."""
     saldo_inicial, aposta_total, max_rodadas = args
 
     valor_bonus = min((multiplicador_bonus_inicial - 1) * saldo_inicial, limite_bonus)
     saldo = saldo_inicial + valor_bonus
 
     rodadas = 0
-    linhas_ativas = len(paylines)
+    linhas_ativas = LINHAS
     aposta_por_linha = aposta_total / linhas_ativas
     total_ganho = 0
-    ganhos_rodada = []
     total_apostado = 0
+    controle = 0  # Soma de aposta_por_linha * (linhas - média exata): média zero
 
     if somente_bonus:
         meta_apostas = rollover * valor_bonus
@@ -82,20 +71,21 @@ def simular_jogador(args):
         meta_apostas = rollover * saldo
 
     modo_rato_fortuna = False
-    prob_ativar_rato = 0.2
 
     while saldo >= aposta_total and rodadas < max_rodadas and total_apostado < meta_apostas:
         saldo -= aposta_total
         total_apostado += aposta_total
 
-        if not modo_rato_fortuna and random.random() < prob_ativar_rato:
+        if not modo_rato_fortuna and rng.random() < jogo.prob_fortuna:
+            medidor.contar("ativacoes_fortuna")
             modo_rato_fortuna = True
 
-        grade = gerar_grade_rato_fortuna() if modo_rato_fortuna else gerar_grade_normal()
-        ganho = calcular_premio(grade, aposta_por_linha)
+        linhas = jogo.sortear_linhas(rng, modo_rato_fortuna)
+        ganho = jogo.premio_linhas(linhas) * aposta_por_linha
+        controle += aposta_por_linha * jogo.controle(linhas, modo_rato_fortuna)
         saldo += ganho
         total_ganho += ganho
-        ganhos_rodada.append(ganho)
+        ganhos_rodada.adicionar(ganho / aposta_total)
         rodadas += 1
 
         if modo_rato_fortuna and ganho > 0:
@@ -104,73 +94,234 @@ def simular_jogador(args):
         if total_apostado >= meta_apostas:
             lucro_rel_bonus = saldo - (saldo_inicial + valor_bonus)
             lucro_rel_inicial = saldo - saldo_inicial
-            return lucro_rel_bonus, lucro_rel_inicial, rodadas, True, total_ganho, ganhos_rodada, saldo, saldo_inicial, aposta_total
+            return lucro_rel_bonus, lucro_rel_inicial, rodadas, True, total_ganho, saldo, saldo_inicial, aposta_total, controle
 
     lucro_rel_bonus = saldo - (saldo_inicial + valor_bonus)
     lucro_rel_inicial = saldo - saldo_inicial
-    return lucro_rel_bonus, lucro_rel_inicial, rodadas, False, total_ganho, ganhos_rodada, saldo, saldo_inicial, aposta_total
-
-def main():
-    NUM_JOGADORES = 100000
-    media_salario = 354
-    media_aposta = 12
-    max_rodadas = 10000
+    return lucro_rel_bonus, lucro_rel_inicial, rodadas, False, total_ganho, saldo, saldo_inicial, aposta_total, controle
 
-    saldos_iniciais = np.round(np.clip(np.random.normal(media_salario, 50, NUM_JOGADORES), 10, 1000), 2)
-    apostas = np.round(np.clip(np.random.normal(media_aposta, 5, NUM_JOGADORES), 0.5, 40) * 2) / 2
+TAMANHO_LOTE = 5000  # Jogadores por tarefa do pool
 
-    argumentos = [(saldos_iniciais[i], apostas[i], max_rodadas) for i in range(NUM_JOGADORES)]
+# Colunas gravadas com gravar_jogadores, um valor por jogador
+COLUNAS_JOGADOR = {
+    'saldo_inicial': 'float64', 'aposta': 'float64', 'rodadas': 'int32', 'atingiu_rollover': 'bool',
+    'apostado': 'float64', 'ganho': 'float64', 'saldo_final': 'float64', 'lucro_bonus': 'float64',
+    'lucro_inicial': 'float64',
+}
 
-    resultados = {
-        'lucros_bonus': [],
-        'lucros_inicial': [],
-        'rodadas': [],
+def novos_resultados():
+    return {
+        'jogadores': 0,
+        'lucros_bonus': Acumulador(),
+        'lucros_inicial': Acumulador(),
+        'rodadas': Acumulador(),
         'atingiu_rollover': 0,
         'total_apostado': 0,
         'total_ganho': 0,
-        'ganhos_rodadas': [],
-        'lucros_validos': []
+        'ganhos_rodadas': Acumulador(BORDAS_GANHO_APOSTA),
+        'jogadores_com_lucro': 0,
+        'sessoes': Covariancias(3),  # (ganho, apostado, controle) de cada sessão
+        'giros_fita': np.zeros(2, dtype=np.int64),  # Giros lidos da fita (normal, fortuna), com usar_fita
+        'medidor': instrumentacao.novo_medidor(instrumentar),  # Etapas e contadores, se instrumentar
     }
 
-    with Pool(processes=cpu_count()) as pool:
-        for resultado in tqdm(pool.imap_unordered(simular_jogador, argumentos), total=NUM_JOGADORES):
-            lucro_bonus, lucro_ini, rodadas, rollover_atingido, total_ganho, ganhos_rodada, saldo_final, saldo_inicial, aposta_total = resultado
-
-            resultados['lucros_bonus'].append(lucro_bonus)
-            resultados['lucros_inicial'].append(lucro_ini)
-            resultados['rodadas'].append(rodadas)
+def sortear_populacao(num_jogadores, media_salario, media_aposta):
+    """Saldos iniciais e apostas de toda a população, do fluxo POPULACAO da campanha."""
+    gerador = gerador_numpy(semente_campanha, POPULACAO)
+    saldos_iniciais = np.round(np.clip(gerador.normal(media_salario, 50, num_jogadores), 10, 1000), 2)
+    apostas = np.round(np.clip(gerador.normal(media_aposta, 5, num_jogadores), 0.5, 40) * 2) / 2
+    return saldos_iniciais, apostas
+
+def simular_lote(tarefa):
+    """Executado nos processos do pool: o lote `indice_lote`, com os jogadores a
+    partir de `inicio`, devolvendo só os acumuladores, de tamanho fixo."""
+    indice_lote, inicio, saldos_iniciais, apostas, max_rodadas = tarefa
+    resultados = novos_resultados()
+    medidor = resultados['medidor']
+
+    if usar_motor_populacao:
+        lidos = jogo_populacao.fita.contagem() if usar_fita else None
+        with medidor.etapa("simulacao"):
+            populacao = simular_bonus_deposito(
+                jogo_populacao, saldos_iniciais, apostas, rollover, multiplicador_bonus_inicial, limite_bonus,
+                somente_bonus, max_rodadas, rng=gerador_numpy(semente_campanha, LOTE, indice_lote),
+                ganhos_rodada=resultados['ganhos_rodadas'], medidor=medidor)
+        if usar_fita:
+            resultados['giros_fita'] += jogo_populacao.fita.contagem() - lidos
+        with medidor.etapa("registro"):
+            registrar_populacao(resultados, populacao)
+        if gravar_jogadores:
+            resultados['por_jogador'] = {
+                'saldo_inicial': saldos_iniciais, 'aposta': apostas, 'rodadas': populacao['rodadas'],
+                'atingiu_rollover': populacao['atingiu_rollover'], 'apostado': populacao['apostado'],
+                'ganho': populacao['ganho'], 'saldo_final': populacao['saldo'],
+                'lucro_bonus': populacao['lucro_bonus'], 'lucro_inicial': populacao['lucro_inicial'],
+            }
+        return resultados
+
+    # No laço por jogador cada jogador tem o seu fluxo: dá para refazer um só (reproduzir_jogador).
+    # O núcleo compilado faz os mesmos sorteios que simular_jogador, na mesma ordem
+    with medidor.etapa("simulacao"):
+        if usar_nucleo_compilado and nucleo.DISPONIVEL:
+            sessoes = nucleo.sessoes_bonus_deposito(
+                jogo_populacao, semente_campanha, inicio, saldos_iniciais, apostas, rollover, multiplicador_bonus_inicial,
+                limite_bonus, somente_bonus, max_rodadas, resultados['ganhos_rodadas'], medidor)
+        else:
+            sessoes = [simular_jogador((saldo_inicial, aposta, max_rodadas), resultados['ganhos_rodadas'],
+                                       gerador_python(semente_campanha, JOGADOR, inicio + j), medidor)
+                       for j, (saldo_inicial, aposta) in enumerate(zip(saldos_iniciais, apostas))]
+    with medidor.etapa("registro"):
+        for lucro_bonus, lucro_ini, rodadas, rollover_atingido, total_ganho, saldo_final, saldo_inicial, aposta_total, controle in sessoes:
+            resultados['jogadores'] += 1
+            resultados['lucros_bonus'].adicionar(lucro_bonus)
+            resultados['lucros_inicial'].adicionar(lucro_ini)
+            resultados['rodadas'].adicionar(rodadas)
             resultados['atingiu_rollover'] += int(rollover_atingido)
             resultados['total_apostado'] += aposta_total * rodadas
             resultados['total_ganho'] += total_ganho
-            resultados['ganhos_rodadas'].extend(ganhos_rodada)
+            resultados['sessoes'].adicionar(total_ganho, aposta_total * rodadas, controle)
 
             if rollover_atingido and saldo_final > saldo_inicial:
-                resultados['lucros_validos'].append(lucro_ini)
+                resultados['jogadores_com_lucro'] += 1
+    if gravar_jogadores:
+        colunas = np.array(sessoes, dtype=np.float64).reshape(-1, 9)
+        resultados['por_jogador'] = {
+            'saldo_inicial': saldos_iniciais, 'aposta': apostas, 'rodadas': colunas[:, 2],
+            'atingiu_rollover': colunas[:, 3], 'apostado': apostas * colunas[:, 2], 'ganho': colunas[:, 4],
+            'saldo_final': colunas[:, 5], 'lucro_bonus': colunas[:, 0], 'lucro_inicial': colunas[:, 1],
+        }
+    return resultados
+
+def registrar_populacao(resultados, populacao):
+    """Acumula os vetores por jogador de motor.populacao.simular_bonus_deposito."""
+    resultados['jogadores'] += len(populacao['rodadas'])
+    resultados['lucros_bonus'].adicionar_lote(populacao['lucro_bonus'])
+    resultados['lucros_inicial'].adicionar_lote(populacao['lucro_inicial'])
+    resultados['rodadas'].adicionar_lote(populacao['rodadas'])
+    resultados['atingiu_rollover'] += int(populacao['atingiu_rollover'].sum())
+    resultados['total_apostado'] += populacao['apostado'].sum()
+    resultados['total_ganho'] += populacao['ganho'].sum()
+    resultados['sessoes'].adicionar_lote(populacao['ganho'], populacao['apostado'], populacao['controle'])
+    resultados['jogadores_com_lucro'] += int((populacao['atingiu_rollover'] & (populacao['lucro_inicial'] > 0)).sum())
+
+def reproduzir_jogador(indice, num_jogadores, media_salario=354, media_aposta=12, max_rodadas=10000):
+    """Refaz só a sessão do jogador `indice` do laço em Python, com os mesmos
+    sorteios da campanha inteira (mesma tupla de `simular_jogador`)."""
+    saldos_iniciais, apostas = sortear_populacao(num_jogadores, media_salario, media_aposta)
+    return simular_jogador((saldos_iniciais[indice], apostas[indice], max_rodadas), Acumulador(),
+                           gerador_python(semente_campanha, JOGADOR, indice))
+
+def rollover_exato(saldos_iniciais, apostas, max_rodadas):
+    """Probabilidade de cada jogador atingir o rollover e saldo final esperado de
+    quem atinge, sem simular (motor.rollover)."""
+    valor_bonus = np.minimum(saldos_iniciais * (multiplicador_bonus_inicial - 1), limite_bonus)
+    saldos = saldos_iniciais + valor_bonus
+    metas = rollover * (valor_bonus if somente_bonus else saldos)
+    giros = giros_ratinho(jogo.pesos, jogo.multiplicadores, jogo.prob_fortuna, premio_jackpot=jogo.premio_jackpot)
+    return resolver_rollover(giros, saldos, apostas, metas, max_rodadas)
+
+def varrer_lote(tarefa):
+    """Executado nos processos do pool: o lote `indice_lote` em todos os pontos da
+    grade, devolvendo as somas por ponto."""
+    indice_lote, inicio, saldos_iniciais, apostas, max_rodadas, pontos = tarefa
+    jogadores = varrer_bonus_deposito(jogo_populacao, saldos_iniciais, apostas, pontos, max_rodadas,
+                                      rng=gerador_numpy(semente_campanha, LOTE, indice_lote))
+    return totais(jogadores, com_lucro=jogadores['atingiu_rollover'] & (jogadores['lucro'] > 0))
+
+def main():
+    NUM_JOGADORES = 100000
+    media_salario = 354
+    media_aposta = 12
+    max_rodadas = 10000
+
+    saldos_iniciais, apostas = sortear_populacao(NUM_JOGADORES, media_salario, media_aposta)
+
+    if modo_exato:
+        prob_rollover, saldo_rollover = rollover_exato(saldos_iniciais, apostas, max_rodadas)
+        print("\n=== ROLLOVER EXATO (PROGRAMAÇÃO DINÂMICA) ===")
+        print(f"Semente da campanha: {semente_campanha}")
+        print(formatar_rollover(prob_rollover, saldo_rollover, saldos_iniciais))
+        return
+
+    if usar_fita and usar_motor_populacao:
+        # Gera a fita (na primeira vez) aqui, uma vez só: não ao importar o script nem em cada processo do pool
+        jogo_populacao.fita.carregar()
+
+    tarefas = [(k, inicio, saldos_iniciais[inicio:inicio + TAMANHO_LOTE], apostas[inicio:inicio + TAMANHO_LOTE],
+                max_rodadas) for k, inicio in enumerate(range(0, NUM_JOGADORES, TAMANHO_LOTE))]
+
+    if grade_varredura:
+        pontos = pontos_da_grade(grade_varredura, rollover=rollover,
+                                 multiplicador_bonus_inicial=multiplicador_bonus_inicial,
+                                 limite_bonus=limite_bonus, somente_bonus=somente_bonus)
+        somas = None
+        with tqdm(total=NUM_JOGADORES, desc=f"Varrendo {len(pontos)} pontos") as barra:
+            for parcial in mapear_lotes(varrer_lote, [tarefa + (pontos,) for tarefa in tarefas], processos):
+                somas = parcial if somas is None else juntar_resultados(somas, parcial)
+                barra.update(parcial['jogadores'])
+        print(f"\n=== VARREDURA DE {len(pontos)} PONTOS (MESMOS JOGADORES E GIROS) ===")
+        print(f"Semente da campanha: {semente_campanha}")
+        print(formatar_varredura(pontos, somas))
+        return
+
+    # Os lotes chegam na ordem e são juntados nessa ordem; o checkpoint guarda os já juntados
+    checkpoint = Checkpoint(os.path.splitext(os.path.abspath(__file__))[0] + ".checkpoint",
+                            (tarefas, jogo, semente_campanha, usar_motor_populacao, usar_fita, giros_fita,
+                             gravar_jogadores, rollover, multiplicador_bonus_inicial, limite_bonus, somente_bonus),
+                            intervalo_checkpoint)
+    resultados, feitos = checkpoint.retomar(novos_resultados, pediu_retomada())
+    gravador = (GravadorColunas(gravar_jogadores, COLUNAS_JOGADOR, NUM_JOGADORES, continuar=feitos > 0,
+                                script=os.path.basename(__file__), semente_campanha=semente_campanha)
+                if gravar_jogadores else None)
+    funcao = instrumentacao.medido(simular_lote, instrumentar, perfilar)
+    with tqdm(total=NUM_JOGADORES, initial=resultados['jogadores'], desc="Simulando jogadores") as barra:
+        for lote, parcial in enumerate(mapear_lotes(funcao, tarefas[feitos:], processos), start=feitos + 1):
+            por_jogador = parcial.pop('por_jogador', None)
+            if gravador is not None:
+                with resultados['medidor'].etapa("gravar_jogadores"):
+                    gravador.gravar(tarefas[lote - 1][1], por_jogador)
+            with resultados['medidor'].etapa("juntar"):
+                juntar_resultados(resultados, parcial)
+            checkpoint.gravar(resultados, lote)
+            barra.update(parcial['jogadores'])
+    if gravador is not None:
+        gravador.fechar()
+        print(f"Resultados por jogador em {gravar_jogadores} (motor.colunas.carregar_colunas)")
+    checkpoint.concluir()
+    if usar_fita and usar_motor_populacao:
+        for modo, giros in enumerate(resultados['giros_fita']):
+            jogo_populacao.fita.conferir(int(giros), modo)
 
     rtp = (resultados['total_ganho'] / resultados['total_apostado']) * 100
-    positivos = len(resultados['lucros_validos'])
+    positivos = resultados['jogadores_com_lucro']
     negativos = NUM_JOGADORES - positivos
 
     print("\n=== RESULTADOS DA SIMULAÇÃO ===")
+    print(f"Semente da campanha: {semente_campanha}")
     print(f"RTP Observado: {rtp:.2f}%")
+    _, rtp_controle, fator = razao_com_controle_acumulada(resultados['sessoes'])
+    print(formatar_controle(rtp_controle, fator))
+    rtp_teorico = rtp_ratinho(jogo.pesos, jogo.multiplicadores, jogo.prob_fortuna, premio_jackpot=jogo.premio_jackpot)
+    print(f"RTP Teórico (longo prazo, exato): {rtp_teorico:.2f}%")
     print(f"Jogadores com lucro: {positivos} ({positivos / NUM_JOGADORES * 100:.1f}%)")
     print(f"Jogadores com prejuízo: {negativos} ({negativos / NUM_JOGADORES * 100:.1f}%)")
     print(f"Jogadores que atingiram o rollover: {resultados['atingiu_rollover']} ({resultados['atingiu_rollover'] / NUM_JOGADORES * 100:.4f}%)")
-    print(f"Média de rodadas: {np.mean(resultados['rodadas']):.1f}")
-    print(f"Lucro médio (relativo ao saldo com bônus): R$ {np.mean(resultados['lucros_bonus']):.2f}")
-    print(f"Lucro médio (relativo ao saldo inicial): R$ {np.mean(resultados['lucros_inicial']):.2f}")
-
-    volatilidade_sessao = np.std(resultados['lucros_inicial'])
+    print(f"Média de rodadas: {resultados['rodadas'].media:.1f}")
+    print(f"Lucro médio (relativo ao saldo com bônus): R$ {resultados['lucros_bonus'].media:.2f}")
+    print(f"Lucro médio (relativo ao saldo inicial): R$ {resultados['lucros_inicial'].media:.2f}")
 
-    ganhos_relativos_rodada = [ganho / aposta for ganho, aposta, rodada in zip(
-        resultados['ganhos_rodadas'],
-        np.repeat(apostas, resultados['rodadas']),
-        resultados['ganhos_rodadas']
-    )]
-    volatilidade_rodada = np.std(ganhos_relativos_rodada)
+    volatilidade_sessao = resultados['lucros_inicial'].desvio_padrao
+    volatilidade_rodada = resultados['ganhos_rodadas'].desvio_padrao
 
     print(f"\nVolatilidade do lucro por sessão (relativo à aposta): {volatilidade_sessao:.4f}")
     print(f"Volatilidade do ganho por rodada (relativo à aposta): {volatilidade_rodada:.4f}")
+    print(f"Maior ganho em uma rodada: {resultados['ganhos_rodadas'].maximo:.1f}x a aposta")
+    print("Distribuição do ganho por rodada (relativo à aposta):")
+    print(formatar_histograma(resultados['ganhos_rodadas']))
+
+    if instrumentar:
+        print(instrumentacao.formatar(resultados['medidor'], giros=resultados['ganhos_rodadas'].n,
+                                     jogadores=resultados['jogadores']))
 
 if __name__ == "__main__":
     main()
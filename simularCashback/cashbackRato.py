@@ -1,85 +1,62 @@
-import random
+import os
+import sys
 import numpy as np
 from tqdm import tqdm
+from multiprocessing import cpu_count
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.colunas import GravadorColunas
+from motor.estatisticas import BORDAS_GANHO_APOSTA, Acumulador, Covariancias, juntar_resultados
+from motor.fitas import TAMANHO_PADRAO, FitaGiros
+from motor.jogos import LINHAS, compilar
+from motor.paralelo import mapear_lotes
+from motor.retomada import Checkpoint, pediu_retomada
+from motor.populacao import Jogo, simular_cashback
+from motor.rtp_exato import rtp_ratinho
+from motor import instrumentacao, nucleo
+from motor.sementes import JOGADOR, LOTE, POPULACAO, gerador_numpy, gerador_python
+from motor.varredura import formatar_varredura, pontos_da_grade, totais, varrer_cashback
+from motor.variancia import formatar_controle, razao_com_controle_acumulada
 
 # === Configurações do cashback ===
 cashback_percentual = 0.25        
 rollover_multiplicador = 1    
 valor_maximo = 300000000000000000
+usar_motor_populacao = True  # False volta para o laço por jogador
+usar_nucleo_compilado = True  # Laço por jogador compilado (motor.nucleo) se o Numba estiver instalado; mesmos números
+usar_fita = False  # Com o motor de população, lê os giros de uma fita pré-gerada em motor/cache (motor.fitas)
+giros_fita = TAMANHO_PADRAO  # Giros por modo na fita (128 MB); 1 << 28 cobre a campanha: 2 GB por modo e semente (motor.fitas)
+instrumentar = False  # True cronometra as etapas e conta fortunas e bytes do pool; resumo no fim (motor.instrumentacao)
+perfilar = False  # Com instrumentar, também amostra a pilha durante os lotes: as funções mais lentas
+processos = cpu_count()  # O resultado é o mesmo com qualquer número de processos
+TAMANHO_LOTE = 10000  # Jogadores por tarefa do pool
+semente_campanha = 2024  # Semente mestre: saldos, lotes e jogadores têm fluxos próprios (motor.sementes)
+intervalo_checkpoint = 60  # Segundos entre gravações do estado em <script>.checkpoint (retome com --resume); None desliga
+gravar_jogadores = None  # Diretório para os resultados por jogador em colunas .npy (motor.colunas); None não grava
+grade_varredura = None  # Ex.: {"cashback_percentual": [5, 10], "rollover_multiplicador": [1, 3]}: tabela com todos os pontos, mesmos jogadores e giros (motor.varredura)
 
-# === Configuração dos símbolos ===
-symbols = {
-    "🐭": {"multiplier": 300, "weight": 2},
-    "🏆": {"multiplier": 100, "weight": 2},
-    "🍊": {"multiplier": 50,  "weight": 3},
-    "🔑": {"multiplier": 30,  "weight": 10},
-    "💰": {"multiplier": 15,  "weight": 11},
-    "🧧": {"multiplier": 5,   "weight": 21},
-    "🔭": {"multiplier": 3,   "weight": 57},
-}
-
-# === Geração do pool de símbolos ===
-symbol_pool = []
-for emoji, data in symbols.items():
-    symbol_pool.extend([emoji] * data["weight"])
-
-# === Paylines ===
-paylines = [
-    [(0, 0), (0, 1), (0, 2)],
-    [(1, 0), (1, 1), (1, 2)],
-    [(2, 0), (2, 1), (2, 2)],
-    [(0, 0), (1, 1), (2, 2)],
-    [(2, 0), (1, 1), (0, 2)]
-]
-
-# === Funções do jogo ===
-def gerar_grade_normal():
-    return [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-
-def gerar_grade_rato_fortuna():
-    grade = [[None for _ in range(3)] for _ in range(3)]
-    for i in range(3):
-        grade[i][1] = "🐭"
-        grade[i][0] = random.choice(symbol_pool)
-        grade[i][2] = random.choice(symbol_pool)
-    return grade
-
-def calcular_premio(grade, aposta_por_linha):
-    todos_simbolos = [s for linha in grade for s in linha]
-    if all(s == "🐭" for s in todos_simbolos):
-        return aposta_por_linha * 1000 * len(paylines)
-
-    ganho_total = 0
-    for linha in paylines:
-        simbolos = [grade[x][y] for x, y in linha]
-        simbolos_sem_rato = [s for s in simbolos if s != "🐭"]
-
-        if not simbolos_sem_rato:
-            simbolo_vencedor = "🐭"
-        elif all(s == simbolos_sem_rato[0] for s in simbolos_sem_rato):
-            simbolo_vencedor = simbolos_sem_rato[0]
-        else:
-            continue
-
-        ganho_total += aposta_por_linha * symbols[simbolo_vencedor]["multiplier"]
+# === Jogo: definição compartilhada, compilada uma vez (motor.jogos) ===
+jogo = compilar("ratinho")
 
-    return ganho_total
+# Mesmas regras, com todos os jogadores em vetores (motor.populacao)
+jogo_populacao = Jogo(jogo, fita=FitaGiros(jogo, giros_fita, semente_campanha) if usar_fita else None)
 
-def simular_jogador(saldo_inicial):
+def simular_jogador(saldo_inicial, ganhos_rodada, rng, medidor=instrumentacao.DESLIGADO):
+    """`ganhos_rodada` é um `Acumulador` que recebe o ganho / aposta de cada giro;
+    `rng` é o `random.Random` do jogador."""
     cashback = min((saldo_inicial * (cashback_percentual / 100)), valor_maximo)
     saldo = cashback
-    linhas_ativas = len(paylines)
+    linhas_ativas = LINHAS
     total_apostado = 0
+    controle = 0  # Soma de aposta_por_linha * (linhas - média exata): média zero
     total_ganho = 0
     rodadas = 0
-    ganhos_por_rodada = []
     atingiu_rollover = False
 
     modo_rato_fortuna = False
-    prob_ativar_rato = 0.2
 
     # === Escolha da aposta fixa, entre 10% e 20% do cashback, arredondado para múltiplo de 0.5 ===
-    percentual_escolhido = random.uniform(0.10, 0.20)
+    percentual_escolhido = rng.uniform(0.10, 0.20)
     aposta_fixa = round(percentual_escolhido * cashback / 0.5) * 0.5
     if aposta_fixa < 0.5:
         aposta_fixa = 0.5
@@ -98,14 +75,16 @@ def simular_jogador(saldo_inicial):
         saldo -= aposta_total
         total_apostado += aposta_total
 
-        if not modo_rato_fortuna and random.random() < prob_ativar_rato:
+        if not modo_rato_fortuna and rng.random() < jogo.prob_fortuna:
+            medidor.contar("ativacoes_fortuna")
             modo_rato_fortuna = True
 
-        grade = gerar_grade_rato_fortuna() if modo_rato_fortuna else gerar_grade_normal()
-        ganho = calcular_premio(grade, aposta_por_linha)
+        linhas = jogo.sortear_linhas(rng, modo_rato_fortuna)
+        ganho = jogo.premio_linhas(linhas) * aposta_por_linha
+        controle += aposta_por_linha * jogo.controle(linhas, modo_rato_fortuna)
         saldo += ganho
         total_ganho += ganho
-        ganhos_por_rodada.append((ganho, aposta_por_linha))
+        ganhos_rodada.adicionar(ganho / aposta_total)
         rodadas += 1
 
         if modo_rato_fortuna and ganho > 0:
@@ -116,58 +95,193 @@ def simular_jogador(saldo_inicial):
             break
 
     lucro_final = saldo - cashback
-    return lucro_final, rodadas, total_apostado, total_ganho, ganhos_por_rodada, atingiu_rollover
+    return lucro_final, rodadas, total_apostado, total_ganho, atingiu_rollover, controle
 
 # === Simulação ===
+# Colunas gravadas com gravar_jogadores, um valor por jogador
+COLUNAS_JOGADOR = {
+    'saldo_inicial': 'float64', 'cashback': 'float64', 'rodadas': 'int32', 'atingiu_rollover': 'bool',
+    'apostado': 'float64', 'ganho': 'float64', 'saldo_final': 'float64', 'lucro': 'float64',
+}
+
+def novos_resultados():
+    return {
+        'jogadores': 0,
+        'lucros': Acumulador(),
+        'lucros_relativos': Acumulador(),  # Lucro / cashback
+        'rodadas': Acumulador(),
+        'total_apostado': 0,
+        'total_ganho': 0,
+        'ganhos_rodadas': Acumulador(BORDAS_GANHO_APOSTA),
+        'atingiu_rollover': 0,
+        'sessoes': Covariancias(3),  # (ganho, apostado, controle) de cada sessão
+        'giros_fita': np.zeros(2, dtype=np.int64),  # Giros lidos da fita (normal, fortuna), com usar_fita
+        'medidor': instrumentacao.novo_medidor(instrumentar),  # Etapas e contadores, se instrumentar
+    }
+
+def sortear_saldos(num_jogadores, media_salario):
+    """Saldos iniciais de toda a população, do fluxo POPULACAO da campanha."""
+    gerador = gerador_numpy(semente_campanha, POPULACAO)
+    return np.round(np.clip(gerador.normal(media_salario, 50, num_jogadores), 10, 1000), 2)
+
+def simular_lote(tarefa):
+    """Executado nos processos do pool: o lote `indice_lote`, com os jogadores a
+    partir de `inicio`, devolvendo só os acumuladores."""
+    indice_lote, inicio, saldos_iniciais = tarefa
+    cashbacks = saldos_iniciais * (cashback_percentual / 100)
+    resultados = novos_resultados()
+    medidor = resultados['medidor']
+
+    if usar_motor_populacao:
+        lidos = jogo_populacao.fita.contagem() if usar_fita else None
+        with medidor.etapa("simulacao"):
+            populacao = simular_cashback(jogo_populacao, saldos_iniciais, cashback_percentual, rollover_multiplicador,
+                                         valor_maximo, rng=gerador_numpy(semente_campanha, LOTE, indice_lote),
+                                         ganhos_rodada=resultados['ganhos_rodadas'], medidor=medidor)
+        if usar_fita:
+            resultados['giros_fita'] += jogo_populacao.fita.contagem() - lidos
+        with medidor.etapa("registro"):
+            resultados['jogadores'] += len(saldos_iniciais)
+            resultados['lucros'].adicionar_lote(populacao['lucro'])
+            resultados['lucros_relativos'].adicionar_lote(populacao['lucro'] / cashbacks)
+            resultados['rodadas'].adicionar_lote(populacao['rodadas'])
+            resultados['total_apostado'] += populacao['apostado'].sum()
+            resultados['total_ganho'] += populacao['ganho'].sum()
+            resultados['atingiu_rollover'] += int(populacao['atingiu_rollover'].sum())
+            resultados['sessoes'].adicionar_lote(populacao['ganho'], populacao['apostado'], populacao['controle'])
+        if gravar_jogadores:
+            resultados['por_jogador'] = {
+                'saldo_inicial': saldos_iniciais, 'cashback': populacao['cashback'], 'rodadas': populacao['rodadas'],
+                'atingiu_rollover': populacao['atingiu_rollover'], 'apostado': populacao['apostado'],
+                'ganho': populacao['ganho'], 'saldo_final': populacao['saldo'], 'lucro': populacao['lucro'],
+            }
+        return resultados
+
+    # No laço por jogador cada jogador tem o seu fluxo: dá para refazer um só (reproduzir_jogador).
+    # O núcleo compilado faz os mesmos sorteios que simular_jogador, na mesma ordem
+    with medidor.etapa("simulacao"):
+        if usar_nucleo_compilado and nucleo.DISPONIVEL:
+            sessoes = nucleo.sessoes_cashback(jogo_populacao, semente_campanha, inicio, saldos_iniciais,
+                                              cashback_percentual, rollover_multiplicador, valor_maximo,
+                                              resultados['ganhos_rodadas'], medidor)
+        else:
+            sessoes = [simular_jogador(saldo_inicial, resultados['ganhos_rodadas'],
+                                       gerador_python(semente_campanha, JOGADOR, inicio + j), medidor)
+                       for j, saldo_inicial in enumerate(saldos_iniciais)]
+    with medidor.etapa("registro"):
+        for cashback, (lucro, rodadas, apostado, ganho, rollover, controle) in zip(cashbacks, sessoes):
+            resultados['jogadores'] += 1
+            resultados['lucros'].adicionar(lucro)
+            resultados['lucros_relativos'].adicionar(lucro / cashback)
+            resultados['rodadas'].adicionar(rodadas)
+            resultados['total_apostado'] += apostado
+            resultados['total_ganho'] += ganho
+            resultados['atingiu_rollover'] += int(rollover)
+            resultados['sessoes'].adicionar(ganho, apostado, controle)
+    if gravar_jogadores:
+        colunas = np.array(sessoes, dtype=np.float64).reshape(-1, 6)
+        cashback = np.minimum(cashbacks, valor_maximo)
+        resultados['por_jogador'] = {
+            'saldo_inicial': saldos_iniciais, 'cashback': cashback, 'rodadas': colunas[:, 1],
+            'atingiu_rollover': colunas[:, 4], 'apostado': colunas[:, 2], 'ganho': colunas[:, 3],
+            'saldo_final': colunas[:, 0] + cashback, 'lucro': colunas[:, 0],
+        }
+    return resultados
+
+def reproduzir_jogador(indice, num_jogadores, media_salario=354):
+    """Refaz só a sessão do jogador `indice` do laço em Python, com os mesmos
+    sorteios da campanha inteira: (lucro, rodadas, apostado, ganho, rollover, controle)."""
+    saldo_inicial = sortear_saldos(num_jogadores, media_salario)[indice]
+    return simular_jogador(saldo_inicial, Acumulador(), gerador_python(semente_campanha, JOGADOR, indice))
+
+def varrer_lote(tarefa):
+    """Executado nos processos do pool: o lote `indice_lote` em todos os pontos da
+    grade, devolvendo as somas por ponto."""
+    indice_lote, inicio, saldos_iniciais, pontos = tarefa
+    jogadores = varrer_cashback(jogo_populacao, saldos_iniciais, pontos,
+                                rng=gerador_numpy(semente_campanha, LOTE, indice_lote))
+    return totais(jogadores, com_lucro=jogadores['lucro'] > 0)
+
 def main():
     NUM_JOGADORES = 1000000
     media_salario = 354
 
-    saldos_iniciais = np.round(np.clip(np.random.normal(media_salario, 50, NUM_JOGADORES), 10, 1000), 2)
+    saldos_iniciais = sortear_saldos(NUM_JOGADORES, media_salario)
+    if usar_fita and usar_motor_populacao:
+        # Gera a fita (na primeira vez) aqui, uma vez só: não ao importar o script nem em cada processo do pool
+        jogo_populacao.fita.carregar()
 
-    resultados = {
-        'lucros': [],
-        'rodadas': [],
-        'total_apostado': 0,
-        'total_ganho': 0,
-        'ganhos_rodadas': [],
-        'rodadas_por_jogador': [],
-        'atingiu_rollover': 0
-    }
+    tarefas = [(k, inicio, saldos_iniciais[inicio:inicio + TAMANHO_LOTE])
+               for k, inicio in enumerate(range(0, NUM_JOGADORES, TAMANHO_LOTE))]
 
-    for i in tqdm(range(NUM_JOGADORES), desc="Simulando jogadores"):
-        lucro, rodadas, apostado, ganho, ganhos_por_rodada, rollover = simular_jogador(saldos_iniciais[i])
-        resultados['lucros'].append(lucro)
-        resultados['rodadas'].append(rodadas)
-        resultados['total_apostado'] += apostado
-        resultados['total_ganho'] += ganho
-        resultados['ganhos_rodadas'].extend(ganhos_por_rodada)
-        resultados['rodadas_por_jogador'].append(rodadas)
-        resultados['atingiu_rollover'] += int(rollover)
+    if grade_varredura:
+        pontos = pontos_da_grade(grade_varredura, cashback_percentual=cashback_percentual,
+                                 rollover_multiplicador=rollover_multiplicador, valor_maximo=valor_maximo)
+        somas = None
+        with tqdm(total=NUM_JOGADORES, desc=f"Varrendo {len(pontos)} pontos") as barra:
+            for parcial in mapear_lotes(varrer_lote, [tarefa + (pontos,) for tarefa in tarefas], processos):
+                somas = parcial if somas is None else juntar_resultados(somas, parcial)
+                barra.update(parcial['jogadores'])
+        print(f"\n=== VARREDURA DE {len(pontos)} PONTOS (MESMOS JOGADORES E GIROS) ===")
+        print(f"Semente da campanha: {semente_campanha}")
+        print(formatar_varredura(pontos, somas))
+        return
+
+    # Os lotes chegam na ordem e são juntados nessa ordem; o checkpoint guarda os já juntados
+    checkpoint = Checkpoint(os.path.splitext(os.path.abspath(__file__))[0] + ".checkpoint",
+                            (tarefas, jogo, semente_campanha, usar_motor_populacao, usar_fita, giros_fita,
+                             gravar_jogadores, cashback_percentual, rollover_multiplicador, valor_maximo),
+                            intervalo_checkpoint)
+    resultados, feitos = checkpoint.retomar(novos_resultados, pediu_retomada())
+    gravador = (GravadorColunas(gravar_jogadores, COLUNAS_JOGADOR, NUM_JOGADORES, continuar=feitos > 0,
+                                script=os.path.basename(__file__), semente_campanha=semente_campanha)
+                if gravar_jogadores else None)
+    funcao = instrumentacao.medido(simular_lote, instrumentar, perfilar)
+    with tqdm(total=NUM_JOGADORES, initial=resultados['jogadores'], desc="Simulando jogadores") as barra:
+        for lote, parcial in enumerate(mapear_lotes(funcao, tarefas[feitos:], processos), start=feitos + 1):
+            por_jogador = parcial.pop('por_jogador', None)
+            if gravador is not None:
+                with resultados['medidor'].etapa("gravar_jogadores"):
+                    gravador.gravar(tarefas[lote - 1][1], por_jogador)
+            with resultados['medidor'].etapa("juntar"):
+                juntar_resultados(resultados, parcial)
+            checkpoint.gravar(resultados, lote)
+            barra.update(parcial['jogadores'])
+    if gravador is not None:
+        gravador.fechar()
+        print(f"Resultados por jogador em {gravar_jogadores} (motor.colunas.carregar_colunas)")
+    checkpoint.concluir()
+    if usar_fita and usar_motor_populacao:
+        for modo, giros in enumerate(resultados['giros_fita']):
+            jogo_populacao.fita.conferir(int(giros), modo)
 
     # === Estatísticas principais ===
     rtp = (resultados['total_ganho'] / resultados['total_apostado']) * 100 if resultados['total_apostado'] > 0 else 0
-    media_percentual_lucro = np.mean([lucro / (saldo_inicial * (cashback_percentual / 100))
-                                       for lucro, saldo_inicial in zip(resultados['lucros'], saldos_iniciais)]) * 100
+    media_percentual_lucro = resultados['lucros_relativos'].media * 100
     perc_atingiu_rollover = (resultados['atingiu_rollover'] / NUM_JOGADORES) * 100
 
     # === Volatilidade ===
-    lucros_relativos = [lucro / (saldo_inicial * (cashback_percentual / 100))
-                         for lucro, saldo_inicial in zip(resultados['lucros'], saldos_iniciais)]
-    volatilidade_sessao = np.std(lucros_relativos)
-
-    ganhos_relativos_rodada = [ganho / aposta if aposta > 0 else 0 for ganho, aposta in resultados['ganhos_rodadas']]
-    volatilidade_rodada = np.std(ganhos_relativos_rodada)
+    volatilidade_sessao = resultados['lucros_relativos'].desvio_padrao
+    volatilidade_rodada = resultados['ganhos_rodadas'].desvio_padrao
 
     # === Impressão dos resultados ===
     print("\n=== RESULTADOS DA SIMULAÇÃO COM CASHBACK ===")
+    print(f"Semente da campanha: {semente_campanha}")
     print(f"RTP Observado: {rtp:.2f}%")
-    print(f"Média de rodadas por jogador: {np.mean(resultados['rodadas']):.2f}")
+    _, rtp_controle, fator = razao_com_controle_acumulada(resultados['sessoes'])
+    print(formatar_controle(rtp_controle, fator))
+    rtp_teorico = rtp_ratinho(jogo.pesos, jogo.multiplicadores, jogo.prob_fortuna, premio_jackpot=jogo.premio_jackpot)
+    print(f"RTP Teórico (longo prazo, exato): {rtp_teorico:.2f}%")
+    print(f"Média de rodadas por jogador: {resultados['rodadas'].media:.2f}")
     print(f"Média de lucro/prejuízo em relação ao cashback: {media_percentual_lucro:.2f}%")
-    print(f"Lucro médio absoluto: R$ {np.mean(resultados['lucros']):.2f}")
+    print(f"Lucro médio absoluto: R$ {resultados['lucros'].media:.2f}")
     print(f"Jogadores que atingiram o rollover: {resultados['atingiu_rollover']} ({perc_atingiu_rollover:.4f}%)")
     print(f"\nVolatilidade do lucro por sessão (relativo ao cashback): {volatilidade_sessao:.4f}")
     print(f"Volatilidade do ganho por rodada (relativo à aposta): {volatilidade_rodada:.4f}")
 
+    if instrumentar:
+        print(instrumentacao.formatar(resultados['medidor'], giros=resultados['ganhos_rodadas'].n,
+                                     jogadores=resultados['jogadores']))
+
 if __name__ == "__main__":
     main()
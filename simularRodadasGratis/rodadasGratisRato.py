@@ -1,6 +1,21 @@
-import random
+import os
+import sys
 import numpy as np
 from tqdm import tqdm
+from multiprocessing import cpu_count
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from motor.colunas import GravadorColunas
+from motor.estatisticas import Acumulador, Covariancias, juntar_resultados
+from motor.fitas import TAMANHO_PADRAO, FitaGiros
+from motor.jogos import LINHAS, compilar
+from motor.paralelo import mapear_lotes
+from motor.retomada import Checkpoint, pediu_retomada
+from motor.populacao import Jogo, simular_rodadas_gratis
+from motor.rodadas_exatas import formatar_rodadas, rodadas_ratinho
+from motor import instrumentacao, nucleo
+from motor.sementes import JOGADOR, LOTE, gerador_numpy, gerador_python
+from motor.variancia import formatar_controle, razao_com_controle_acumulada
 
 # === Configuração do depósito inicial ===
 DEPOSITO_INICIAL = 30.0  
@@ -8,131 +23,203 @@ DEPOSITO_INICIAL = 30.0
 # === Configuração das rodadas grátis ===
 NUM_RODADAS_GRATIS = 10
 APOSTA_FIXA = 0.4
-
-# === Configuração dos símbolos ===
-symbols = {
-    "🐭": {"multiplier": 300, "weight": 2},
-    "🏆": {"multiplier": 100, "weight": 2},
-    "🍊": {"multiplier": 50,  "weight": 3},
-    "🔑": {"multiplier": 30,  "weight": 10},
-    "💰": {"multiplier": 15,  "weight": 11},
-    "🧧": {"multiplier": 5,   "weight": 21},
-    "🔭": {"multiplier": 3,   "weight": 57},
-}
-
-# === Geração do pool de símbolos ===
-symbol_pool = []
-for emoji, data in symbols.items():
-    symbol_pool.extend([emoji] * data["weight"])
-
-# === Paylines ===
-paylines = [
-    [(0, 0), (0, 1), (0, 2)],
-    [(1, 0), (1, 1), (1, 2)],
-    [(2, 0), (2, 1), (2, 2)],
-    [(0, 0), (1, 1), (2, 2)],
-    [(2, 0), (1, 1), (0, 2)]
-]
-
-# === Funções do jogo ===
-def gerar_grade_normal():
-    return [[random.choice(symbol_pool) for _ in range(3)] for _ in range(3)]
-
-def gerar_grade_rato_fortuna():
-    grade = [[None for _ in range(3)] for _ in range(3)]
-    for i in range(3):
-        grade[i][1] = "🐭"
-        grade[i][0] = random.choice(symbol_pool)
-        grade[i][2] = random.choice(symbol_pool)
-    return grade
-
-def calcular_premio(grade, aposta_por_linha):
-    todos_simbolos = [s for linha in grade for s in linha]
-    if all(s == "🐭" for s in todos_simbolos):
-        return aposta_por_linha * 1000 * len(paylines)
-
-    ganho_total = 0
-    for linha in paylines:
-        simbolos = [grade[x][y] for x, y in linha]
-        simbolos_sem_rato = [s for s in simbolos if s != "🐭"]
-
-        if not simbolos_sem_rato:
-            simbolo_vencedor = "🐭"
-        elif all(s == simbolos_sem_rato[0] for s in simbolos_sem_rato):
-            simbolo_vencedor = simbolos_sem_rato[0]
-        else:
-            continue
-
-        ganho_total += aposta_por_linha * symbols[simbolo_vencedor]["multiplier"]
-
-    return ganho_total
-
-def simular_jogador():
-    linhas_ativas = len(paylines)
+usar_motor_populacao = True  # False volta para o laço por jogador
+usar_nucleo_compilado = True  # Laço por jogador compilado (motor.nucleo) se o Numba estiver instalado; mesmos números
+usar_fita = False  # Com o motor de população, lê os giros de uma fita pré-gerada em motor/cache (motor.fitas)
+giros_fita = TAMANHO_PADRAO  # Giros por modo na fita (128 MB); 1 << 28 cobre a campanha: 2 GB por modo e semente (motor.fitas)
+instrumentar = False  # True cronometra as etapas e conta fortunas e bytes do pool; resumo no fim (motor.instrumentacao)
+perfilar = False  # Com instrumentar, também amostra a pilha durante os lotes: as funções mais lentas
+modo_exato = False  # True calcula a distribuição exata do ganho (motor.rodadas_exatas), sem simular
+processos = cpu_count()  # O resultado é o mesmo com qualquer número de processos
+TAMANHO_LOTE = 10000  # Jogadores por tarefa do pool
+semente_campanha = 2024  # Semente mestre: lotes e jogadores têm fluxos próprios (motor.sementes)
+intervalo_checkpoint = 60  # Segundos entre gravações do estado em <script>.checkpoint (retome com --resume); None desliga
+gravar_jogadores = None  # Diretório para os resultados por jogador em colunas .npy (motor.colunas); None não grava
+
+# === Jogo: definição compartilhada, compilada uma vez (motor.jogos) ===
+jogo = compilar("ratinho")
+
+# Mesmas regras, com todos os jogadores em vetores (motor.populacao)
+jogo_populacao = Jogo(jogo, fita=FitaGiros(jogo, giros_fita, semente_campanha) if usar_fita else None)
+
+def simular_jogador(ganhos_rodada, rng, medidor=instrumentacao.DESLIGADO):
+    """`ganhos_rodada` é um `Acumulador` que recebe o ganho / aposta de cada giro;
+    `rng` é o `random.Random` do jogador."""
+    linhas_ativas = LINHAS
     aposta_por_linha = APOSTA_FIXA / linhas_ativas
     saldo = 0
+    controle = 0  # Soma de aposta_por_linha * (linhas - média exata): média zero
     total_apostado = 0
-    ganhos_por_rodada = []
     modo_rato_fortuna = False
-    prob_ativar_rato = 0.2
 
     # === Rodadas grátis ===
     for _ in range(NUM_RODADAS_GRATIS):
-        if not modo_rato_fortuna and random.random() < prob_ativar_rato:
+        if not modo_rato_fortuna and rng.random() < jogo.prob_fortuna:
+            medidor.contar("ativacoes_fortuna")
             modo_rato_fortuna = True
 
-        grade = gerar_grade_rato_fortuna() if modo_rato_fortuna else gerar_grade_normal()
-        ganho = calcular_premio(grade, aposta_por_linha)
+        linhas = jogo.sortear_linhas(rng, modo_rato_fortuna)
+        ganho = jogo.premio_linhas(linhas) * aposta_por_linha
+        controle += aposta_por_linha * jogo.controle(linhas, modo_rato_fortuna)
         saldo += ganho
         total_apostado += APOSTA_FIXA
-        ganhos_por_rodada.append(ganho)
+        ganhos_rodada.adicionar(ganho / APOSTA_FIXA)
 
         if modo_rato_fortuna and ganho > 0:
             modo_rato_fortuna = False
 
-    return saldo, total_apostado, ganhos_por_rodada
+    return saldo, total_apostado, controle
 
 # === Simulação ===
-def main():
-    NUM_JOGADORES = 100000
-    resultados = {
-        'saldos_finais': [],
+# Colunas gravadas com gravar_jogadores, um valor por jogador
+COLUNAS_JOGADOR = {
+    'saldo_final': 'float64', 'apostado': 'float64', 'lucro': 'float64',
+}
+
+def novos_resultados():
+    return {
+        'jogadores': 0,
+        'saldos_finais': Acumulador(),  # Ganho da sessão menos o depósito inicial
         'total_apostado': 0,
         'total_ganho': 0,
-        'ganhos_por_rodada': [],
-        'jogadores_com_lucro': 0
+        'ganhos_por_rodada': Acumulador(),
+        'jogadores_com_lucro': 0,
+        'sessoes': Covariancias(3),  # (ganho, apostado, controle) de cada sessão
+        'giros_fita': np.zeros(2, dtype=np.int64),  # Giros lidos da fita (normal, fortuna), com usar_fita
+        'medidor': instrumentacao.novo_medidor(instrumentar),  # Etapas e contadores, se instrumentar
     }
 
-    for _ in tqdm(range(NUM_JOGADORES), desc="Simulando jogadores"):
-        saldo_final, apostado, ganhos_por_rodada = simular_jogador()
-
-        # Subtrai o depósito inicial
-        saldo_liquido = saldo_final - DEPOSITO_INICIAL
+def simular_lote(tarefa):
+    """Executado nos processos do pool: o lote `indice_lote`, com `num_jogadores`
+    jogadores a partir de `inicio`, devolvendo só os acumuladores."""
+    indice_lote, inicio, num_jogadores = tarefa
+    resultados = novos_resultados()
+    medidor = resultados['medidor']
+
+    if usar_motor_populacao:
+        lidos = jogo_populacao.fita.contagem() if usar_fita else None
+        with medidor.etapa("simulacao"):
+            populacao = simular_rodadas_gratis(jogo_populacao, num_jogadores, NUM_RODADAS_GRATIS, APOSTA_FIXA,
+                                               rng=gerador_numpy(semente_campanha, LOTE, indice_lote),
+                                               ganhos_rodada=resultados['ganhos_por_rodada'], medidor=medidor)
+        if usar_fita:
+            resultados['giros_fita'] += jogo_populacao.fita.contagem() - lidos
+        with medidor.etapa("registro"):
+            resultados['jogadores'] += num_jogadores
+            resultados['saldos_finais'].adicionar_lote(populacao['ganho'] - DEPOSITO_INICIAL)
+            resultados['total_apostado'] += populacao['apostado'].sum()
+            resultados['total_ganho'] += populacao['ganho'].sum()
+            resultados['jogadores_com_lucro'] += int((populacao['ganho'] > DEPOSITO_INICIAL).sum())
+            resultados['sessoes'].adicionar_lote(populacao['ganho'], populacao['apostado'], populacao['controle'])
+        if gravar_jogadores:
+            resultados['por_jogador'] = {'saldo_final': populacao['ganho'], 'apostado': populacao['apostado'],
+                                         'lucro': populacao['ganho'] - DEPOSITO_INICIAL}
+        return resultados
+
+    # No laço por jogador cada jogador tem o seu fluxo: dá para refazer um só (reproduzir_jogador).
+    # O núcleo compilado faz os mesmos sorteios que simular_jogador, na mesma ordem
+    with medidor.etapa("simulacao"):
+        if usar_nucleo_compilado and nucleo.DISPONIVEL:
+            sessoes = nucleo.sessoes_rodadas_gratis(jogo_populacao, semente_campanha, inicio, num_jogadores,
+                                                    NUM_RODADAS_GRATIS, APOSTA_FIXA, resultados['ganhos_por_rodada'],
+                                                    medidor)
+        else:
+            sessoes = [simular_jogador(resultados['ganhos_por_rodada'],
+                                       gerador_python(semente_campanha, JOGADOR, inicio + j), medidor)
+                       for j in range(num_jogadores)]
+    with medidor.etapa("registro"):
+        for saldo_final, apostado, controle in sessoes:
+            resultados['jogadores'] += 1
+            # Subtrai o depósito inicial
+            resultados['saldos_finais'].adicionar(saldo_final - DEPOSITO_INICIAL)
+            resultados['total_apostado'] += apostado
+            resultados['total_ganho'] += saldo_final
+            resultados['sessoes'].adicionar(saldo_final, apostado, controle)
+
+            # Contabiliza jogadores com lucro
+            if saldo_final > DEPOSITO_INICIAL:
+                resultados['jogadores_com_lucro'] += 1
+    if gravar_jogadores:
+        colunas = np.array(sessoes, dtype=np.float64).reshape(-1, 3)
+        resultados['por_jogador'] = {'saldo_final': colunas[:, 0], 'apostado': colunas[:, 1],
+                                     'lucro': colunas[:, 0] - DEPOSITO_INICIAL}
+    return resultados
+
+def reproduzir_jogador(indice):
+    """Refaz só o jogador `indice` do laço em Python, com os mesmos sorteios da
+    campanha inteira: (saldo, total_apostado, controle)."""
+    return simular_jogador(Acumulador(), gerador_python(semente_campanha, JOGADOR, indice))
+
+def distribuicao_exata():
+    """Ganho das rodadas pela convolução exata dos giros, em R$."""
+    return rodadas_ratinho(jogo.pesos, jogo.multiplicadores, jogo.prob_fortuna, NUM_RODADAS_GRATIS,
+                           APOSTA_FIXA / LINHAS, premio_jackpot=jogo.premio_jackpot)
 
-        resultados['saldos_finais'].append(saldo_liquido)
-        resultados['total_apostado'] += apostado
-        resultados['total_ganho'] += saldo_final
-        resultados['ganhos_por_rodada'].extend(ganhos_por_rodada)
+def main():
+    NUM_JOGADORES = 100000
 
-        # Contabiliza jogadores com lucro
-        if saldo_final > DEPOSITO_INICIAL:
-            resultados['jogadores_com_lucro'] += 1
+    if modo_exato:
+        print("\n=== DISTRIBUIÇÃO EXATA DAS RODADAS GRÁTIS ===")
+        print(formatar_rodadas(distribuicao_exata(), DEPOSITO_INICIAL))
+        return
+
+    if usar_fita and usar_motor_populacao:
+        # Gera a fita (na primeira vez) aqui, uma vez só: não ao importar o script nem em cada processo do pool
+        jogo_populacao.fita.carregar()
+
+    tarefas = [(k, inicio, min(TAMANHO_LOTE, NUM_JOGADORES - inicio))
+               for k, inicio in enumerate(range(0, NUM_JOGADORES, TAMANHO_LOTE))]
+
+    # Os lotes chegam na ordem e são juntados nessa ordem; o checkpoint guarda os já juntados
+    checkpoint = Checkpoint(os.path.splitext(os.path.abspath(__file__))[0] + ".checkpoint",
+                            (tarefas, jogo, semente_campanha, usar_motor_populacao, usar_fita, giros_fita,
+                             gravar_jogadores, DEPOSITO_INICIAL, NUM_RODADAS_GRATIS, APOSTA_FIXA),
+                            intervalo_checkpoint)
+    resultados, feitos = checkpoint.retomar(novos_resultados, pediu_retomada())
+    gravador = (GravadorColunas(gravar_jogadores, COLUNAS_JOGADOR, NUM_JOGADORES, continuar=feitos > 0,
+                                script=os.path.basename(__file__), semente_campanha=semente_campanha)
+                if gravar_jogadores else None)
+    funcao = instrumentacao.medido(simular_lote, instrumentar, perfilar)
+    with tqdm(total=NUM_JOGADORES, initial=resultados['jogadores'], desc="Simulando jogadores") as barra:
+        for lote, parcial in enumerate(mapear_lotes(funcao, tarefas[feitos:], processos), start=feitos + 1):
+            por_jogador = parcial.pop('por_jogador', None)
+            if gravador is not None:
+                with resultados['medidor'].etapa("gravar_jogadores"):
+                    gravador.gravar(tarefas[lote - 1][1], por_jogador)
+            with resultados['medidor'].etapa("juntar"):
+                juntar_resultados(resultados, parcial)
+            checkpoint.gravar(resultados, lote)
+            barra.update(parcial['jogadores'])
+    if gravador is not None:
+        gravador.fechar()
+        print(f"Resultados por jogador em {gravar_jogadores} (motor.colunas.carregar_colunas)")
+    checkpoint.concluir()
+    if usar_fita and usar_motor_populacao:
+        for modo, giros in enumerate(resultados['giros_fita']):
+            jogo_populacao.fita.conferir(int(giros), modo)
 
     rtp_observado = (resultados['total_ganho'] / resultados['total_apostado']) * 100
     percentual_lucro = (resultados['jogadores_com_lucro'] / NUM_JOGADORES) * 100
 
     print("\n=== RESULTADOS DA SIMULAÇÃO COM DEPÓSITO INICIAL ===")
+    print(f"Semente da campanha: {semente_campanha}")
     print(f"RTP Observado : {rtp_observado:.2f}%")
-    print(f"Ganho médio líquido por jogador: R$ {np.mean(resultados['saldos_finais']):.2f}")
-    print(f"Ganho máximo líquido observado: R$ {np.max(resultados['saldos_finais']):.2f}")
-    print(f"Ganho mínimo líquido observado: R$ {np.min(resultados['saldos_finais']):.2f}")
+    _, rtp_controle, fator = razao_com_controle_acumulada(resultados['sessoes'])
+    print(formatar_controle(rtp_controle, fator))
+    print(f"Ganho médio líquido por jogador: R$ {resultados['saldos_finais'].media:.2f}")
+    print(f"Ganho máximo líquido observado: R$ {resultados['saldos_finais'].maximo:.2f}")
+    print(f"Ganho mínimo líquido observado: R$ {resultados['saldos_finais'].minimo:.2f}")
     print(f"Percentual de jogadores que terminaram com lucro: {percentual_lucro:.2f}%")
 
-    volatilidade_sessao = np.std(resultados['saldos_finais'])
-    volatilidade_rodada = np.std(resultados['ganhos_por_rodada'])
+    volatilidade_sessao = resultados['saldos_finais'].desvio_padrao
+    volatilidade_rodada = resultados['ganhos_por_rodada'].desvio_padrao * APOSTA_FIXA
 
     print(f"Volatilidade do ganho por sessão: {volatilidade_sessao:.2f}")
     print(f"Volatilidade do ganho por rodada: {volatilidade_rodada:.2f}")
 
+    if instrumentar:
+        print(instrumentacao.formatar(resultados['medidor'], giros=resultados['ganhos_por_rodada'].n,
+                                     jogadores=resultados['jogadores']))
+
 if __name__ == "__main__":
     main()